@@ -3,37 +3,211 @@ import asyncio
 import os
 import json
 import datetime
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from browser_use import Agent, BrowserSettings, AgentSettings, OutputFormat
+from urllib.parse import urljoin
+from browser_pool import BrowserPool
+from browser_profiles import ProfileStats, compare_profiles, describe_profile_stats, get_profile
+from custom_seo_tasks import NAVIGATION_MODEL, SEOTasks
+from page_cache import PageCache, PageFetcher
+from hybrid_fetcher import HybridFetcher
+from llm_cache import LLMResponseCache, SQLiteLLMCacheBackend
+from report_schema import STRUCTURED_OUTPUT_INSTRUCTIONS, build_report, render_markdown
+from results_store import ResultsStore
+from progress import (
+    FACTS_EXTRACTED, PAGE_VISITED, PAGES_FETCHED, PARTIAL_FINDINGS, STEP_COMPLETED, STEP_RESTORED,
+    LLMProgressHandler, ProgressStream, current_progress, tracked,
+)
+from llm_usage import DOWNGRADE_MODELS, UsageLedger, UsageTracker
+from task_checkpoint import StepRecorder, TaskCheckpoint, split_steps, step_prompt
+from stage_timing import AGENT_STEP, BROWSER, EXTRACTION, FETCH, LLM, REPORT, check_profiler, current_trace, record_span, stage
+from text_stats import TermStatistics
+from web_vitals import WebVitalsCollector, vitals_to_prompt
 
 # Load environment variables
 load_dotenv()
 
+# Iteration cap for tasks whose target pages were already fetched and parsed
+FACTS_MAX_ITERATIONS = 20
+
+# Browser metrics, LLM usage and Web Vitals of the task running in the current asyncio task, picked up by
+# save_report and reset by task_scope when the task ends
+_task_browser_stats = ContextVar("task_browser_stats", default=None)
+_task_usage = ContextVar("task_usage", default=None)
+_task_vitals = ContextVar("task_vitals", default=None)
+_TASK_STATE = (_task_browser_stats, _task_usage, _task_vitals)
+
+# Appended to the task when the synthesis model rewrites a browsing agent's answer
+SYNTHESIS_INSTRUCTIONS = """
+
+A browsing agent has already carried out this task and reported the findings below.
+Do not browse; write the final result of the whole task from these findings.
+
+--- Browsing agent findings ---
+{findings}
+"""
+
 class SEOAgent:
     """Advanced SEO Agent using browser-use with Gemini model"""
     
-    def __init__(self, headless=False, verbose=True):
-        """Initialize the SEO Agent with configuration settings"""
+    # Builds the chat model for every LLM call; the offline benchmark swaps in a stub
+    llm_factory = ChatGoogleGenerativeAI
+    
+    def __init__(self, headless=False, verbose=True, max_contexts=1, profile="demo", checkpoints=True,
+                 task_budget=None, batch_budget=None, results_dir="seo_results", cache_dir="seo_cache",
+                 profiler=None, vitals_samples=0, throttling=("mobile",)):
+        """
+        Initialize the SEO Agent with configuration settings
+        
+        Args:
+            headless (bool): Whether to run the browser in headless mode
+            verbose (bool): Print agent output and run statistics
+            max_contexts (int): Number of browser contexts available to concurrent tasks
+            profile (str or BrowserProfile): "demo" (slow motion, video) for watching the
+                agent, or "performance" for fast headless analysis runs
+            checkpoints (bool): Run numbered-step tasks one step at a time and save
+                each completed step, so a rerun resumes at the first unfinished step
+            task_budget (TokenBudget): Token/cost limit for each task
+            batch_budget (TokenBudget): Token/cost limit for everything this agent runs
+            results_dir (str): Where reports, the results store, progress logs and checkpoints go
+            cache_dir (str): Where the page and LLM response caches go
+            profiler (str): "cprofile" or "pyinstrument" to profile every task and save
+                the profile next to its report; profile one task at a time
+            vitals_samples (int): Cold loads per URL when measuring Core Web Vitals
+                for the SEO analysis and technical audit; 0 (the default) skips measuring
+            throttling (tuple): Throttling profiles the vitals are measured under
+                ("mobile", "desktop", "none")
+        """
         self.headless = headless
         self.verbose = verbose
-        self.results_dir = "seo_results"
+        self.profile = get_profile(profile)
+        self.results_dir = results_dir
         os.makedirs(self.results_dir, exist_ok=True)
         
-    async def setup_agent(self, task):
+        # Every saved report is indexed by site, keyword, task type and run time
+        self.results_store = ResultsStore(os.path.join(self.results_dir, "results.db"))
+        
+        # One warm browser shared by every task run by this agent
+        self.browser_pool = BrowserPool(
+            headless=headless, max_contexts=max_contexts, context_config=self.profile.context_config()
+        )
+        
+        # Plain HTTP fetches (robots.txt, sitemaps, target pages) go through an on-disk cache
+        self.cache_dir = cache_dir
+        self.page_fetcher = PageFetcher(PageCache(os.path.join(self.cache_dir, "pages")))
+        
+        # Client-side rendered pages are rendered in the pooled browser; everything else stays on HTTP
+        self.hybrid_fetcher = HybridFetcher(self.page_fetcher, self.browser_pool, self.profile.navigation_timeout)
+        
+        # Identical prompts against unchanged pages are answered from disk
+        self.llm_cache = LLMResponseCache(SQLiteLLMCacheBackend(os.path.join(self.cache_dir, "llm_cache.db")))
+        
+        # Per-step progress events; every task also logs them to <results_dir>/progress/<task id>.jsonl
+        self.progress = ProgressStream()
+        self.progress_dir = os.path.join(self.results_dir, "progress")
+        
+        # Completed steps of unfinished tasks, keyed by the task's step list
+        self.checkpoints = checkpoints
+        self.checkpoint_dir = os.path.join(self.results_dir, "checkpoints")
+        
+        # Token, cost and latency of every LLM call, per task and for the agent's lifetime
+        self.task_budget = task_budget
+        self.usage = UsageLedger("batch", budget=batch_budget, keep_calls=False)
+        
+        # Every task's span trace is written next to its report; a profiler is optional
+        self.profiler = check_profiler(profiler)
+        
+        # Lab Core Web Vitals of audited pages, measured once per URL and profile for the agent's lifetime
+        self.web_vitals = WebVitalsCollector(
+            self.browser_pool, throttling, vitals_samples, timeout=self.profile.navigation_timeout,
+            allowed_hosts=self.profile.allowed_hosts,
+        ) if vitals_samples else None
+        
+    async def __aenter__(self):
+        """Start the shared browser so the first task skips the cold start"""
+        await self.browser_pool.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Shut down the shared browser and the HTTP client"""
+        self.progress.close()
+        await self.browser_pool.close()
+        if self.verbose and self.usage.totals["calls"]:
+            print(self.usage.describe())
+        if self.verbose and self.page_fetcher.requests:
+            stats = self.page_fetcher.stats()
+            print(f"Page fetches: {stats['requests']} requests, {stats['shared_in_flight']} joined an "
+                  f"in-flight fetch, {stats['reused']} reused a page fetched earlier in this session")
+            print(self.hybrid_fetcher.describe())
+        await self.page_fetcher.close()
+        
+        if self.verbose:
+            stats = self.llm_cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries stored)")
+        self.llm_cache.backend.close()
+        self.results_store.close()
+    
+    @contextmanager
+    def task_scope(self):
+        """
+        Task-local state of one tracked task (see progress.tracked)
+        
+        Starts empty and is restored when the task ends, even if it fails
+        before save_report, so the next task run in the same asyncio task
+        never reports it.
+        """
+        tokens = [var.set(None) for var in _TASK_STATE]
+        try:
+            yield
+        finally:
+            for var, token in zip(_TASK_STATE, tokens):
+                var.reset(token)
+        
+    def build_llm(self, model, page_hash="", progress=None, usage=None):
+        """Gemini client with the response cache and the progress and usage callbacks attached"""
+        if usage and usage.downgraded_to:
+            # A task whose budget policy downgraded it stays on cheaper models
+            model = DOWNGRADE_MODELS.get(model, model)
+        callbacks = []
+        if progress:
+            callbacks.append(LLMProgressHandler(progress))
+        tracker = UsageTracker(usage) if usage else None
+        if tracker:
+            callbacks.append(tracker)
+        llm = self.llm_factory(
+            model=model,
+            temperature=0.2,
+            convert_system_message_to_human=True,
+            cache=self.llm_cache.scoped(page_hash),
+            callbacks=callbacks or None,
+        )
+        if tracker:
+            tracker.llm = llm
+        return llm
+    
+    async def setup_agent(self, task, browser_context=None, max_iterations=40, page_hash="", progress=None,
+                          recorder=None, usage=None, model=NAVIGATION_MODEL):
         """Set up the browser-use agent with Gemini model"""
         # Configure browser settings
         browser_settings = BrowserSettings(
             headless=self.headless,
             viewport_size={"width": 1280, "height": 800},
-            default_timeout=60000,  # 60 seconds
-            slow_mo=100,  # Slow down actions by 100ms for better visibility
-            record_video=True,  # Record video of the browser session
+            default_timeout=self.profile.default_timeout,
+            slow_mo=self.profile.slow_mo,
+            record_video=self.profile.record_video,
         )
         
         # Configure agent settings
         agent_settings = AgentSettings(
-            max_iterations=40,  # Increase max iterations for complex SEO tasks
+            max_iterations=max_iterations,  # 40 by default for complex SEO tasks
             max_thinking_depth=5,
             max_thinking_length=4000,
             verbose=self.verbose,
@@ -42,20 +216,361 @@ class SEOAgent:
         # Initialize the agent with Gemini model
         agent = Agent(
             task=task,
-            llm=ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",  # Using Gemini 1.5 Flash
-                temperature=0.2,
-                convert_system_message_to_human=True,
-            ),
+            llm=self.build_llm(model, page_hash, progress, usage),
+            browser=self.browser_pool.browser,
+            browser_context=browser_context,
             browser_settings=browser_settings,
             agent_settings=agent_settings,
             output_format=OutputFormat.MARKDOWN,  # Use markdown for better readability
+            register_new_step_callback=self._step_callback(progress, recorder),
         )
         
         return agent
     
+    @staticmethod
+    def _step_callback(progress=None, recorder=None):
+        """browser-use step callback feeding progress events, the checkpoint step recorder and the task trace"""
+        last_url = None
+        step_started = time.perf_counter()
+        
+        def on_step(state, model_output, step):
+            nonlocal last_url, step_started
+            now = time.perf_counter()
+            record_span(AGENT_STEP, step_started, now, step=step, url=state.url, actions=len(model_output.action))
+            step_started = now
+            if recorder:
+                recorder.on_step(state, model_output, step)
+            if not progress:
+                return
+            progress.step = step
+            if state.url and state.url != last_url:
+                last_url = state.url
+                progress.emit(PAGE_VISITED, url=state.url, title=state.title)
+            current = getattr(model_output, "current_state", None)
+            progress.emit(
+                PARTIAL_FINDINGS,
+                evaluation=getattr(current, "evaluation_previous_goal", None),
+                memory=getattr(current, "memory", None),
+                next_goal=getattr(current, "next_goal", None),
+                actions=[action.model_dump(exclude_unset=True) for action in model_output.action],
+            )
+        
+        return on_step
+    
+    def _facts_extracted(self, page, facts):
+        """on_facts hook for SEOTasks.prefetched_resources"""
+        progress = current_progress()
+        if progress:
+            progress.emit(FACTS_EXTRACTED, url=page.final_url, title=facts.title, issues=facts.issues())
+    
+    async def run_task(self, task, max_iterations=40, pages=None):
+        """
+        Run a task on a pooled browser context and return the agent's result
+        
+        Args:
+            task (str): The task prompt
+            max_iterations (int): Iteration cap for the agent
+            pages (list): Prefetched pages the prompt was built from; their content
+                is part of the LLM cache key
+        """
+        page_hash = LLMResponseCache.page_fingerprint(pages) if pages else ""
+        preamble, steps, context = split_steps(task)
+        async with self.browser_pool.context() as browser_context:
+            stats = ProfileStats(self.profile)
+            try:
+                await stats.attach(browser_context)
+            except Exception as e:
+                if self.verbose:
+                    print(f"Browser metrics unavailable: {e}")
+            _task_browser_stats.set(stats)
+            progress = current_progress()
+            usage = UsageLedger(progress.label if progress else "task", budget=self.task_budget, parent=self.usage)
+            _task_usage.set(usage)
+            route = SEOTasks.model_route(progress.label if progress else None)
+            trace = current_trace()
+            if trace:
+                trace.root.attrs.update(profile=self.profile.name, slow_mo_ms=self.profile.slow_mo)
+            
+            if not self.checkpoints or len(steps) < 2:
+                return await self._run_single(task, route, browser_context, max_iterations, page_hash, usage)
+            return await self._run_steps(
+                preamble, steps, context, route, browser_context, max_iterations, page_hash, usage
+            )
+    
+    async def _synthesize(self, prompt, route, page_hash, usage):
+        """Run a synthesis pass: one plain call to the route's synthesis model, no browser"""
+        llm = self.build_llm(route.synthesis_model, page_hash, current_progress(), usage)
+        with stage(LLM):
+            response = await llm.ainvoke(prompt)
+        usage.raise_if_stopped()
+        return response.content
+    
+    async def _run_single(self, task, route, browser_context, max_iterations, page_hash, usage):
+        """Run a whole task in one browser agent, then let the synthesis model write the final answer"""
+        progress = current_progress()
+        two_pass = route.synthesis_model != route.navigation_model
+        with stage(BROWSER):
+            agent = await self.setup_agent(
+                task if two_pass else task + STRUCTURED_OUTPUT_INSTRUCTIONS, browser_context, max_iterations,
+                page_hash, progress, usage=usage, model=route.navigation_model,
+            )
+            result = await agent.run()
+        usage.raise_if_stopped()
+        if not two_pass:
+            return result
+        usage.current_step = "synthesis"
+        prompt = task + SYNTHESIS_INSTRUCTIONS.format(findings=result) + STRUCTURED_OUTPUT_INSTRUCTIONS
+        return await self._synthesize(prompt, route, page_hash, usage)
+    
+    async def _run_steps(self, preamble, steps, context, route, browser_context, max_iterations, page_hash, usage):
+        """
+        Run a numbered task one step at a time, checkpointing every completed step
+        
+        Browsing steps run in a browser agent on the route's navigation model;
+        the steps the route marks as synthesis run together in a single call
+        to its synthesis model.
+        """
+        progress = current_progress()
+        checkpoint = TaskCheckpoint(self.checkpoint_dir, preamble, steps)
+        completed = checkpoint.completed()
+        if completed and progress:
+            progress.emit(STEP_RESTORED, steps=sorted(completed), checkpoint=checkpoint.path)
+        if completed and self.verbose:
+            print(f"Resuming from checkpoint: steps {', '.join(map(str, sorted(completed)))} already done")
+        
+        synthesis_steps = route.synthesis_steps(steps)
+        iterations_left = max_iterations - checkpoint.iterations_used()
+        for number, text in steps:
+            if number in completed or number in synthesis_steps:
+                continue
+            recorder = StepRecorder()
+            usage.current_step = number
+            prompt = step_prompt(preamble, steps, [number], completed, context)
+            # Every step gets whatever is left of the task's iteration budget
+            with stage(BROWSER, step=number):
+                agent = await self.setup_agent(
+                    prompt, browser_context, max(3, iterations_left), page_hash, progress, recorder, usage,
+                    model=route.navigation_model,
+                )
+                output = str(await agent.run())
+            # A step cut short by the budget is not checkpointed, so a rerun repeats it
+            usage.raise_if_stopped()
+            iterations_left -= recorder.iterations
+            checkpoint.record(number, text, output, recorder)
+            completed = checkpoint.completed()
+            if progress:
+                progress.emit(STEP_COMPLETED, number=number, urls=recorder.urls, iterations=recorder.iterations)
+        
+        usage.current_step = "synthesis"
+        prompt = step_prompt(preamble, steps, synthesis_steps, completed, context, STRUCTURED_OUTPUT_INSTRUCTIONS)
+        output = await self._synthesize(prompt, route, page_hash, usage)
+        if progress:
+            progress.emit(STEP_COMPLETED, number=synthesis_steps[-1], urls=[], iterations=0)
+        checkpoint.delete()
+        return output
+    
+    def save_report(self, task_type, title, result, filename, keyword=None, website_url=None, pages=None):
+        """
+        Save a task result as a JSON report plus the Markdown rendered from it
+        
+        Args:
+            task_type (str): Task identifier stored in the report
+            title (str): Report title
+            result (str): The agent's final answer
+            filename (str): Output path without extension
+            keyword (str): Target keyword, if any
+            website_url (str): Target website, if any
+            pages (list): Prefetched pages to include as per-URL metrics
+        
+        Returns:
+            dict: The result, both file paths, the SEOReport and its results store id
+        """
+        metadata = {}
+        progress = current_progress()
+        if progress:
+            metadata["progress_log"] = progress.log_path
+        trace = current_trace()
+        if trace:
+            metadata["timing"] = f"{filename}.timing.json"
+        if pages:
+            rendered = sum(1 for page in pages if page.rendered)
+            metadata["fetch_paths"] = {"http": len(pages) - rendered, "browser": rendered}
+        usage = _task_usage.get()
+        if usage is not None:
+            metadata["llm_usage"] = usage.summary()
+            if self.verbose:
+                print(usage.describe())
+        vitals = _task_vitals.get()
+        if vitals is not None:
+            metadata["web_vitals"] = [result.summary() for result in vitals]
+        stats = _task_browser_stats.get()
+        if stats is not None:
+            metadata["browser_profile"] = self.browser_profile_summary(stats, task_type, keyword, website_url)
+            if self.verbose:
+                print(describe_profile_stats(metadata["browser_profile"]))
+        with stage(REPORT):
+            report = build_report(
+                task_type, title, result, keyword=keyword, website_url=website_url, pages=pages, metadata=metadata,
+            )
+            
+            json_filename = f"{filename}.json"
+            with open(json_filename, "w", encoding="utf-8") as f:
+                f.write(report.model_dump_json(indent=2))
+            
+            md_filename = f"{filename}.md"
+            with open(md_filename, "w", encoding="utf-8") as f:
+                f.write(render_markdown(report))
+            
+            run_id = self.results_store.add(report, markdown_path=md_filename, json_path=json_filename)
+        
+        if trace:
+            # Written after the report stage so report writing is part of the trace
+            timing_files = trace.write(filename)
+            if self.verbose:
+                print(f"Timing breakdown saved to: {timing_files['summary']}")
+        
+        progress = current_progress()
+        if progress:
+            progress.finish(filename=md_filename, json_filename=json_filename, run_id=run_id)
+        
+        return {
+            "result": result,
+            "filename": md_filename,
+            "json_filename": json_filename,
+            "report": report,
+            "run_id": run_id,
+        }
+    
+    def browser_profile_summary(self, stats, task_type, keyword=None, website_url=None):
+        """Browser metrics of a task, with the saving over the last run of it under another profile"""
+        summary = stats.summary()
+        for run in self.results_store.query(task_type=task_type, site=website_url, keyword=keyword, limit=20):
+            previous = run.report().metadata.get("browser_profile")
+            if previous and previous.get("name") != summary["name"]:
+                summary["saving"] = compare_profiles(summary, previous)
+                break
+        return summary
+    
+    async def prefetch(self, urls):
+        """
+        Fetch URLs through the page cache, skipping any that cannot be fetched
+        
+        Pages whose HTTP body is a client-side rendered shell are rendered in
+        the browser pool instead (see hybrid_fetcher).
+        """
+        async def fetch(url):
+            try:
+                return await self.hybrid_fetcher.fetch(url)
+            except Exception as e:
+                if self.verbose:
+                    print(f"Prefetch of {url} failed: {e}")
+                return None
+        
+        with stage(FETCH):
+            pages = await asyncio.gather(*(fetch(url) for url in urls))
+        pages = [page for page in pages if page is not None and page.status < 400]
+        progress = current_progress()
+        if progress:
+            progress.emit(
+                PAGES_FETCHED,
+                urls=[page.final_url for page in pages],
+                from_cache=sum(1 for page in pages if page.from_cache),
+                rendered=sum(1 for page in pages if page.rendered),
+                failed=len(urls) - len(pages),
+            )
+        return pages
+    
+    async def measure_web_vitals(self, pages):
+        """
+        Lab Core Web Vitals of the prefetched HTML pages as a prompt block
+        
+        The measurements also go into the task's report metadata.
+        """
+        urls = [page.final_url for page in pages if "html" in page.content_type]
+        if not self.web_vitals or not urls:
+            return ""
+        results = await self.web_vitals.measure_all(urls)
+        _task_vitals.set(results)
+        if self.verbose:
+            failed = [result.url for result in results if not result.samples]
+            if failed:
+                print(f"Core Web Vitals could not be measured for: {', '.join(failed)}")
+        return vitals_to_prompt(results)
+    
+    def content_statistics(self, keyword, website_url, pages):
+        """Measured keyword density, TF-IDF and coverage gaps for prefetched HTML pages"""
+        with stage(EXTRACTION):
+            documents = {
+                page.final_url: page.facts.text
+                for page in pages
+                if "html" in page.content_type
+            }
+            if not documents:
+                return ""
+            target = next((page.final_url for page in pages if page.url == website_url), None)
+            return TermStatistics(documents).to_prompt(target, keyword)
+    
+    async def prefetch_site_files(self, website_url):
+        """Fetch a site's homepage, robots.txt and the sitemaps it declares"""
+        pages = await self.prefetch([website_url, urljoin(website_url, "/robots.txt")])
+        
+        sitemaps = []
+        for page in pages:
+            if page.url.endswith("/robots.txt"):
+                sitemaps = [
+                    line.split(":", 1)[1].strip()
+                    for line in page.html.splitlines()
+                    if line.lower().startswith("sitemap:")
+                ]
+        if not sitemaps:
+            sitemaps = [urljoin(website_url, "/sitemap.xml")]
+        # Gzipped sitemaps are binary; the technical audit streams them instead (see sitemap_stream)
+        pages += await self.prefetch([url for url in sitemaps if not url.lower().endswith(".gz")][:3])
+        return pages
+    
+    async def run_many(self, jobs, max_concurrency=None):
+        """
+        Run independent tasks concurrently and collect their results
+        
+        Args:
+            jobs (dict): Maps a job name to a tuple of (method, *args), e.g.
+                {"seo_analysis": (agent.run_seo_analysis, keyword, website_url)}
+            max_concurrency (int): Maximum number of jobs in flight at once.
+                Defaults to the number of browser contexts in the pool.
+        
+        Returns:
+            dict: {"results": {name: result}, "errors": {name: exception}}.
+                A failing job is recorded in "errors" and does not cancel the others.
+        """
+        limit = max(1, max_concurrency or self.browser_pool.max_contexts)
+        semaphore = asyncio.Semaphore(limit)
+        
+        async def run_job(method, args):
+            async with semaphore:
+                return await method(*args)
+        
+        names = list(jobs)
+        outcomes = await asyncio.gather(
+            *(run_job(jobs[name][0], jobs[name][1:]) for name in names),
+            return_exceptions=True,
+        )
+        
+        summary = {"results": {}, "errors": {}}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                summary["errors"][name] = outcome
+            else:
+                summary["results"][name] = outcome
+        return summary
+    
+    @tracked("seo_analysis")
     async def run_seo_analysis(self, keyword, website_url):
         """Run comprehensive SEO analysis for the given keyword and website"""
+        pages = await self.prefetch([website_url])
+        prefetched = SEOTasks.prefetched_resources(pages, on_facts=self._facts_extracted) + "\n\n" + self.content_statistics(keyword, website_url, pages)
+        vitals = await self.measure_web_vitals(pages)
+        if vitals:
+            prefetched += "\n\n" + vitals
         seo_task = f"""
         Perform a comprehensive SEO analysis for the keyword "{keyword}" on the website {website_url}:
         
@@ -64,18 +579,19 @@ class SEOAgent:
            - Title structure and keyword usage
            - Meta description patterns
            - Content structure (headings, paragraphs, lists)
-           - Content length and keyword density
+           - Content length and keyword density (use the measured statistics below where available)
            - Media usage (images, videos)
            - Internal and external link patterns
         
-        3. Visit the target website at {website_url} and analyze:
+        3. Analyze the target website at {website_url} (use the pre-extracted facts below
+           where available and only open the site for what they do not cover):
            - Current title and meta description
            - Heading structure (H1, H2, H3)
            - Content quality and relevance to keyword
            - Internal linking structure
-           - Page speed (observe loading time)
+           - Page speed (use the measured Core Web Vitals below; do not judge loading time by eye)
            - Mobile responsiveness (resize browser window)
-           - Schema markup (check page source)
+           - Schema markup
         
         4. Provide specific recommendations to optimize {website_url} for "{keyword}":
            - Title and meta description improvements
@@ -86,32 +602,34 @@ class SEOAgent:
         
         5. Save the analysis and recommendations to a file in a clear, organized format.
         6. Create a summarized action plan with priority tasks for immediate implementation.
+        
+        {prefetched}
         """
         
-        agent = await self.setup_agent(seo_task)
-        result = await agent.run()
+        # With the target page already parsed the agent only has to browse the SERP
+        result = await self.run_task(seo_task, max_iterations=FACTS_MAX_ITERATIONS if pages else 40, pages=pages)
         
         # Save the results
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.results_dir}/seo_analysis_{keyword.replace(' ', '_')}_{timestamp}.md"
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# SEO Analysis for '{keyword}' on {website_url}\n\n")
-            f.write(f"Analysis Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(result)
+        filename = f"{self.results_dir}/seo_analysis_{keyword.replace(' ', '_')}_{timestamp}"
         
-        return {
-            "result": result,
-            "filename": filename
-        }
+        return self.save_report(
+            "seo_analysis", f"SEO Analysis for '{keyword}' on {website_url}", result, filename,
+            keyword=keyword, website_url=website_url, pages=pages,
+        )
     
+    @tracked("competitor_analysis")
     async def run_competitor_analysis(self, keyword, website_url, competitors=None):
         """Run competitor analysis for the given keyword"""
+        pages = await self.prefetch([website_url] + list(competitors or []))
+        statistics = self.content_statistics(keyword, website_url, pages)
+        
         competitors_str = ""
         if competitors:
             competitors_str = "Also visit and analyze these specific competitors:\n"
-            for i, comp in enumerate(competitors, 1):
-                competitors_str += f"{i}. {comp}\n"
+            # Indented bullets, so the list stays part of step 3 when the task is split into steps
+            for comp in competitors:
+                competitors_str += f"           - {comp}\n"
         
         task = f"""
         Perform a detailed competitor analysis for the keyword "{keyword}" comparing with {website_url}:
@@ -133,25 +651,24 @@ class SEOAgent:
         6. Provide actionable recommendations for {website_url} to outperform competitors
         
         7. Save the analysis with a clear competitive positioning map and strategy recommendations
+        
+        {SEOTasks.prefetched_resources(pages, on_facts=self._facts_extracted)}
+        
+        {statistics}
         """
         
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+        result = await self.run_task(task, pages=pages)
         
         # Save the results
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.results_dir}/competitor_analysis_{keyword.replace(' ', '_')}_{timestamp}.md"
+        filename = f"{self.results_dir}/competitor_analysis_{keyword.replace(' ', '_')}_{timestamp}"
         
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Competitor Analysis for '{keyword}' vs {website_url}\n\n")
-            f.write(f"Analysis Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(result)
-        
-        return {
-            "result": result,
-            "filename": filename
-        }
+        return self.save_report(
+            "competitor_analysis", f"Competitor Analysis for '{keyword}' vs {website_url}", result, filename,
+            keyword=keyword, website_url=website_url, pages=pages,
+        )
     
+    @tracked("keyword_research")
     async def run_keyword_research(self, main_keyword, website_url):
         """Run keyword research to find related keywords"""
         task = f"""
@@ -178,22 +695,16 @@ class SEOAgent:
         7. Save the keyword research results and strategy in an organized format
         """
         
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+        result = await self.run_task(task)
         
         # Save the results
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.results_dir}/keyword_research_{main_keyword.replace(' ', '_')}_{timestamp}.md"
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Keyword Research for '{main_keyword}' - {website_url}\n\n")
-            f.write(f"Research Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(result)
+        filename = f"{self.results_dir}/keyword_research_{main_keyword.replace(' ', '_')}_{timestamp}"
         
-        return {
-            "result": result,
-            "filename": filename
-        }
+        return self.save_report(
+            "keyword_research", f"Keyword Research for '{main_keyword}' - {website_url}", result, filename,
+            keyword=main_keyword, website_url=website_url,
+        )
 
 async def main():
     """Main function to run the SEO agent"""
@@ -209,9 +720,24 @@ async def main():
     competitors_input = input("Enter competitor URLs (comma-separated) or press Enter to skip: ")
     competitors = [url.strip() for url in competitors_input.split(",")] if competitors_input.strip() else None
     
-    # Create the SEO agent
-    seo_agent = SEOAgent(headless=False, verbose=True)
+    # Create the SEO agent; the browser stays open across tasks until exit
+    async with SEOAgent(headless=False, verbose=True, max_contexts=3) as seo_agent:
+        await _menu_loop(seo_agent, main_keyword, website_url, competitors)
+
+def print_run_summary(summary):
+    """Print where each job of a run_many() batch saved its results"""
+    for name, result in summary["results"].items():
+        print(f"{name} saved to: {result['filename']}")
+    for name, error in summary["errors"].items():
+        print(f"{name} failed: {error}")
     
+    if summary["errors"]:
+        print(f"\n{len(summary['errors'])} task(s) failed, {len(summary['results'])} completed.")
+    else:
+        print("\nAll tasks completed successfully!")
+
+async def _menu_loop(seo_agent, main_keyword, website_url, competitors):
+    """Interactive task menu for the SEO agent"""
     # Menu for selecting tasks
     while True:
         print("\nSEO Tasks Menu:")
@@ -241,19 +767,12 @@ async def main():
         elif choice == "4":
             print(f"\nRunning all SEO tasks for '{main_keyword}' on {website_url}...")
             
-            print("\n1. Running comprehensive SEO analysis...")
-            seo_result = await seo_agent.run_seo_analysis(main_keyword, website_url)
-            print(f"SEO analysis saved to: {seo_result['filename']}")
-            
-            print("\n2. Running competitor analysis...")
-            comp_result = await seo_agent.run_competitor_analysis(main_keyword, website_url, competitors)
-            print(f"Competitor analysis saved to: {comp_result['filename']}")
-            
-            print("\n3. Running keyword research...")
-            kw_result = await seo_agent.run_keyword_research(main_keyword, website_url)
-            print(f"Keyword research saved to: {kw_result['filename']}")
-            
-            print("\nAll tasks completed successfully!")
+            summary = await seo_agent.run_many({
+                "SEO analysis": (seo_agent.run_seo_analysis, main_keyword, website_url),
+                "Competitor analysis": (seo_agent.run_competitor_analysis, main_keyword, website_url, competitors),
+                "Keyword research": (seo_agent.run_keyword_research, main_keyword, website_url),
+            })
+            print_run_summary(summary)
             
         elif choice == "5":
             print("\nExiting SEO Agent. Goodbye!")
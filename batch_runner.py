@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Non-interactive batch driver: run SEO tasks for every keyword in a file
+
+Example:
+    python batch_runner.py --keywords keywords.txt --site https://example.com \\
+        --tasks seo_analysis,keyword_research --workers 3
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from browser_profiles import PROFILES
+from llm_usage import BudgetExceeded, TokenBudget
+from stage_timing import PROFILERS
+from web_vitals import THROTTLING_PROFILES
+from extended_seo_agent import ExtendedSEOAgent
+
+# Load environment variables
+load_dotenv()
+
+# Task name -> coroutine factory taking (agent, keyword, website_url, competitors)
+BATCH_TASKS = {
+    "seo_analysis": lambda agent, kw, url, comps: agent.run_seo_analysis(kw, url),
+    "competitor_analysis": lambda agent, kw, url, comps: agent.run_competitor_analysis(kw, url, comps),
+    "keyword_research": lambda agent, kw, url, comps: agent.run_keyword_research(kw, url),
+    "serp_features": lambda agent, kw, url, comps: agent.run_serp_features_analysis(kw),
+    "content_gap": lambda agent, kw, url, comps: agent.run_content_gap_analysis(kw, url, comps),
+    "backlink_analysis": lambda agent, kw, url, comps: agent.run_backlink_analysis(kw, url),
+}
+
+
+def load_keyword_file(path):
+    """Read keywords from a file, one per line, skipping blanks, comments and duplicates"""
+    keywords = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            keyword = line.strip()
+            if not keyword or keyword.startswith("#") or keyword.lower() in seen:
+                continue
+            seen.add(keyword.lower())
+            keywords.append(keyword)
+    return keywords
+
+
+class BatchRunner:
+    """Queues one job per (keyword, task) and runs them through a bounded worker pool"""
+
+    def __init__(self, website_url, keywords, tasks, workers=3, manifest_path=None,
+                 competitors=None, headless=True, verbose=False, profile="performance",
+                 task_budget=None, batch_budget=None, profiler=None, vitals_samples=0, throttling=("mobile",)):
+        unknown = [task for task in tasks if task not in BATCH_TASKS]
+        if unknown:
+            raise ValueError(f"Unknown task(s): {', '.join(unknown)}. Choose from: {', '.join(BATCH_TASKS)}")
+
+        self.website_url = website_url
+        self.keywords = keywords
+        self.tasks = tasks
+        self.workers = max(1, workers)
+        self.competitors = competitors
+        self.headless = headless
+        self.verbose = verbose
+        self.profile = profile
+        self.task_budget = task_budget
+        self.batch_budget = batch_budget
+        self.profiler = profiler
+        self.vitals_samples = vitals_samples
+        self.throttling = throttling
+        site_slug = urlparse(website_url).netloc.replace(":", "_") or "site"
+        self.manifest_path = manifest_path or os.path.join("seo_results", f"batch_manifest_{site_slug}.json")
+        self.manifest = self._load_manifest()
+        self._manifest_lock = asyncio.Lock()
+
+    @staticmethod
+    def job_id(keyword, task):
+        return f"{task}:{keyword}"
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"website_url": self.website_url, "jobs": {}}
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        # Atomic replace so a crash never leaves a half-written manifest behind
+        os.replace(tmp_path, self.manifest_path)
+
+    def is_done(self, keyword, task):
+        """A job is done when the manifest says so and its output file still exists"""
+        entry = self.manifest["jobs"].get(self.job_id(keyword, task))
+        return bool(entry and entry.get("status") == "done" and os.path.exists(entry.get("filename", "")))
+
+    def pending_jobs(self):
+        return [
+            (keyword, task)
+            for keyword in self.keywords
+            for task in self.tasks
+            if not self.is_done(keyword, task)
+        ]
+
+    async def _record(self, keyword, task, **fields):
+        async with self._manifest_lock:
+            self.manifest["jobs"][self.job_id(keyword, task)] = {
+                "keyword": keyword,
+                "task": task,
+                "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                **fields,
+            }
+            self._save_manifest()
+
+    async def _worker(self, agent, queue, progress):
+        while True:
+            try:
+                keyword, task = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                agent.usage.check_budget()
+            except BudgetExceeded as e:
+                # Leave the job pending so the next run of the batch picks it up
+                print(f"Stopping worker: {e}")
+                queue.task_done()
+                return
+
+            try:
+                result = await BATCH_TASKS[task](agent, keyword, self.website_url, self.competitors)
+                await self._record(keyword, task, status="done", filename=result["filename"])
+                progress["done"] += 1
+                print(f"[{progress['done'] + progress['failed']}/{progress['total']}] {task} '{keyword}' -> {result['filename']}")
+            except Exception as e:
+                await self._record(keyword, task, status="failed", error=str(e))
+                progress["failed"] += 1
+                print(f"[{progress['done'] + progress['failed']}/{progress['total']}] {task} '{keyword}' failed: {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self):
+        """Run every pending job and return the manifest"""
+        jobs = self.pending_jobs()
+        skipped = len(self.keywords) * len(self.tasks) - len(jobs)
+        print(f"{len(jobs)} job(s) queued, {skipped} already completed")
+        if not jobs:
+            return self.manifest
+
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        progress = {"total": len(jobs), "done": 0, "failed": 0}
+        workers = min(self.workers, len(jobs))
+        async with ExtendedSEOAgent(
+            headless=self.headless, verbose=self.verbose, max_contexts=workers, profile=self.profile,
+            task_budget=self.task_budget, batch_budget=self.batch_budget, profiler=self.profiler,
+            vitals_samples=self.vitals_samples, throttling=self.throttling,
+        ) as agent:
+            await asyncio.gather(*(self._worker(agent, queue, progress) for _ in range(workers)))
+            async with self._manifest_lock:
+                self.manifest["usage"] = agent.usage.summary()
+                self._save_manifest()
+            print(agent.usage.describe())
+
+        print(f"\nBatch finished: {progress['done']} done, {progress['failed']} failed")
+        print(f"Manifest saved to: {self.manifest_path}")
+        return self.manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run SEO tasks for every keyword in a file")
+    parser.add_argument("--keywords", required=True, help="Keyword file, one keyword per line")
+    parser.add_argument("--site", required=True, help="Website URL to analyse")
+    parser.add_argument("--tasks", default="seo_analysis",
+                        help=f"Comma-separated task types ({', '.join(BATCH_TASKS)})")
+    parser.add_argument("--workers", type=int, default=3, help="Number of tasks to run concurrently")
+    parser.add_argument("--manifest", default=None, help="Manifest path (default: seo_results/batch_manifest_<host>.json)")
+    parser.add_argument("--competitors", default="", help="Comma-separated competitor URLs")
+    parser.add_argument("--show-browser", action="store_true", help="Run with a visible browser window")
+    parser.add_argument("--verbose", action="store_true", help="Show agent output")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="performance",
+                        help="Browser profile: performance blocks fonts, media and trackers; demo records video")
+    parser.add_argument("--task-token-budget", type=int, default=None, help="Maximum LLM tokens per task")
+    parser.add_argument("--task-cost-budget", type=float, default=None, help="Maximum LLM cost per task in USD")
+    parser.add_argument("--batch-token-budget", type=int, default=None, help="Maximum LLM tokens for the whole batch")
+    parser.add_argument("--batch-cost-budget", type=float, default=None, help="Maximum LLM cost for the whole batch in USD")
+    parser.add_argument("--on-budget-exceeded", choices=["stop", "downgrade"], default="stop",
+                        help="Stop at the budget, or switch to a cheaper model and stop at 1.5x the budget")
+    parser.add_argument("--profiler", choices=list(PROFILERS), default=None,
+                        help="Profile every task and save the profile next to its report (use with --workers 1)")
+    parser.add_argument("--vitals-samples", type=int, default=0,
+                        help="Measure Core Web Vitals with this many cold page loads per URL (off by default; 3 is a good start)")
+    parser.add_argument("--throttling", default="mobile",
+                        help=f"Comma-separated throttling profiles for Core Web Vitals ({', '.join(THROTTLING_PROFILES)})")
+    return parser.parse_args(argv)
+
+
+def _budget(max_tokens, max_cost_usd, on_exceed):
+    if max_tokens is None and max_cost_usd is None:
+        return None
+    return TokenBudget(max_tokens=max_tokens, max_cost_usd=max_cost_usd, on_exceed=on_exceed)
+
+
+async def main(argv=None):
+    """Entry point for the batch runner"""
+    args = parse_args(argv)
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    competitors = [url.strip() for url in args.competitors.split(",") if url.strip()] or None
+
+    runner = BatchRunner(
+        website_url=args.site,
+        keywords=load_keyword_file(args.keywords),
+        tasks=tasks,
+        workers=args.workers,
+        manifest_path=args.manifest,
+        competitors=competitors,
+        headless=not args.show_browser,
+        verbose=args.verbose,
+        profile=args.profile,
+        task_budget=_budget(args.task_token_budget, args.task_cost_budget, args.on_budget_exceeded),
+        batch_budget=_budget(args.batch_token_budget, args.batch_cost_budget, args.on_budget_exceeded),
+        profiler=args.profiler,
+        vitals_samples=args.vitals_samples,
+        throttling=tuple(name.strip() for name in args.throttling.split(",") if name.strip()),
+    )
+    await runner.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
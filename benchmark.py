@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the SEO agents' run_* tasks
+
+Record a corpus once, with network access:
+    python benchmark.py record --site https://example.com --keyword "running shoes" \\
+        --competitors https://competitor.com --crawl 30
+
+Then replay it as often as needed, with no network:
+    python benchmark.py run --tasks seo_analysis,content_gap,technical_audit --repeat 3
+
+`run` serves the recorded pages from local HTTP servers (one port per
+recorded site) and runs the real agents and browser against them, with a
+deterministic stub LLM in place of Gemini. Every task is timed end to end
+and per stage (fetch, extraction, crawl, browser, LLM, report). Each
+benchmark run is appended to a history file and compared with the previous
+run on the same corpus and settings, so regressions show up as slower
+medians.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from batch_runner import BATCH_TASKS
+from browser_profiles import PROFILES
+from extended_seo_agent import ExtendedSEOAgent
+from page_cache import PageFetcher
+from site_crawler import SiteCrawler
+from stage_timing import BROWSER, CRAWL, EXTRACTION, FETCH, LLM, REPORT, collect_stages
+from web_vitals import VITALS
+
+# Tasks the benchmark can run: (agent, keyword, website_url, competitors) -> coroutine
+BENCHMARK_TASKS = dict(
+    BATCH_TASKS,
+    technical_audit=lambda agent, kw, url, comps: agent.run_technical_seo_audit(url, crawl_pages=25),
+)
+DEFAULT_TASKS = ["seo_analysis", "competitor_analysis", "content_gap", "technical_audit"]
+STAGES = [FETCH, EXTRACTION, CRAWL, VITALS, BROWSER, LLM, REPORT, "other"]
+
+# Final answer of every stub LLM call; carries a valid JSON block so report building takes its normal path
+STUB_REPORT = """## Benchmark report
+
+This report was written by the benchmark's stub LLM; its content is fixed.
+
+```json
+{
+  "summary": "Fixed benchmark output.",
+  "scores": {"overall": 50},
+  "findings": [{"title": "Benchmark finding", "detail": "Fixed benchmark output.", "severity": "info"}],
+  "recommendations": [{"action": "Nothing to do", "priority": "low", "rationale": "Fixed benchmark output."}]
+}
+```
+"""
+
+# Corpus URLs as served by CorpusServer
+_LOCAL_URL = re.compile(r"http://127\.0\.0\.1:\d+[^\s\"'<>)\]]*")
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the Gemini client
+
+    Browser-agent calls open the local corpus URLs named in the conversation,
+    one per step and at most max_visits, and then finish with STUB_REPORT;
+    plain calls (synthesis passes) answer with STUB_REPORT straight away.
+    Token counts are estimated at four characters per token, so usage and
+    cost accounting run as they would against Gemini.
+    """
+
+    model: str = "stub"
+    temperature: float = 0.0
+    convert_system_message_to_human: bool = False
+    max_visits: int = 3
+    latency: float = 0.0  # simulated seconds per call
+    tool_name: str = None  # set by bind_tools for structured-output callers
+
+    @property
+    def _llm_type(self):
+        return "benchmark-stub"
+
+    def bind_tools(self, tools, **kwargs):
+        """Answer with a call of the first bound tool, as with_structured_output() expects"""
+        return self.model_copy(update={"tool_name": convert_to_openai_tool(tools[0])["function"]["name"]})
+
+    def _respond(self, messages):
+        prompt = "\n".join(
+            message.content if isinstance(message.content, str) else json.dumps(message.content)
+            for message in messages
+        )
+        if "current_state" not in prompt:
+            content, payload = STUB_REPORT, None
+        else:
+            # A browser-use agent step: the number of earlier answers is the step number
+            step = sum(isinstance(message, AIMessage) for message in messages)
+            urls = list(dict.fromkeys(url.rstrip(".,;:") for url in _LOCAL_URL.findall(prompt)))
+            state = {
+                "evaluation_previous_goal": "Success" if step else "Unknown",
+                "memory": f"Opened {min(step, len(urls))} corpus page(s)",
+            }
+            if step < min(len(urls), self.max_visits):
+                state["next_goal"] = f"Open {urls[step]}"
+                action = {"go_to_url": {"url": urls[step]}}
+            else:
+                state["next_goal"] = "Finish"
+                action = {"done": {"text": STUB_REPORT, "success": True}}
+            payload = {"current_state": state, "action": [action]}
+            content = json.dumps(payload)
+
+        input_tokens, output_tokens = len(prompt) // 4, len(content) // 4
+        message = AIMessage(
+            content=content,
+            tool_calls=[{"name": self.tool_name, "args": payload, "id": "stub_call"}] if payload and self.tool_name else [],
+            usage_metadata={
+                "input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+class Corpus:
+    """Recorded pages: manifest.json plus one body file per URL"""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"scenario": {}, "pages": {}}
+
+    @property
+    def pages(self):
+        return self.manifest["pages"]
+
+    def add(self, page):
+        """Store a FetchedPage under the URL it was requested as"""
+        name = hashlib.sha1(page.url.encode("utf-8")).hexdigest()[:20] + ".body"
+        os.makedirs(os.path.join(self.path, "pages"), exist_ok=True)
+        with open(os.path.join(self.path, "pages", name), "w", encoding="utf-8") as f:
+            f.write(page.html)
+        self.pages[page.url] = {
+            "file": name,
+            "status": page.status,
+            "content_type": page.content_type,
+            "content_hash": page.content_hash,
+        }
+
+    def body(self, url):
+        with open(os.path.join(self.path, "pages", self.pages[url]["file"]), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def origins(self):
+        return sorted({f"{urlparse(url).scheme}://{urlparse(url).netloc}" for url in self.pages})
+
+    def fingerprint(self):
+        """Hash of the recorded URLs and bodies; history entries are only compared within one corpus"""
+        hashes = sorted((url, entry["content_hash"]) for url, entry in self.pages.items())
+        return hashlib.sha256(json.dumps(hashes).encode("utf-8")).hexdigest()[:16]
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+
+
+class CorpusServer:
+    """
+    Serves a corpus on localhost, one port per recorded origin.
+
+    Absolute links to any recorded origin are rewritten to its local
+    address, so crawls and the browser stay inside the corpus.
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.local = {}  # recorded origin -> local origin
+        self._servers = []
+
+    def start(self):
+        for origin in self.corpus.origins():
+            server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler(origin))
+            self.local[origin] = f"http://127.0.0.1:{server.server_port}"
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self._servers.append(server)
+        # Longest origins first, so https://example.com is not rewritten inside https://example.com.au
+        self._rewrites = sorted(self.local.items(), key=lambda item: -len(item[0]))
+        return self
+
+    def close(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def local_url(self, url):
+        for origin, local in self._rewrites:
+            if url == origin or url.startswith(origin + "/") or url.startswith(origin + "?"):
+                return local + url[len(origin):]
+        return url
+
+    def lookup(self, url):
+        """Recorded URL matching a request, tolerating a missing or extra trailing slash"""
+        for candidate in (url, url.rstrip("/"), url + "/"):
+            if candidate in self.corpus.pages:
+                return candidate
+        return None
+
+    def rewrite(self, body):
+        for origin, local in self._rewrites:
+            body = body.replace(origin, local).replace("//" + urlparse(origin).netloc, "//" + urlparse(local).netloc)
+        return body
+
+    def _handler(self, origin):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body):
+                url = server.lookup(origin + self.path)
+                if url is None:
+                    self.send_error(404)
+                    return
+                entry = server.corpus.pages[url]
+                data = server.rewrite(server.corpus.body(url)).encode("utf-8")
+                self.send_response(entry["status"])
+                self.send_header("Content-Type", entry["content_type"] or "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+async def record(corpus, site, keyword, competitors=(), crawl_pages=30, extra_urls=()):
+    """Fetch a site (homepage, robots.txt, sitemaps, crawled pages) and competitor pages into the corpus"""
+    urls = [site, urljoin(site, "/robots.txt"), *competitors, *extra_urls]
+    if crawl_pages:
+        crawler = SiteCrawler(max_pages=crawl_pages)
+        try:
+            crawl = await crawler.crawl(site)
+        finally:
+            await crawler.close()
+        urls += [url for url, page in crawl.pages.items() if page.status == 200 and "html" in page.content_type]
+
+    fetcher = PageFetcher()
+    try:
+        urls = list(dict.fromkeys(urls))
+        pages = await asyncio.gather(*(fetcher.fetch(url, use_cache=False) for url in urls), return_exceptions=True)
+        sitemaps = []
+        for page in pages:
+            if isinstance(page, Exception) or page.status >= 400:
+                continue
+            corpus.add(page)
+            if page.url.endswith("/robots.txt"):
+                sitemaps = [
+                    line.split(":", 1)[1].strip()
+                    for line in page.html.splitlines()
+                    if line.lower().startswith("sitemap:")
+                ]
+        for sitemap in sitemaps[:3] or [urljoin(site, "/sitemap.xml")]:
+            try:
+                page = await fetcher.fetch(sitemap, use_cache=False)
+            except Exception:
+                continue
+            if page.status < 400:
+                corpus.add(page)
+    finally:
+        await fetcher.close()
+
+    corpus.manifest["scenario"] = {"site": site, "keyword": keyword, "competitors": list(competitors)}
+    corpus.manifest["recorded_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    corpus.save()
+    return corpus
+
+
+async def run_once(task, scenario, server, settings, cache_dir=None):
+    """Run one task against the local corpus and return its timings"""
+    profile = replace(PROFILES["performance"], name="benchmark", allowed_hosts=frozenset({"127.0.0.1"}))
+    with tempfile.TemporaryDirectory(prefix="seo_benchmark_") as workdir:
+        agent = ExtendedSEOAgent(
+            headless=True, verbose=False, profile=profile,
+            results_dir=os.path.join(workdir, "results"), cache_dir=cache_dir or os.path.join(workdir, "cache"),
+        )
+        agent.llm_factory = partial(StubChatModel, max_visits=settings["max_visits"], latency=settings["llm_latency"])
+        started = time.perf_counter()
+        await agent.browser_pool.start()
+        browser_start = time.perf_counter() - started
+        try:
+            with collect_stages() as timings:
+                started = time.perf_counter()
+                outcome = await BENCHMARK_TASKS[task](
+                    agent, scenario["keyword"], server.local_url(scenario["site"]),
+                    [server.local_url(url) for url in scenario["competitors"]] or None,
+                )
+                wall = time.perf_counter() - started
+        finally:
+            await agent.close()
+
+    usage = outcome["report"].metadata.get("llm_usage", {})
+    stages = {name: values["seconds"] for name, values in timings.summary().items()}
+    # Browser-agent time includes the agent's own LLM calls; count those under "llm" only
+    llm_total = usage.get("latency_s", 0.0)
+    stages[BROWSER] = max(0.0, stages.get(BROWSER, 0.0) - max(0.0, llm_total - stages.get(LLM, 0.0)))
+    stages[LLM] = llm_total
+    # Only the top-level stages count; nested ones (browser renders inside fetch) are already included
+    stages["other"] = max(0.0, wall - sum(stages.get(name, 0.0) for name in STAGES[:-1]))
+    return {
+        "wall_s": wall,
+        "browser_start_s": browser_start,
+        "stages": stages,
+        "llm_calls": usage.get("calls", 0),
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+    }
+
+
+def summarize(runs):
+    """Medians (and the wall-time spread) of a task's repeated runs"""
+    walls = [run["wall_s"] for run in runs]
+    return {
+        "wall_s": {
+            "median": round(statistics.median(walls), 3), "min": round(min(walls), 3), "max": round(max(walls), 3),
+        },
+        "browser_start_s": round(statistics.median(run["browser_start_s"] for run in runs), 3),
+        "stages": {
+            name: round(statistics.median(run["stages"].get(name, 0.0) for run in runs), 3)
+            for name in STAGES
+        },
+        "llm_calls": runs[-1]["llm_calls"],
+        "input_tokens": runs[-1]["input_tokens"],
+        "output_tokens": runs[-1]["output_tokens"],
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(entry, previous, threshold=0.2, min_delta=0.05):
+    """task -> (previous median, current median) for tasks whose median wall time grew past the threshold"""
+    regressions = {}
+    for task, current in entry["tasks"].items():
+        before = previous["tasks"].get(task) if previous else None
+        if not before:
+            continue
+        old, new = before["wall_s"]["median"], current["wall_s"]["median"]
+        if new - old > min_delta and new > old * (1 + threshold):
+            regressions[task] = (old, new)
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(entry, previous=None):
+    header = f"{'task':<22}{'wall s':>9}" + "".join(f"{name:>11}" for name in STAGES) + f"{'vs prev':>10}"
+    print(header)
+    print("-" * len(header))
+    for task, summary in entry["tasks"].items():
+        before = previous["tasks"].get(task) if previous else None
+        change = ""
+        if before and before["wall_s"]["median"]:
+            change = f"{summary['wall_s']['median'] / before['wall_s']['median'] - 1:+.0%}"
+        print(
+            f"{task:<22}{summary['wall_s']['median']:>9.2f}"
+            + "".join(f"{summary['stages'][name]:>11.2f}" for name in STAGES)
+            + f"{change:>10}"
+        )
+
+
+async def run_benchmark(corpus, tasks, repeat=3, llm_latency=0.0, max_visits=3, warm_cache=False, scenario=None):
+    """
+    Run every task `repeat` times against the corpus
+
+    Each run gets fresh result and cache directories unless warm_cache is
+    set, in which case all runs share one cache and only the first is cold.
+
+    Returns:
+        dict: History entry with per-task medians
+    """
+    scenario = scenario or corpus.manifest["scenario"]
+    settings = {"repeat": repeat, "llm_latency": llm_latency, "max_visits": max_visits, "warm_cache": warm_cache}
+    server = CorpusServer(corpus).start()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="seo_benchmark_cache_") as shared_cache:
+            for task in tasks:
+                runs = []
+                for i in range(repeat):
+                    run = await run_once(task, scenario, server, settings, shared_cache if warm_cache else None)
+                    runs.append(run)
+                    print(f"{task} run {i + 1}/{repeat}: {run['wall_s']:.2f}s")
+                results[task] = summarize(runs)
+    finally:
+        server.close()
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "corpus": corpus.fingerprint(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+        "tasks": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the SEO agent tasks")
+    parser.add_argument("--corpus", default=os.path.join("benchmarks", "corpus"), help="Corpus directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Record a corpus (needs network access)")
+    record_parser.add_argument("--site", required=True, help="Website URL to record")
+    record_parser.add_argument("--keyword", required=True, help="Keyword the tasks are run for")
+    record_parser.add_argument("--competitors", default="", help="Comma-separated competitor URLs to record")
+    record_parser.add_argument("--urls", default="", help="Comma-separated extra URLs to record")
+    record_parser.add_argument("--crawl", type=int, default=30, help="Internal pages of the site to crawl and record")
+
+    run_parser = commands.add_parser("run", help="Replay the corpus and time the tasks (no network needed)")
+    run_parser.add_argument("--tasks", default=",".join(DEFAULT_TASKS),
+                            help=f"Comma-separated task types ({', '.join(BENCHMARK_TASKS)})")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Runs per task; medians are reported")
+    run_parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per stub LLM call")
+    run_parser.add_argument("--max-visits", type=int, default=3, help="Pages the stub agent opens per browsing step")
+    run_parser.add_argument("--warm-cache", action="store_true", help="Share the page and LLM caches between runs")
+    run_parser.add_argument("--history", default=os.path.join("benchmarks", "history.jsonl"), help="History file")
+    run_parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Slowdown of a task's median over the previous run that counts as a regression")
+    run_parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    """Entry point for the benchmark"""
+    args = parse_args(argv)
+    corpus = Corpus(args.corpus)
+
+    if args.command == "record":
+        competitors = [url.strip() for url in args.competitors.split(",") if url.strip()]
+        extra = [url.strip() for url in args.urls.split(",") if url.strip()]
+        await record(corpus, args.site, args.keyword, competitors, args.crawl, extra)
+        print(f"Recorded {len(corpus.pages)} page(s) to {corpus.path}")
+        return 0
+
+    if not corpus.pages:
+        print(f"No corpus at {corpus.path}; record one first with `python benchmark.py record`")
+        return 1
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = [task for task in tasks if task not in BENCHMARK_TASKS]
+    if unknown:
+        print(f"Unknown task(s): {', '.join(unknown)}. Choose from: {', '.join(BENCHMARK_TASKS)}")
+        return 1
+
+    entry = await run_benchmark(corpus, tasks, args.repeat, args.llm_latency, args.max_visits, args.warm_cache)
+    previous = next(
+        (old for old in reversed(load_history(args.history))
+         if old["corpus"] == entry["corpus"] and old["settings"] == entry["settings"]),
+        None,
+    )
+    print()
+    print_table(entry, previous)
+
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"\nAppended to {args.history}")
+
+    regressions = find_regressions(entry, previous, args.threshold)
+    for task, (old, new) in regressions.items():
+        print(f"REGRESSION {task}: median {old:.2f}s -> {new:.2f}s")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
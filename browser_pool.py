@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Long-lived browser pool shared by the SEO agents
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from browser_use import Browser, BrowserConfig, BrowserContextConfig
+
+
+class BrowserPool:
+    """
+    Keeps a single browser process warm and hands out fresh contexts to agent runs.
+
+    Each run gets its own context (clean cookies, storage and tabs), but the
+    browser process, and with it the DNS and TLS session caches, survives
+    between runs so back-to-back analyses skip the Chromium cold start.
+    """
+
+    def __init__(self, headless=False, max_contexts=1, browser_path=None, context_config=None):
+        """
+        Args:
+            headless (bool): Whether to run the browser in headless mode
+            max_contexts (int): Maximum number of contexts handed out at the same time
+            browser_path (str): Optional path to a Chromium-based browser binary
+            context_config (BrowserContextConfig): Settings applied to every new context
+        """
+        self.headless = headless
+        self.max_contexts = max(1, int(max_contexts))
+        self.browser_path = browser_path
+        self.context_config = context_config or BrowserContextConfig()
+        self.browser = None
+        self._slots = None
+        self._lock = None
+        self._active = set()
+
+    async def start(self):
+        """Launch the browser if it is not running yet"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_contexts)
+
+        async with self._lock:
+            if self.browser is not None:
+                return self.browser
+
+            config_kwargs = {
+                "headless": self.headless,
+                "keep_alive": True,
+                "disable_security": False,
+                "new_context_config": self.context_config,
+            }
+            if self.browser_path:
+                config_kwargs["browser_binary_path"] = self.browser_path
+
+            self.browser = Browser(config=BrowserConfig(**config_kwargs))
+            # Launch the underlying Playwright browser now rather than on first use
+            await self.browser.get_playwright_browser()
+            return self.browser
+
+    async def acquire(self):
+        """Wait for a free slot and return a fresh browser context"""
+        await self.start()
+        await self._slots.acquire()
+        try:
+            context = await self.browser.new_context(self.context_config)
+        except Exception:
+            self._slots.release()
+            raise
+        self._active.add(context)
+        return context
+
+    async def release(self, context):
+        """Close a context handed out by acquire() and free its slot"""
+        if context not in self._active:
+            return
+        self._active.discard(context)
+        try:
+            await context.close()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def context(self):
+        """Async context manager wrapping acquire()/release()"""
+        context = await self.acquire()
+        try:
+            yield context
+        finally:
+            await self.release(context)
+
+    async def close(self):
+        """Close any open contexts and shut the browser down"""
+        for context in list(self._active):
+            await self.release(context)
+
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
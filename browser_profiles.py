@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Named browser profiles for agent runs, plus per-task page-load statistics
+
+"demo" is tuned for watching the agent work (slow motion, video, generous
+timeouts). "performance" is for headless analysis: no slow motion or video,
+tighter timeouts, and fonts, media, ads and trackers are blocked through
+request interception.
+"""
+import statistics
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from browser_use import BrowserContextConfig
+
+from stage_timing import NAVIGATION, current_trace
+
+# Ad, analytics and tag-manager hosts; subdomains are matched too
+TRACKER_DOMAINS = frozenset({
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "connect.facebook.net",
+    "facebook.net", "hotjar.com", "clarity.ms", "bat.bing.com", "snap.licdn.com", "analytics.tiktok.com",
+    "scorecardresearch.com", "quantserve.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "amazon-adsystem.com", "adsrvr.org", "pubmatic.com", "rubiconproject.com",
+    "moatads.com", "segment.com", "segment.io", "mixpanel.com", "mc.yandex.ru", "hs-analytics.net",
+    "newrelic.com", "nr-data.net", "fullstory.com", "mouseflow.com", "crazyegg.com",
+})
+
+# Evaluated on every page "load" event; performance.memory is Chromium-only
+_PAGE_METRICS_JS = """
+() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    return {
+        url: location.href,
+        load_ms: nav && nav.loadEventEnd > 0 ? nav.loadEventEnd : performance.now(),
+        transfer_bytes: (nav ? nav.transferSize : 0) + resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+        js_heap_bytes: performance.memory ? performance.memory.usedJSHeapSize : null,
+    };
+}
+"""
+
+
+def is_tracker(url):
+    """Whether a request URL points at a known ad or tracking host"""
+    host = urlparse(url).hostname or ""
+    parts = host.split(".")
+    return any(".".join(parts[i:]) in TRACKER_DOMAINS for i in range(len(parts) - 1))
+
+
+@dataclass(frozen=True)
+class BrowserProfile:
+    """Browser and context settings applied to every agent run"""
+    name: str
+    slow_mo: int = 0  # ms added to every browser action
+    record_video: bool = False
+    default_timeout: int = 60000  # ms per action
+    navigation_timeout: int = 60000  # ms per page navigation
+    blocked_resource_types: frozenset = field(default_factory=frozenset)  # Playwright resource types
+    block_trackers: bool = False
+    allowed_hosts: frozenset = None  # when set, requests to any other host are blocked (offline runs)
+    # How long browser-use waits for a page to settle before reading it (seconds)
+    minimum_wait_page_load_time: float = 0.5
+    wait_for_network_idle_page_load_time: float = 1.0
+    maximum_wait_page_load_time: float = 5.0
+
+    @property
+    def intercepts_requests(self):
+        return bool(self.blocked_resource_types or self.block_trackers or self.allowed_hosts is not None)
+
+    def block_reason(self, request):
+        """Why a Playwright request should be aborted, or None to let it through"""
+        host = urlparse(request.url).hostname
+        if self.allowed_hosts is not None and host and host not in self.allowed_hosts:
+            return "offline"
+        if request.resource_type in self.blocked_resource_types:
+            return request.resource_type
+        if self.block_trackers and is_tracker(request.url):
+            return "tracker"
+        return None
+
+    def context_config(self):
+        """BrowserContextConfig for the browser pool"""
+        return BrowserContextConfig(
+            minimum_wait_page_load_time=self.minimum_wait_page_load_time,
+            wait_for_network_idle_page_load_time=self.wait_for_network_idle_page_load_time,
+            maximum_wait_page_load_time=self.maximum_wait_page_load_time,
+        )
+
+
+PROFILES = {
+    "demo": BrowserProfile(
+        name="demo",
+        slow_mo=100,  # Slow down actions by 100ms for better visibility
+        record_video=True,  # Record video of the browser session
+    ),
+    "performance": BrowserProfile(
+        name="performance",
+        default_timeout=15000,
+        navigation_timeout=20000,
+        blocked_resource_types=frozenset({"font", "media"}),
+        block_trackers=True,
+        minimum_wait_page_load_time=0.1,
+        wait_for_network_idle_page_load_time=0.3,
+        maximum_wait_page_load_time=3.0,
+    ),
+}
+
+
+def get_profile(profile):
+    """Look up a profile by name; BrowserProfile instances are returned unchanged"""
+    if isinstance(profile, BrowserProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown browser profile {profile!r} (choose from {', '.join(PROFILES)})") from None
+
+
+class ProfileStats:
+    """
+    Page-load time, transfer size, JS heap and blocked requests for one task.
+
+    attach() installs the profile's timeouts and request blocking on the
+    task's Playwright context and records metrics on every page load.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.requests = 0
+        self.blocked = {}  # reason -> count
+        self.page_loads = []  # one metrics dict per page load
+        self.trace = None  # TaskTrace page loads are added to as navigation spans
+
+    async def attach(self, browser_context):
+        """Hook into a browser-use BrowserContext handed out by the pool"""
+        # Playwright events arrive outside the task's context, so keep hold of its trace
+        self.trace = current_trace()
+        session = await browser_context.get_session()
+        context = session.context
+        context.set_default_timeout(self.profile.default_timeout)
+        context.set_default_navigation_timeout(self.profile.navigation_timeout)
+        context.on("request", self._on_request)
+        context.on("page", self._watch_page)
+        for page in context.pages:
+            self._watch_page(page)
+        if self.profile.intercepts_requests:
+            await context.route("**/*", self._route)
+
+    def _on_request(self, request):
+        self.requests += 1
+
+    def _watch_page(self, page):
+        async def on_load(loaded_page):
+            try:
+                metrics = await loaded_page.evaluate(_PAGE_METRICS_JS)
+            except Exception:
+                # The page navigated away or closed before it could be measured
+                return
+            self.page_loads.append(metrics)
+            if self.trace and metrics.get("load_ms"):
+                end = time.perf_counter()
+                self.trace.add(NAVIGATION, end - metrics["load_ms"] / 1000, end, url=metrics["url"])
+
+        page.on("load", on_load)
+
+    async def _route(self, route):
+        reason = self.profile.block_reason(route.request)
+        if reason:
+            self.blocked[reason] = self.blocked.get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def summary(self):
+        """Aggregated metrics for the report metadata"""
+        load_times = [load["load_ms"] for load in self.page_loads if load.get("load_ms")]
+        heaps = [load["js_heap_bytes"] for load in self.page_loads if load.get("js_heap_bytes")]
+        return {
+            "name": self.profile.name,
+            "pages_loaded": len(self.page_loads),
+            "median_load_ms": round(statistics.median(load_times)) if load_times else None,
+            "transfer_kb": round(sum(load.get("transfer_bytes") or 0 for load in self.page_loads) / 1024),
+            "peak_js_heap_mb": round(max(heaps) / 2 ** 20, 1) if heaps else None,
+            "requests": self.requests,
+            "blocked_requests": dict(self.blocked),
+        }
+
+
+def compare_profiles(current, baseline):
+    """
+    Saving of one profile summary over another (positive numbers are savings)
+
+    Returns:
+        dict: Baseline profile name and the load time, transfer and heap saved,
+            with None for metrics either run did not record
+    """
+    def saved(key):
+        if current.get(key) is None or baseline.get(key) is None:
+            return None
+        return round(baseline[key] - current[key], 1)
+
+    return {
+        "baseline": baseline.get("name"),
+        "load_ms_saved": saved("median_load_ms"),
+        "transfer_kb_saved": saved("transfer_kb"),
+        "js_heap_mb_saved": saved("peak_js_heap_mb"),
+    }
+
+
+def describe_profile_stats(summary):
+    """One-line summary of a task's browser metrics for the console"""
+    parts = [f"profile {summary['name']}", f"{summary['pages_loaded']} page load(s)"]
+    if summary.get("median_load_ms") is not None:
+        parts.append(f"median load {summary['median_load_ms']} ms")
+    if summary.get("peak_js_heap_mb") is not None:
+        parts.append(f"peak JS heap {summary['peak_js_heap_mb']} MB")
+    parts.append(f"{summary['transfer_kb']} KB transferred")
+    blocked = sum(summary["blocked_requests"].values())
+    if blocked:
+        parts.append(f"{blocked} of {summary['requests']} requests blocked")
+    line = "Browser: " + ", ".join(parts)
+
+    saving = summary.get("saving")
+    if saving:
+        savings = [
+            f"{label} {value:+g}{unit}"
+            for label, value, unit in (
+                ("load time", saving["load_ms_saved"], " ms"),
+                ("transfer", saving["transfer_kb_saved"], " KB"),
+                ("JS heap", saving["js_heap_mb_saved"], " MB"),
+            )
+            if value is not None
+        ]
+        if savings:
+            line += f" | saved vs last {saving['baseline']} run: " + ", ".join(savings)
+    return line
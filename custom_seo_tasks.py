@@ -2,10 +2,91 @@
 """
 Custom SEO tasks for use with the SEO agent
 """
+from dataclasses import dataclass
+from prompt_compaction import PromptCompactor
+from stage_timing import EXTRACTION, stage
+
+# Cheapest model for the many browsing and extraction steps, stronger one for the final synthesis
+NAVIGATION_MODEL = "gemini-1.5-flash-8b"
+SYNTHESIS_MODEL = "gemini-1.5-pro"
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Which model handles which steps of a numbered task"""
+    navigation_model: str = NAVIGATION_MODEL  # browser agent for the browsing and extraction steps
+    synthesis_model: str = SYNTHESIS_MODEL  # one plain LLM call for the remaining steps
+    synthesis_from: int = None  # first step that only reasons over earlier results; None means the last step
+    
+    def synthesis_steps(self, steps):
+        """Numbers of the steps handled by the synthesis pass"""
+        numbers = [number for number, _ in steps]
+        if self.synthesis_from is None:
+            return numbers[-1:]
+        return [number for number in numbers if number >= self.synthesis_from] or numbers[-1:]
+
 
 class SEOTasks:
     """Collection of SEO tasks that can be used with the SEO agent"""
     
+    # Model routing per task type; steps from synthesis_from on need no browsing
+    MODEL_ROUTES = {
+        "seo_analysis": ModelRoute(synthesis_from=4),
+        "competitor_analysis": ModelRoute(synthesis_from=4),
+        # Keyword and backlink tools are harder to operate than a SERP, so they get the regular model
+        "keyword_research": ModelRoute(navigation_model="gemini-1.5-flash", synthesis_from=4),
+        "serp_features": ModelRoute(synthesis_from=4),
+        "content_gap": ModelRoute(synthesis_from=4),
+        "technical_audit": ModelRoute(synthesis_from=5),
+        "backlink_analysis": ModelRoute(navigation_model="gemini-1.5-flash", synthesis_from=5),
+        "local_seo": ModelRoute(synthesis_from=4),
+    }
+    
+    @classmethod
+    def model_route(cls, task_type):
+        """Model routing for a task type, falling back to the default route"""
+        return cls.MODEL_ROUTES.get(task_type) or ModelRoute()
+    
+    @staticmethod
+    def prefetched_resources(pages, on_facts=None, compactor=None):
+        """
+        Context block listing resources that were already fetched over plain HTTP
+        
+        Every resource is reduced to a digest (see prompt_compaction); all digests
+        share the compactor's conversation budget, so long page lists are not cut off.
+        on_facts is an optional callback(page, PageFacts) for every HTML page.
+        """
+        if not pages:
+            return ""
+        compactor = compactor or PromptCompactor()
+        
+        with stage(EXTRACTION):
+            lines = [
+                "The following resources were already fetched and parsed for you. Use these",
+                "facts instead of visiting these URLs in the browser to inspect titles, meta",
+                "tags, headings, alt text, canonical tags, schema markup or links:",
+            ]
+            for i, page in enumerate(pages):
+                if page.rendered:
+                    lines.append(
+                        f"\n- {page.url} -> HTTP {page.status}, rendered in the browser "
+                        f"(client-side rendered page), {len(page.html)} bytes of DOM"
+                    )
+                else:
+                    lines.append(
+                        f"\n- {page.url} -> HTTP {page.status}, {len(page.html)} bytes, "
+                        f"{page.fetch_time * 1000:.0f} ms server response"
+                    )
+                max_chars = compactor.page_budget(len(pages) - i)
+                if "html" in page.content_type:
+                    facts = page.facts
+                    if on_facts:
+                        on_facts(page, facts)
+                    lines.append(compactor.digest(facts, max_chars, source_chars=len(page.html)))
+                else:
+                    lines.append(f"```\n{compactor.compact_resource(page.url, page.html, max_chars)}\n```")
+        return "\n".join(lines)
+    
     @staticmethod
     def analyze_serp_features(keyword):
         """Task to analyze SERP features for a keyword"""
@@ -35,7 +116,7 @@ class SEOTasks:
         """
     
     @staticmethod
-    def content_gap_analysis(website_url, keyword):
+    def content_gap_analysis(website_url, keyword, prefetched=""):
         """Task to perform content gap analysis"""
         return f"""
         Perform a content gap analysis for {website_url} related to "{keyword}":
@@ -49,6 +130,7 @@ class SEOTasks:
            - Content depth and comprehensiveness
         
         4. Create a list of topics/subtopics covered by competitors but missing from {website_url}
+           (start from the measured term gaps below where available)
         5. Identify unique content opportunities not currently addressed by competitors
         6. Develop a content plan to fill these gaps with:
            - Topic suggestions
@@ -58,28 +140,32 @@ class SEOTasks:
         
         7. Prioritize content opportunities based on potential impact and difficulty
         8. Save the analysis and content plan to a file
+        
+        {prefetched}
         """
     
     @staticmethod
-    def technical_seo_audit(website_url):
+    def technical_seo_audit(website_url, prefetched=""):
         """Task to perform a technical SEO audit"""
         return f"""
         Perform a technical SEO audit of {website_url}:
         
         1. Visit {website_url} and analyze:
-           - Page load speed (observe loading time)
+           - Page load speed (use the measured Core Web Vitals below where available
+             instead of judging loading time by eye)
            - Mobile responsiveness (resize browser window)
            - URL structure and navigation
            - Internal linking
            - Robots.txt (visit {website_url}/robots.txt)
-           - Sitemap (look for sitemap.xml link in robots.txt or footer)
+           - Sitemap (use the sitemap summary below where available; otherwise look for
+             a sitemap.xml link in robots.txt or the footer)
         
-        2. Check basic on-page SEO elements:
+        2. Check basic on-page SEO elements (use the pre-extracted facts below where available):
            - Title tags
            - Meta descriptions
            - Heading structure
            - Image alt attributes
-           - Schema markup (check page source)
+           - Schema markup
         
         3. Test key user experience factors:
            - Navigation usability
@@ -88,7 +174,7 @@ class SEOTasks:
            - Form functionality (if applicable)
            - Overall site structure
         
-        4. Identify technical issues such as:
+        4. Identify technical issues such as (use the crawl results below where available):
            - Broken links
            - Duplicate content
            - Canonicalization issues
@@ -99,6 +185,8 @@ class SEOTasks:
         6. Create a prioritized list of technical improvements
         
         7. Save the audit results and recommendations to a file
+        
+        {prefetched}
         """
     
     @staticmethod
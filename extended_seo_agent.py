@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 import asyncio
 import os
+import datetime
+import time
 from dotenv import load_dotenv
 from custom_seo_tasks import SEOTasks
-from advanced_seo_agent import SEOAgent
+from advanced_seo_agent import SEOAgent, FACTS_MAX_ITERATIONS, print_run_summary
+from incremental_audit import IncrementalAudit
+from results_store import site_key
+from site_crawler import SiteCrawler
+from sitemap_stream import SitemapStream, discover_sitemaps
+from near_duplicates import NearDuplicateIndex
+from topic_gap import TopicGapEngine
+from progress import tracked
+from stage_timing import CRAWL, stage
 
 # Load environment variables
 load_dotenv()
@@ -11,90 +21,173 @@ load_dotenv()
 class ExtendedSEOAgent(SEOAgent):
     """Extended SEO Agent with additional specialized tasks"""
     
+    @tracked("serp_features")
     async def run_serp_features_analysis(self, keyword):
         """Analyze SERP features for a keyword"""
         task = SEOTasks.analyze_serp_features(keyword)
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+        result = await self.run_task(task)
         
         # Save results
-        filename = f"{self.results_dir}/serp_features_{keyword.replace(' ', '_')}.md"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# SERP Features Analysis for '{keyword}'\n\n")
-            f.write(result)
-        
-        return {
-            "result": result,
-            "filename": filename
-        }
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.results_dir}/serp_features_{keyword.replace(' ', '_')}_{timestamp}"
+        return self.save_report(
+            "serp_features", f"SERP Features Analysis for '{keyword}'", result, filename, keyword=keyword,
+        )
     
-    async def run_content_gap_analysis(self, keyword, website_url):
-        """Run content gap analysis"""
-        task = SEOTasks.content_gap_analysis(website_url, keyword)
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+    @tracked("content_gap")
+    async def run_content_gap_analysis(self, keyword, website_url, competitors=None):
+        """Run content gap analysis, optionally measuring term and topic gaps against known competitor URLs"""
+        pages = await self.prefetch([website_url] + list(competitors or []))
+        prefetched = SEOTasks.prefetched_resources(pages, on_facts=self._facts_extracted) + "\n\n" + self.content_statistics(keyword, website_url, pages)
+        if competitors:
+            with stage(CRAWL):
+                prefetched += "\n\n" + await self.topic_gaps(website_url, pages)
+        task = SEOTasks.content_gap_analysis(website_url, keyword, prefetched)
+        result = await self.run_task(task, pages=pages)
         
         # Save results
-        filename = f"{self.results_dir}/content_gap_{keyword.replace(' ', '_')}.md"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Content Gap Analysis for '{keyword}' on {website_url}\n\n")
-            f.write(result)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.results_dir}/content_gap_{keyword.replace(' ', '_')}_{timestamp}"
+        return self.save_report(
+            "content_gap", f"Content Gap Analysis for '{keyword}' on {website_url}", result, filename,
+            keyword=keyword, website_url=website_url, pages=pages,
+        )
+    
+    async def topic_gaps(self, website_url, pages, crawl_pages=100, max_index_age=7 * 86400):
+        """
+        Competitor passages with no close match anywhere on our site
         
-        return {
-            "result": result,
-            "filename": filename
+        Our site's passage index is kept on disk and refreshed from a crawl of up
+        to crawl_pages pages once it is older than max_index_age seconds; only
+        pages whose text changed are embedded again.
+        """
+        engine = TopicGapEngine(os.path.join(self.cache_dir, "topic_gaps"))
+        # Host compared without "www.", so an apex <-> www redirect keeps our pages ours
+        target_host = site_key(website_url)
+        documents = {
+            page.final_url: page.facts.text
+            for page in pages
+            if "html" in page.content_type
         }
+        ours = {url: text for url, text in documents.items() if site_key(url) == target_host}
+        theirs = {url: text for url, text in documents.items() if url not in ours}
+        if not theirs:
+            return ""
+        
+        index = engine.site_index(website_url)
+        if time.time() - index.built_at > max_index_age:
+            crawler = SiteCrawler(max_pages=crawl_pages)
+            crawled = False
+            try:
+                await crawler.crawl(website_url, on_page=lambda page, facts: ours.setdefault(page.final_url, facts.text))
+                crawled = True
+            except Exception as e:
+                if self.verbose:
+                    print(f"Site crawl for topic gaps failed: {e}")
+            finally:
+                await crawler.close()
+            # A failed crawl saw only part of the site: refresh what it fetched but prune nothing,
+            # so the index stays due for a full rebuild on the next run
+            engine.index_site(website_url, ours, prune=crawled)
+        elif ours:
+            # Refresh the pages fetched for this run and keep the rest of the index
+            engine.index_site(website_url, ours, prune=False)
+        return TopicGapEngine.to_prompt(engine.gaps(website_url, theirs))
     
-    async def run_technical_seo_audit(self, website_url):
-        """Run technical SEO audit"""
-        task = SEOTasks.technical_seo_audit(website_url)
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+    @tracked("technical_audit")
+    async def run_technical_seo_audit(self, website_url, incremental=False, crawl_pages=200):
+        """
+        Run technical SEO audit
         
-        # Save results
-        filename = f"{self.results_dir}/technical_audit_{website_url.replace('https://', '').replace('http://', '').replace('/', '_')}.md"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Technical SEO Audit for {website_url}\n\n")
-            f.write(result)
+        With incremental=True the pages listed in the site's sitemaps are compared
+        with the previous audit (lastmod, ETag, content hash) and only new or
+        changed pages are re-analysed; findings for the rest are carried over.
         
-        return {
-            "result": result,
-            "filename": filename
-        }
+        Up to crawl_pages internal URLs are crawled over plain HTTP first to find
+        broken links, redirect chains, canonical problems and near-duplicate
+        content (0 disables the crawl). The site's sitemaps are streamed into the
+        crawl, so sitemap URLs that are broken, redirect or are orphaned show up too.
+        In incremental mode the sitemaps are read once, by the incremental audit,
+        and only the new and changed pages (plus as many of the URLs they link
+        to) are crawled; nothing is crawled if no page changed.
+        """
+        pages = await self.prefetch_site_files(website_url)
+        prefetched = SEOTasks.prefetched_resources(pages, on_facts=self._facts_extracted)
+        vitals = await self.measure_web_vitals(pages)
+        if vitals:
+            prefetched += "\n\n" + vitals
+        delta = seeds = None
+        if incremental:
+            audit = IncrementalAudit(self.page_fetcher, self.results_store)
+            with stage(CRAWL):
+                delta = await audit.run(website_url)
+            prefetched += "\n\n" + audit.sitemaps.to_prompt() + "\n" + delta.to_prompt()
+            if audit.sitemaps.stats["urls"]:
+                seeds = delta.rechecked_entries()
+            else:
+                # No sitemap to compare against: crawl the site as a full audit would
+                delta = None
+        if crawl_pages and (delta is None or delta.rechecked):
+            duplicates = NearDuplicateIndex()
+            sitemaps = None
+            if delta is None:
+                crawler = SiteCrawler(max_pages=crawl_pages)
+                if not incremental:
+                    sitemaps = SitemapStream(self.page_fetcher.client)
+                    seeds = sitemaps.entries(await discover_sitemaps(self.page_fetcher, website_url))
+            else:
+                # Seeds take at most half of max_pages, so every changed page fits next to its links
+                crawler = SiteCrawler(max_pages=min(crawl_pages, 2 * len(delta.rechecked) + 1))
+            try:
+                with stage(CRAWL):
+                    crawl = await crawler.crawl(
+                        website_url, on_page=lambda page, facts: duplicates.add(page.final_url, facts.text),
+                        sitemap_entries=seeds,
+                    )
+            finally:
+                await crawler.close()
+            # Changed pages alone say nothing about which sitemap URLs are linked from elsewhere
+            crawl.check_orphans = delta is None
+            prefetched += "\n\n" + (sitemaps.to_prompt() + "\n" if sitemaps else "")
+            prefetched += crawl.to_prompt() + "\n" + duplicates.to_prompt()
+        task = SEOTasks.technical_seo_audit(website_url, prefetched)
+        result = await self.run_task(task, max_iterations=FACTS_MAX_ITERATIONS if pages else 40, pages=pages)
+        
+        # Save results
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.results_dir}/technical_audit_{website_url.replace('https://', '').replace('http://', '').replace('/', '_')}_{timestamp}"
+        return self.save_report(
+            "technical_audit", f"Technical SEO Audit for {website_url}", result, filename,
+            website_url=website_url, pages=pages,
+        )
     
+    @tracked("backlink_analysis")
     async def run_backlink_analysis(self, keyword, website_url):
         """Run backlink analysis"""
         task = SEOTasks.backlink_analysis(website_url, keyword)
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+        result = await self.run_task(task)
         
         # Save results
-        filename = f"{self.results_dir}/backlink_analysis_{website_url.replace('https://', '').replace('http://', '').replace('/', '_')}.md"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Backlink Analysis for {website_url}\n\n")
-            f.write(result)
-        
-        return {
-            "result": result,
-            "filename": filename
-        }
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.results_dir}/backlink_analysis_{website_url.replace('https://', '').replace('http://', '').replace('/', '_')}_{timestamp}"
+        return self.save_report(
+            "backlink_analysis", f"Backlink Analysis for {website_url}", result, filename,
+            keyword=keyword, website_url=website_url,
+        )
     
+    @tracked("local_seo")
     async def run_local_seo_optimization(self, business_name, location, keyword):
         """Run local SEO optimization"""
         task = SEOTasks.local_seo_optimization(business_name, location, keyword)
-        agent = await self.setup_agent(task)
-        result = await agent.run()
+        result = await self.run_task(task)
         
         # Save results
-        filename = f"{self.results_dir}/local_seo_{location.replace(' ', '_')}_{keyword.replace(' ', '_')}.md"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Local SEO Optimization for {business_name} in {location}\n\n")
-            f.write(result)
-        
-        return {
-            "result": result,
-            "filename": filename
-        }
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{self.results_dir}/local_seo_{location.replace(' ', '_')}_{keyword.replace(' ', '_')}_{timestamp}"
+        return self.save_report(
+            "local_seo", f"Local SEO Optimization for {business_name} in {location}", result, filename,
+            keyword=keyword,
+        )
 
 async def main():
     """Main function to run the extended SEO agent"""
@@ -106,9 +199,12 @@ async def main():
     main_keyword = input("Enter the main target keyword: ")
     website_url = input("Enter your website URL: ")
     
-    # Create the extended SEO agent
-    seo_agent = ExtendedSEOAgent(headless=False, verbose=True)
-    
+    # Create the extended SEO agent; the browser stays open across tasks until exit
+    async with ExtendedSEOAgent(headless=False, verbose=True, max_contexts=3) as seo_agent:
+        await _menu_loop(seo_agent, main_keyword, website_url)
+
+async def _menu_loop(seo_agent, main_keyword, website_url):
+    """Interactive task menu for the extended SEO agent"""
     # Extended menu for selecting tasks
     while True:
         print("\nSEO Tasks Menu:")
@@ -123,9 +219,10 @@ async def main():
         print("6. Run technical SEO audit")
         print("7. Analyze backlink profile")
         print("8. Optimize for local SEO")
-        print("9. Exit")
+        print("9. Run all tasks")
+        print("10. Exit")
         
-        choice = input("\nSelect a task (1-9): ")
+        choice = input("\nSelect a task (1-10): ")
         
         if choice == "1":
             print(f"\nRunning comprehensive SEO analysis for '{main_keyword}' on {website_url}...")
@@ -150,13 +247,16 @@ async def main():
             print(f"\nSERP features analysis complete! Results saved to: {result['filename']}")
             
         elif choice == "5":
+            competitors_input = input("Enter competitor URLs (comma-separated) or press Enter to skip: ")
+            competitors = [url.strip() for url in competitors_input.split(",")] if competitors_input.strip() else None
             print(f"\nPerforming content gap analysis for '{main_keyword}' on {website_url}...")
-            result = await seo_agent.run_content_gap_analysis(main_keyword, website_url)
+            result = await seo_agent.run_content_gap_analysis(main_keyword, website_url, competitors)
             print(f"\nContent gap analysis complete! Results saved to: {result['filename']}")
             
         elif choice == "6":
+            incremental = input("Only re-check pages changed since the last audit? (y/N): ").strip().lower() == "y"
             print(f"\nRunning technical SEO audit for {website_url}...")
-            result = await seo_agent.run_technical_seo_audit(website_url)
+            result = await seo_agent.run_technical_seo_audit(website_url, incremental=incremental)
             print(f"\nTechnical SEO audit complete! Results saved to: {result['filename']}")
             
         elif choice == "7":
@@ -172,11 +272,33 @@ async def main():
             print(f"\nLocal SEO optimization complete! Results saved to: {result['filename']}")
             
         elif choice == "9":
+            competitors_input = input("Enter competitor URLs (comma-separated) or press Enter to skip: ")
+            competitors = [url.strip() for url in competitors_input.split(",")] if competitors_input.strip() else None
+            business_name = input("Enter business name (or press Enter to skip local SEO): ").strip()
+            location = input("Enter location (city, region): ").strip() if business_name else ""
+            
+            jobs = {
+                "SEO analysis": (seo_agent.run_seo_analysis, main_keyword, website_url),
+                "Competitor analysis": (seo_agent.run_competitor_analysis, main_keyword, website_url, competitors),
+                "Keyword research": (seo_agent.run_keyword_research, main_keyword, website_url),
+                "SERP features analysis": (seo_agent.run_serp_features_analysis, main_keyword),
+                "Content gap analysis": (seo_agent.run_content_gap_analysis, main_keyword, website_url, competitors),
+                "Technical SEO audit": (seo_agent.run_technical_seo_audit, website_url),
+                "Backlink analysis": (seo_agent.run_backlink_analysis, main_keyword, website_url),
+            }
+            if business_name:
+                jobs["Local SEO optimization"] = (seo_agent.run_local_seo_optimization, business_name, location, main_keyword)
+            
+            print(f"\nRunning {len(jobs)} SEO tasks for '{main_keyword}' on {website_url}...")
+            summary = await seo_agent.run_many(jobs)
+            print_run_summary(summary)
+            
+        elif choice == "10":
             print("\nExiting SEO Agent. Goodbye!")
             break
             
         else:
-            print("\nInvalid choice. Please select a number between 1-9.")
+            print("\nInvalid choice. Please select a number between 1-10.")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
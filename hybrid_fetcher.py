@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Hybrid fetcher: plain HTTP first, a browser render only when the page needs one
+
+robots.txt, sitemaps and most server-rendered pages are complete in the
+HTTP response, so they never need Chromium. A page is rendered in the
+browser pool only when its HTTP body looks like a client-side rendered
+shell: (almost) no visible text next to an empty SPA mount point, a
+"please enable JavaScript" notice, or a body that is nothing but scripts.
+Rendered pages are cached under their own key, so a repeat audit renders
+a page at most once per cache TTL.
+"""
+import re
+import time
+from collections import Counter
+
+from page_cache import FetchedPage, SingleFlight
+from stage_timing import stage
+
+# Stage name of browser renders made by the fetcher
+RENDER = "render"
+
+# Options the rendered copy of a page is cached under, next to the plain HTTP copy
+RENDER_OPTIONS = {"render": "browser"}
+
+# Below this many words of visible text a page is thin enough to check for a client-side shell
+MIN_WORDS = 60
+
+# Empty mount points of the common client-side frameworks
+_EMPTY_MOUNT = re.compile(
+    r"<(?:div|main|app-root)[^>]*\b(?:id=[\"']?(?:root|app|__next|__nuxt|___gatsby|svelte)(?=[\"'\s>])"
+    r"|ng-version=|data-reactroot)[^>]*>\s*(?:<!--.*?-->\s*)*</(?:div|main|app-root)>",
+    re.IGNORECASE | re.DOTALL,
+)
+_FRAMEWORK_STATE = re.compile(r"window\.__(?:INITIAL_STATE|NUXT|APOLLO_STATE|PRELOADED_STATE)__|\bng-app\b", re.IGNORECASE)
+_NOSCRIPT_NOTICE = re.compile(r"<noscript[^>]*>[^<]*(?:enable|turn on)\s+javascript", re.IGNORECASE)
+_SCRIPT = re.compile(r"<script\b", re.IGNORECASE)
+
+
+def render_reason(page, min_words=MIN_WORDS):
+    """
+    Why a page fetched over HTTP needs a browser render, or None if it does not
+
+    Only HTML pages with little visible text are candidates; a thin page
+    without SPA markers (a short but complete landing page) is kept as is.
+    """
+    if "html" not in page.content_type or page.status >= 400:
+        return None
+    if not page.html.strip():
+        return "empty body"
+    if page.facts.word_count >= min_words:
+        return None
+    if _EMPTY_MOUNT.search(page.html):
+        return "empty app mount point"
+    if _NOSCRIPT_NOTICE.search(page.html):
+        return "requires JavaScript"
+    if _FRAMEWORK_STATE.search(page.html):
+        return "client-side framework state"
+    if page.facts.word_count == 0 and _SCRIPT.search(page.html):
+        return "script-only body"
+    return None
+
+
+class HybridFetcher:
+    """
+    Fetches pages through a PageFetcher and renders the ones that need it in the browser pool.
+
+    Counts how many pages were served from the HTTP response and how many
+    had to be rendered, and why.
+    """
+
+    def __init__(self, fetcher, browser_pool, render_timeout=30000, min_words=MIN_WORDS):
+        """
+        Args:
+            fetcher (PageFetcher): Pooled, cached HTTP fetcher tried first
+            browser_pool (BrowserPool): Pool the fallback renders borrow a context from
+            render_timeout (int): Navigation timeout of a render in milliseconds
+            min_words (int): Visible words above which a page is never rendered
+        """
+        self.fetcher = fetcher
+        self.browser_pool = browser_pool
+        self.render_timeout = render_timeout
+        self.min_words = min_words
+        self.single_flight = SingleFlight()
+        self.paths = Counter()  # "http" / "browser" -> pages
+        self.reasons = Counter()  # render reason -> pages
+        self.render_failures = 0
+
+    async def fetch(self, url):
+        """
+        Fetch a URL over HTTP and, if its body is a client-side shell, render it
+
+        Returns:
+            FetchedPage: The HTTP page, or the rendered one (page.rendered is True)
+        """
+        page = await self.fetcher.fetch(url)
+        reason = render_reason(page, self.min_words)
+        if reason is None:
+            self.paths["http"] += 1
+            return page
+
+        self.reasons[reason] += 1
+        cache = self.fetcher.cache
+        key = cache.key_for(url, RENDER_OPTIONS) if cache else url
+        try:
+            rendered = await self.single_flight.do(key, lambda: self._render(url, page))
+        except Exception:
+            # No browser or the render failed: the HTTP body is still better than nothing
+            self.render_failures += 1
+            self.paths["http"] += 1
+            return page
+        self.paths["browser"] += 1
+        return rendered
+
+    async def _render(self, url, page):
+        cache = self.fetcher.cache
+        cached = cache.get(url, RENDER_OPTIONS) if cache else None
+        if cached and cache.is_fresh(cached):
+            cached.rendered = True
+            return cached
+
+        with stage(RENDER, url=url):
+            async with self.browser_pool.context() as browser_context:
+                session = await browser_context.get_session()
+                tab = await session.context.new_page()
+                try:
+                    start = time.perf_counter()
+                    response = await tab.goto(url, wait_until="networkidle", timeout=self.render_timeout)
+                    html = await tab.content()
+                    elapsed = time.perf_counter() - start
+                    final_url = tab.url
+                finally:
+                    await tab.close()
+
+        rendered = FetchedPage(
+            url=url,
+            final_url=final_url,
+            status=response.status if response else page.status,
+            headers=dict(page.headers, **{"content-type": "text/html; charset=utf-8"}),
+            html=html,
+            fetch_time=elapsed,
+            fetched_at=time.time(),
+            rendered=True,
+        )
+        if cache:
+            cache.put(rendered, RENDER_OPTIONS)
+        return rendered
+
+    def stats(self):
+        """Pages per path, the fraction of each, and why pages were rendered"""
+        total = sum(self.paths.values())
+        return {
+            "pages": total,
+            "http": self.paths["http"],
+            "browser": self.paths["browser"],
+            "http_share": round(self.paths["http"] / total, 3) if total else None,
+            "browser_share": round(self.paths["browser"] / total, 3) if total else None,
+            "render_reasons": dict(self.reasons),
+            "render_failures": self.render_failures,
+        }
+
+    def describe(self):
+        """One-line summary of the fetch paths for the console"""
+        stats = self.stats()
+        if not stats["pages"]:
+            return "Fetch paths: no pages fetched"
+        line = (f"Fetch paths: {stats['http']} of {stats['pages']} page(s) over plain HTTP "
+                f"({stats['http_share']:.0%}), {stats['browser']} rendered in the browser ({stats['browser_share']:.0%})")
+        if stats["render_reasons"]:
+            line += "; render reasons: " + ", ".join(f"{reason} ({n})" for reason, n in self.reasons.most_common())
+        if stats["render_failures"]:
+            line += f"; {stats['render_failures']} render(s) failed, HTTP body used"
+        return line
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Incremental technical audit: only re-analyse pages that changed since the last run
+"""
+import asyncio
+import datetime
+from dataclasses import dataclass, field
+
+from sitemap_stream import SitemapEntry, SitemapStream, discover_sitemaps
+
+
+@dataclass
+class AuditDelta:
+    """What changed on a site since the previous incremental audit"""
+    website_url: str
+    new: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    findings: dict = field(default_factory=dict)  # url -> list of issues, fresh and cached
+    removals_checked: bool = True  # False when the sitemaps were not read completely
+
+    @property
+    def rechecked(self):
+        return self.new + self.changed
+
+    async def rechecked_entries(self):
+        """The new and changed pages as SitemapEntry records, e.g. to seed a SiteCrawler with"""
+        for url in self.rechecked:
+            yield SitemapEntry(url)
+
+    def to_prompt(self, max_pages=25):
+        """Summary of the incremental audit for the LLM"""
+        lines = [
+            f"Incremental audit of {self.website_url} against the previous run:",
+            f"- {len(self.new)} new, {len(self.changed)} changed, {len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed, {len(self.failed)} could not be fetched",
+        ]
+
+        issue_counts = {}
+        for issues in self.findings.values():
+            for issue in issues:
+                # Group issues that only differ in their numbers
+                label = issue.split(":")[0]
+                issue_counts[label] = issue_counts.get(label, 0) + 1
+        if issue_counts:
+            lines.append("- Site-wide issue counts (all pages, including unchanged ones from the previous run):")
+            for label, count in sorted(issue_counts.items(), key=lambda item: -item[1]):
+                lines.append(f"  - {label}: {count} page(s)")
+
+        if self.rechecked:
+            lines.append("- Issues on new or changed pages (focus your review on these):")
+            for url in self.rechecked[:max_pages]:
+                issues = self.findings.get(url) or ["no issues detected"]
+                lines.append(f"  - {url}: {'; '.join(issues)}")
+            if len(self.rechecked) > max_pages:
+                lines.append(f"  - ... and {len(self.rechecked) - max_pages} more")
+        if self.removed:
+            lines.append(f"- Removed from the sitemap: {', '.join(self.removed[:max_pages])}")
+        if not self.removals_checked:
+            lines.append("- Removed pages not checked: the sitemaps could not be read completely")
+        if self.failed:
+            lines.append("- Fetch failures: " + "; ".join(f"{url} ({error})" for url, error in list(self.failed.items())[:max_pages]))
+        return "\n".join(lines)
+
+
+class IncrementalAudit:
+    """
+    Re-audits only the pages of a site that are new or changed.
+
+    The sitemap ``lastmod`` is checked first: if it matches the previous run
+    the page is not fetched at all. Otherwise the page is fetched and its ETag
+    and content hash are compared with the stored snapshot, and only pages
+    whose content actually changed are parsed again. Findings for unchanged
+    pages are carried over from the results store.
+
+    Pages are only reported (and forgotten) as removed after a complete read
+    of the sitemaps; a capped or partly failed read keeps their snapshots.
+    """
+
+    def __init__(self, fetcher, store, max_pages=5000, concurrency=10):
+        self.fetcher = fetcher
+        self.store = store
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.sitemaps = None  # SitemapStream of the last run, for its counters and failures
+
+    async def sitemap_entries(self, website_url):
+        """
+        The first max_pages <url> records reachable from the site's sitemaps, following sitemap indexes
+
+        Sitemaps are streamed (see sitemap_stream), so the download stops once
+        max_pages distinct URLs have been read.
+
+        Returns:
+            tuple: (list of SitemapEntry, True if every sitemap was read to the end)
+        """
+        stream = self.sitemaps = SitemapStream(self.fetcher.client)
+        records = stream.entries(await discover_sitemaps(self.fetcher, website_url))
+        entries, seen_urls, capped = [], set(), False
+        try:
+            async for entry in records:
+                if entry.loc not in seen_urls:
+                    seen_urls.add(entry.loc)
+                    entries.append(entry)
+                    if len(entries) >= self.max_pages:
+                        capped = True
+                        break
+        finally:
+            await records.aclose()
+        return entries, not (capped or stream.failed or stream.truncated)
+
+    async def run(self, website_url):
+        """Audit the site incrementally and persist the new snapshots"""
+        entries, complete = await self.sitemap_entries(website_url)
+        if not entries:
+            # No sitemap (or it could not be read): check the home page, but nothing counts as removed
+            entries, complete = [SitemapEntry(website_url)], False
+        previous = self.store.page_snapshots(website_url)
+        delta = AuditDelta(website_url)
+        snapshots = []
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(entry):
+            old = previous.get(entry.loc)
+            if old and entry.lastmod and entry.lastmod == old["lastmod"]:
+                delta.unchanged.append(entry.loc)
+                delta.findings[entry.loc] = old["findings"]
+                return
+
+            async with semaphore:
+                try:
+                    # Past the lastmod check the page must come from the site, not the TTL cache
+                    page = await self.fetcher.fetch(entry.loc, use_cache=False)
+                except Exception as e:
+                    delta.failed[entry.loc] = str(e)
+                    if old:
+                        delta.findings[entry.loc] = old["findings"]
+                    return
+
+            snapshot = {
+                "url": entry.loc,
+                "lastmod": entry.lastmod,
+                "etag": page.etag,
+                "audited_at": now,
+            }
+            if old and ((page.etag and page.etag == old["etag"]) or page.content_hash == old["content_hash"]):
+                delta.unchanged.append(entry.loc)
+                snapshot["content_hash"] = old["content_hash"]
+                snapshot["findings"] = old["findings"]
+            else:
+                (delta.changed if old else delta.new).append(entry.loc)
+                snapshot["content_hash"] = page.content_hash
+                if page.status >= 400:
+                    snapshot["findings"] = [f"HTTP status: {page.status}"]
+                else:
+                    snapshot["findings"] = page.facts.issues()
+            delta.findings[entry.loc] = snapshot["findings"]
+            snapshots.append(snapshot)
+
+        await asyncio.gather(*(check(entry) for entry in entries))
+
+        if complete:
+            current = {entry.loc for entry in entries}
+            delta.removed = sorted(url for url in previous if url not in current)
+        delta.removals_checked = complete
+        self.store.save_page_snapshots(website_url, snapshots, removed=delta.removed)
+        return delta
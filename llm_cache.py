@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+LLM response cache for the SEO agents
+
+The task prompts are deterministic for a given keyword and URL, so reruns
+against unchanged pages can be answered from disk instead of another paid
+Gemini round trip.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+
+class LLMCacheBackend(ABC):
+    """
+    Storage interface for cached LLM responses; subclass to plug in another store
+
+    A subclass that leaves one of the abstract methods out cannot be
+    instantiated, so an incomplete backend fails when it is created.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """Return the stored payload for key, or None if missing or expired"""
+
+    @abstractmethod
+    def put(self, key, payload):
+        """Store the payload under key"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every stored payload"""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of stored payloads"""
+
+    def close(self):
+        """Release the backend's resources; nothing to do by default"""
+
+
+class InMemoryLLMCacheBackend(LLMCacheBackend):
+    """Process-local backend, mostly useful for tests and benchmarks"""
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, payload = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            # Re-insert to keep dict order as least-recently-used first
+            self._entries[key] = self._entries.pop(key)
+            return payload
+
+    def put(self, key, payload):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), payload)
+            while self.max_entries is not None and len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteLLMCacheBackend(LLMCacheBackend):
+    """Default backend: a single SQLite file with TTL expiry and LRU size eviction"""
+
+    def __init__(self, path="seo_cache/llm_cache.db", ttl=7 * 24 * 3600, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # LangChain may call the cache from executor threads
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self.db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT payload, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and time.time() - row[1] > self.ttl:
+                self.db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            return row[0]
+
+    def put(self, key, payload):
+        now = time.time()
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            if self.max_entries is not None:
+                self.db.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+            self.db.commit()
+
+    def clear(self):
+        with self._lock:
+            self.db.execute("DELETE FROM llm_cache")
+            self.db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache keyed on model, parameters, message history and page snapshot.
+
+    ``llm_string`` already carries the model name and its parameters and
+    ``prompt`` the serialized message history; ``page_hash`` adds a
+    fingerprint of the pages the task was built from, so a changed page
+    never gets an answer computed for the old one.
+    """
+
+    def __init__(self, backend=None, page_hash="", stats=None):
+        self.backend = backend if backend is not None else SQLiteLLMCacheBackend()
+        self.page_hash = page_hash
+        # Shared between scoped views so totals cover every task
+        self._stats = stats if stats is not None else {"hits": 0, "misses": 0}
+
+    def scoped(self, page_hash):
+        """A view of this cache for a task built from a particular page snapshot"""
+        return LLMResponseCache(self.backend, page_hash, self._stats)
+
+    @staticmethod
+    def page_fingerprint(pages):
+        """Stable hash over the contents of a list of FetchedPage objects"""
+        digest = hashlib.sha256()
+        for page in sorted(pages, key=lambda p: p.url):
+            digest.update(page.url.encode("utf-8"))
+            digest.update(page.content_hash.encode("ascii"))
+        return digest.hexdigest()
+
+    def _key(self, prompt, llm_string):
+        payload = "\x00".join((llm_string, self.page_hash, prompt))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        payload = self.backend.get(self._key(prompt, llm_string))
+        if payload is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        generations = [loads(generation) for generation in json.loads(payload)]
+        # Lets usage accounting tell cache hits from paid calls
+        for generation in generations:
+            generation.generation_info = dict(generation.generation_info or {}, from_cache=True)
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        self.backend.put(
+            self._key(prompt, llm_string),
+            json.dumps([dumps(generation) for generation in return_val]),
+        )
+
+    def clear(self, **kwargs):
+        self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process plus the number of stored entries"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self.backend),
+        }
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Token and cost accounting for the agents' LLM calls, with budgets
+
+Every LLM call made by an agent is recorded in a per-task UsageLedger
+(prompt and completion tokens, latency, cost, failed calls), which rolls up
+into the agent-wide ledger that spans a whole batch. Budgets on either
+level stop the task, or first move it to a cheaper model, once exceeded.
+"""
+import time
+from dataclasses import dataclass, asdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from stage_timing import LLM_CALL, record_span
+
+# USD per million tokens (prompts up to 128k tokens); update when pricing changes
+MODEL_PRICES = {
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+}
+
+# Cheaper model a task is moved to when its budget policy is "downgrade"
+DOWNGRADE_MODELS = {
+    "gemini-1.5-pro": "gemini-1.5-flash",
+    "gemini-1.5-flash": "gemini-1.5-flash-8b",
+}
+
+
+class BudgetExceeded(Exception):
+    """Raised when a task or batch has used up its token or cost budget"""
+
+
+def call_cost(model, input_tokens, output_tokens):
+    """Cost of one call in USD, or None for a model without a known price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
+
+@dataclass
+class TokenBudget:
+    """
+    Token and/or cost limit for a task or a batch
+
+    on_exceed="stop" stops at the limit. on_exceed="downgrade" moves the
+    task to the next cheaper model at the limit and only stops once usage
+    reaches hard_limit times the budget.
+    """
+    max_tokens: int = None
+    max_cost_usd: float = None
+    on_exceed: str = "stop"
+    hard_limit: float = 1.5
+
+    def __post_init__(self):
+        if self.on_exceed not in ("stop", "downgrade"):
+            raise ValueError(f"on_exceed must be 'stop' or 'downgrade', not {self.on_exceed!r}")
+
+    def fraction_used(self, totals):
+        """Highest share of the token or cost limit used so far"""
+        fractions = [0.0]
+        if self.max_tokens:
+            fractions.append((totals["input_tokens"] + totals["output_tokens"]) / self.max_tokens)
+        if self.max_cost_usd:
+            fractions.append(totals["cost_usd"] / self.max_cost_usd)
+        return max(fractions)
+
+
+class UsageLedger:
+    """
+    Running LLM usage totals for a task (or, with a parent of None, an agent or batch).
+
+    Task ledgers keep one record per call; every record is also added to
+    the parent's totals.
+    """
+
+    def __init__(self, name, budget=None, parent=None, keep_calls=True):
+        self.name = name
+        self.budget = budget
+        self.parent = parent
+        self.keep_calls = keep_calls
+        self.calls = []
+        self.totals = {
+            "calls": 0, "cached_calls": 0, "failed_calls": 0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "latency_s": 0.0,
+        }
+        self.by_step = {}
+        self.current_step = None  # numbered task step the next calls belong to
+        self.models = set()
+        self.downgraded_to = None
+        self.stopped = None  # reason, once the budget stopped the task
+
+    def chain(self):
+        """This ledger and its ancestors"""
+        ledger = self
+        while ledger is not None:
+            yield ledger
+            ledger = ledger.parent
+
+    def _add(self, totals, call):
+        totals["calls"] += 1
+        totals["cached_calls"] += call["cached"]
+        totals["input_tokens"] += call["input_tokens"]
+        totals["output_tokens"] += call["output_tokens"]
+        totals["cost_usd"] += call["cost_usd"] or 0.0
+        totals["latency_s"] += call["latency_s"]
+
+    def record(self, call):
+        """Add one call: {model, input_tokens, output_tokens, cost_usd, latency_s, cached}"""
+        call = dict(call, step=self.current_step)
+        for ledger in self.chain():
+            ledger.models.add(call["model"])
+            ledger._add(ledger.totals, call)
+        if self.keep_calls:
+            self.calls.append(call)
+        step = self.by_step.setdefault(str(self.current_step or "task"), {
+            "calls": 0, "cached_calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "latency_s": 0.0,
+        })
+        self._add(step, call)
+
+    def record_failure(self):
+        """A call that raised; the agent retries failed steps"""
+        for ledger in self.chain():
+            ledger.totals["failed_calls"] += 1
+
+    def check_budget(self):
+        """
+        Enforce this ledger's and its ancestors' budgets before a call
+
+        Returns:
+            bool: Whether a "downgrade" budget is exceeded and the task should
+                move to a cheaper model
+
+        Raises:
+            BudgetExceeded: If a budget is used up
+        """
+        switch = False
+        for ledger in self.chain():
+            if ledger.budget is None:
+                continue
+            used = ledger.budget.fraction_used(ledger.totals)
+            limit = ledger.budget.hard_limit if ledger.budget.on_exceed == "downgrade" else 1.0
+            if used >= limit:
+                self.stopped = (
+                    f"{ledger.name} budget exhausted: {ledger.totals['input_tokens'] + ledger.totals['output_tokens']} "
+                    f"tokens, ${ledger.totals['cost_usd']:.4f}"
+                )
+                raise BudgetExceeded(self.stopped)
+            if used >= 1.0:
+                switch = True
+        return switch
+
+    def raise_if_stopped(self):
+        if self.stopped:
+            raise BudgetExceeded(self.stopped)
+
+    def summary(self):
+        """Totals for the report metadata"""
+        totals = dict(self.totals)
+        totals["total_tokens"] = totals["input_tokens"] + totals["output_tokens"]
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        totals["latency_s"] = round(totals["latency_s"], 2)
+        summary = {"name": self.name, "models": sorted(self.models), **totals}
+        if len(self.by_step) > 1 or "task" not in self.by_step:
+            summary["by_step"] = {
+                step: dict(values, cost_usd=round(values["cost_usd"], 6), latency_s=round(values["latency_s"], 2))
+                for step, values in self.by_step.items()
+            }
+        if self.budget:
+            summary["budget"] = asdict(self.budget)
+        if self.downgraded_to:
+            summary["downgraded_to"] = self.downgraded_to
+        if self.stopped:
+            summary["stopped"] = self.stopped
+        return summary
+
+    def describe(self):
+        """One-line console summary"""
+        totals = self.totals
+        line = (
+            f"LLM usage ({self.name}): {totals['calls']} call(s), {totals['input_tokens']} prompt + "
+            f"{totals['output_tokens']} completion tokens, ${totals['cost_usd']:.4f}, {totals['latency_s']:.1f}s"
+        )
+        if totals["cached_calls"]:
+            line += f", {totals['cached_calls']} from cache"
+        if totals["failed_calls"]:
+            line += f", {totals['failed_calls']} failed"
+        if self.downgraded_to:
+            line += f", downgraded to {self.downgraded_to}"
+        return line
+
+
+class UsageTracker(BaseCallbackHandler):
+    """
+    LangChain callback recording every call of one LLM client into a ledger
+
+    Budgets are checked before each call; the tracker raises BudgetExceeded
+    (which LangChain propagates because raise_error is set) or switches the
+    client to the next cheaper model.
+    """
+
+    run_inline = True
+    raise_error = True
+
+    def __init__(self, ledger, llm=None):
+        self.ledger = ledger
+        self.llm = llm
+        self._started = {}
+
+    def _model(self):
+        return getattr(self.llm, "model", None) or "unknown"
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._before_call(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._before_call(run_id)
+
+    def _before_call(self, run_id):
+        if self.ledger.check_budget() and self.ledger.downgraded_to is None:
+            cheaper = DOWNGRADE_MODELS.get(self._model())
+            if cheaper and self.llm is not None:
+                self.llm.model = cheaper
+                self.ledger.downgraded_to = cheaper
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        end = time.perf_counter()
+        latency = end - self._started.pop(run_id, end)
+        input_tokens = output_tokens = 0
+        cached = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens") or 0
+                output_tokens += usage.get("output_tokens") or 0
+                cached = cached or bool((generation.generation_info or {}).get("from_cache"))
+        model = self._model()
+        if cached:
+            # Answered by the LLM response cache: nothing was sent to the API
+            input_tokens = output_tokens = 0
+        self.ledger.record({
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": call_cost(model, input_tokens, output_tokens),
+            "latency_s": latency,
+            "cached": cached,
+        })
+        record_span(
+            LLM_CALL, end - latency, end, model=model, input_tokens=input_tokens, output_tokens=output_tokens, cached=cached,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        end = time.perf_counter()
+        start = self._started.pop(run_id, end)
+        if not isinstance(error, BudgetExceeded):
+            self.ledger.record_failure()
+            record_span(LLM_CALL, start, end, model=self._model(), error=type(error).__name__)
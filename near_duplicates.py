@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate content detection with MinHash and locality-sensitive hashing
+
+Pages are reduced to fixed-size MinHash signatures and bucketed by bands of
+the signature, so candidate pairs come out of hash-table lookups instead of
+comparing every page with every other page.
+"""
+import re
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def shingle_hashes(text, k=5):
+    """32-bit hashes of the word k-shingles of a text"""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return np.empty(0, dtype=np.uint64)
+    hashes = {zlib.crc32(" ".join(words[i:i + k]).encode("utf-8")) for i in range(len(words) - k + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class MinHasher:
+    """MinHash signatures using vectorised multiply-shift hash functions"""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # Odd multipliers make (a * x + b) >> 32 a universal family under uint64 wraparound
+        self.a = rng.integers(1, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, hashes):
+        """Signature for an array of shingle hashes (all-max for an empty set)"""
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            permuted = (self.a * hashes[np.newaxis, :] + self.b) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def _choose_bands(num_perm, threshold):
+    """Pick (bands, rows) with bands * rows == num_perm whose LSH threshold is closest to the target"""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+@dataclass
+class DuplicateCluster:
+    """A group of pages whose content is nearly identical"""
+    urls: list
+    similarity: float  # lowest estimated Jaccard similarity to the cluster representative
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index over page body text.
+
+    Adding a page costs one signature computation and one bucket insert per
+    band, and clustering only compares pages that share a bucket, so the
+    whole check runs in roughly linear time in the number of pages.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=5, min_words=50):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_words = min_words
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = {}
+
+    def add(self, url, text):
+        """Index a page; pages shorter than min_words are ignored"""
+        if url in self.signatures or len(text.split()) < self.min_words:
+            return
+        signature = self.hasher.signature(shingle_hashes(text, self.shingle_size))
+        self.signatures[url] = signature
+        for band in range(self.bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            self.buckets[band].setdefault(key, []).append(url)
+
+    def similarity(self, url_a, url_b):
+        """Estimated Jaccard similarity of two indexed pages"""
+        return float(np.mean(self.signatures[url_a] == self.signatures[url_b]))
+
+    def clusters(self):
+        """Clusters of near-duplicate pages, largest first"""
+        parent = {}
+
+        def find(url):
+            parent.setdefault(url, url)
+            while parent[url] != url:
+                parent[url] = parent[parent[url]]
+                url = parent[url]
+            return url
+
+        # Compare each bucket member with the bucket's first page only, which keeps
+        # the work linear even when many pages share a bucket
+        for band_buckets in self.buckets:
+            for members in band_buckets.values():
+                head = members[0]
+                for url in members[1:]:
+                    if find(url) != find(head) and self.similarity(head, url) >= self.threshold:
+                        parent[find(url)] = find(head)
+
+        groups = {}
+        for url in parent:
+            groups.setdefault(find(url), []).append(url)
+
+        clusters = []
+        for root, urls in groups.items():
+            if len(urls) < 2:
+                continue
+            lowest = min(self.similarity(root, url) for url in urls if url != root)
+            clusters.append(DuplicateCluster(sorted(urls), round(lowest, 3)))
+        return sorted(clusters, key=lambda cluster: -len(cluster.urls))
+
+    def to_prompt(self, max_clusters=10, max_urls=5):
+        """Near-duplicate summary for the audit task"""
+        clusters = self.clusters()
+        duplicated = sum(len(cluster.urls) for cluster in clusters)
+        lines = [
+            f"Near-duplicate content check ({len(self.signatures)} pages with enough text, "
+            f"similarity threshold {self.threshold:.0%}): {len(clusters)} cluster(s) covering {duplicated} pages"
+        ]
+        for cluster in clusters[:max_clusters]:
+            shown = ", ".join(cluster.urls[:max_urls])
+            more = f" (+{len(cluster.urls) - max_urls} more)" if len(cluster.urls) > max_urls else ""
+            lines.append(f"  - {len(cluster.urls)} pages, >= {cluster.similarity:.0%} similar: {shown}{more}")
+        return "\n".join(lines)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Persistent page cache and cached HTTP fetcher for repeat audits
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import httpx
+
+from page_facts import extract_page_facts
+from user_agents import DESKTOP_USER_AGENTS
+
+
+@dataclass
+class FetchedPage:
+    """A fetched HTTP resource together with its response metadata"""
+    url: str
+    final_url: str
+    status: int
+    headers: dict = field(default_factory=dict)
+    html: str = ""
+    fetch_time: float = 0.0  # seconds spent on the network for the last full download
+    fetched_at: float = 0.0  # unix timestamp of the last successful (re)validation
+    from_cache: bool = False
+    rendered: bool = False  # body is the DOM after a browser render, not the HTTP response
+    _facts: object = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def facts(self):
+        """PageFacts of the body, parsed on first use and shared by everyone holding this page"""
+        if self._facts is None:
+            self._facts = extract_page_facts(self.html, self.final_url)
+        return self._facts
+
+    @property
+    def etag(self):
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self):
+        return self.headers.get("last-modified")
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "")
+
+    @property
+    def content_hash(self):
+        return hashlib.sha256(self.html.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """
+    On-disk page cache keyed by URL plus fetch options.
+
+    Bodies are stored once per content hash under ``blobs/`` and an SQLite
+    index keeps the response metadata, so identical pages reached through
+    different URLs share storage. Entries older than ``ttl`` seconds are
+    stale and must be revalidated; when the cache grows past ``max_bytes``
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir="seo_cache/pages", ttl=24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.db"))
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                final_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetch_time REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_body_hash ON pages (body_hash)")
+        self.db.commit()
+        # Running byte total of the stored blobs, kept up to date by put() and the deletes
+        self._total_bytes = self.total_size()
+
+    @staticmethod
+    def key_for(url, options=None):
+        """Cache key for a URL fetched with the given options"""
+        payload = json.dumps({"url": url, "options": options or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, body_hash):
+        return os.path.join(self.blob_dir, body_hash[:2], body_hash)
+
+    def get(self, url, options=None):
+        """Return the cached page for url/options, fresh or stale, or None"""
+        key = self.key_for(url, options)
+        row = self.db.execute(
+            "SELECT url, final_url, status, headers, body_hash, fetch_time, fetched_at FROM pages WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        try:
+            with open(self._blob_path(row[4]), "r", encoding="utf-8") as f:
+                html = f.read()
+        except FileNotFoundError:
+            self.delete(url, options)
+            return None
+
+        self.db.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return FetchedPage(
+            url=row[0],
+            final_url=row[1],
+            status=row[2],
+            headers=json.loads(row[3]),
+            html=html,
+            fetch_time=row[5],
+            fetched_at=row[6],
+            from_cache=True,
+        )
+
+    def is_fresh(self, page):
+        """Whether a cached page can be served without revalidation"""
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, page, options=None):
+        """Store a page and evict old entries if the cache is over its size budget"""
+        body = page.html.encode("utf-8")
+        body_hash = page.content_hash
+        blob_path = self._blob_path(body_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, blob_path)
+
+        key = self.key_for(page.url, options)
+        replaced = self.db.execute("SELECT body_hash, size FROM pages WHERE key = ?", (key,)).fetchone()
+        if not self.db.execute("SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone():
+            self._total_bytes += len(body)
+
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                page.url,
+                page.final_url,
+                page.status,
+                json.dumps(page.headers),
+                body_hash,
+                len(body),
+                page.fetch_time,
+                page.fetched_at or now,
+                now,
+            ),
+        )
+        self.db.commit()
+        if replaced and replaced[0] != body_hash:
+            self._drop_unused_blobs({replaced[0]: replaced[1]})
+        self._evict()
+
+    def touch(self, url, options=None, headers=None):
+        """Mark a cached entry as revalidated now, optionally refreshing its headers"""
+        key = self.key_for(url, options)
+        if headers is not None:
+            self.db.execute(
+                "UPDATE pages SET fetched_at = ?, headers = ? WHERE key = ?",
+                (time.time(), json.dumps(headers), key),
+            )
+        else:
+            self.db.execute("UPDATE pages SET fetched_at = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+
+    def delete(self, url, options=None):
+        """Remove a single entry"""
+        self._delete_keys([self.key_for(url, options)])
+
+    def _delete_keys(self, keys):
+        hashes = {}  # body hash -> size
+        for key in keys:
+            row = self.db.execute("SELECT body_hash, size FROM pages WHERE key = ?", (key,)).fetchone()
+            if row:
+                hashes[row[0]] = row[1]
+            self.db.execute("DELETE FROM pages WHERE key = ?", (key,))
+        self.db.commit()
+        self._drop_unused_blobs(hashes)
+
+    def _drop_unused_blobs(self, hashes):
+        # Only drop blobs that no remaining entry points at
+        for body_hash, size in hashes.items():
+            still_used = self.db.execute("SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+            if not still_used:
+                self._total_bytes -= size
+                try:
+                    os.remove(self._blob_path(body_hash))
+                except FileNotFoundError:
+                    pass
+
+    def total_size(self):
+        """Bytes of page bodies referenced by the index (shared blobs counted once)"""
+        row = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM pages GROUP BY body_hash)"
+        ).fetchone()
+        return row[0]
+
+    def _evict(self):
+        total = self._total_bytes
+        if total <= self.max_bytes:
+            return
+
+        # A blob's bytes are freed only with the last entry that references it
+        references = dict(self.db.execute("SELECT body_hash, COUNT(*) FROM pages GROUP BY body_hash"))
+        victims = []
+        for key, size, body_hash in self.db.execute("SELECT key, size, body_hash FROM pages ORDER BY accessed_at ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            references[body_hash] -= 1
+            if not references[body_hash]:
+                total -= size
+        self._delete_keys(victims)
+
+    def close(self):
+        self.db.close()
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers for the same key share its result.
+
+    The shared call is shielded, so a caller that is cancelled does not
+    cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, factory):
+        """Await factory() for key, or join the call already in flight for it"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+
+class PageFetcher:
+    """
+    Pooled async HTTP fetcher backed by a PageCache.
+
+    Fresh cache entries are served without touching the network. Stale
+    entries are revalidated with If-None-Match / If-Modified-Since so an
+    unchanged page costs a single 304 round trip.
+
+    Concurrent fetches of the same URL share one request, and pages fetched
+    through this fetcher are handed out again as the same object while they
+    stay fresh, so every task of a batch shares one download and one parse
+    (FetchedPage.facts) per page.
+    """
+
+    def __init__(self, cache=None, timeout=20.0, max_connections=20, user_agent=None, max_session_pages=500):
+        self.cache = cache
+        self.single_flight = SingleFlight()
+        self.max_session_pages = max_session_pages
+        self._session_pages = OrderedDict()  # cache key -> FetchedPage handed out by this fetcher
+        self.requests = 0
+        self.reused = 0
+        self.user_agent = user_agent or DESKTOP_USER_AGENTS[0]
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+            headers={"User-Agent": self.user_agent},
+        )
+
+    async def fetch(self, url, headers=None, use_cache=True):
+        """
+        Fetch a URL, going through the cache when one is configured
+
+        Args:
+            url (str): The URL to fetch
+            headers (dict): Extra request headers; they are part of the cache key
+            use_cache (bool): Set to False to bypass the cache entirely
+
+        Returns:
+            FetchedPage: The fetched (or cached) page
+        """
+        self.requests += 1
+        options = {"headers": headers} if headers else None
+        if not (self.cache and use_cache):
+            return await self._fetch(url, headers, options, use_cache)
+
+        key = self.cache.key_for(url, options)
+        page = self._session_pages.get(key)
+        if page is not None and self.cache.is_fresh(page):
+            self._session_pages.move_to_end(key)
+            self.reused += 1
+            return page
+
+        page = await self.single_flight.do(key, lambda: self._fetch(url, headers, options, use_cache))
+        if page.status < 400:
+            self._session_pages[key] = page
+            self._session_pages.move_to_end(key)
+            while len(self._session_pages) > self.max_session_pages:
+                self._session_pages.popitem(last=False)
+        return page
+
+    async def _fetch(self, url, headers, options, use_cache):
+        cached = self.cache.get(url, options) if self.cache and use_cache else None
+        if cached and self.cache.is_fresh(cached):
+            return cached
+
+        request_headers = dict(headers or {})
+        if cached:
+            if cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request_headers["If-Modified-Since"] = cached.last_modified
+
+        start = time.perf_counter()
+        response = await self.client.get(url, headers=request_headers)
+        elapsed = time.perf_counter() - start
+
+        if cached and response.status_code == 304:
+            merged_headers = {**cached.headers, **{k.lower(): v for k, v in response.headers.items()}}
+            self.cache.touch(url, options, merged_headers)
+            cached.headers = merged_headers
+            cached.fetched_at = time.time()
+            return cached
+
+        page = FetchedPage(
+            url=url,
+            final_url=str(response.url),
+            status=response.status_code,
+            headers={k.lower(): v for k, v in response.headers.items()},
+            html=response.text,
+            fetch_time=elapsed,
+            fetched_at=time.time(),
+        )
+        # Only successful and redirect responses: a transient 404 or 429 must not stick for a whole TTL
+        if self.cache and use_cache and response.status_code < 400:
+            self.cache.put(page, options)
+        return page
+
+    def stats(self):
+        """Fetch calls, and how many of them were answered by an in-flight or earlier fetch of this session"""
+        return {
+            "requests": self.requests,
+            "shared_in_flight": self.single_flight.shared,
+            "reused": self.reused,
+        }
+
+    async def close(self):
+        await self.client.aclose()
+        if self.cache:
+            self.cache.close()
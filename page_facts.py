@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Deterministic extraction of on-page SEO facts from raw HTML
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+
+@dataclass
+class PageFacts:
+    """On-page SEO facts for a single HTML document"""
+    url: str
+    title: str = ""
+    meta_description: str = ""
+    meta_robots: str = ""
+    canonical: str = ""
+    lang: str = ""
+    viewport: str = ""
+    headings: dict = field(default_factory=lambda: {"h1": [], "h2": [], "h3": []})
+    images_total: int = 0
+    images_missing_alt: int = 0
+    internal_links: list = field(default_factory=list)
+    external_links: list = field(default_factory=list)
+    nofollow_links: int = 0
+    hreflang: dict = field(default_factory=dict)
+    open_graph: dict = field(default_factory=dict)
+    json_ld: list = field(default_factory=list)
+    text: str = ""
+    outline: list = field(default_factory=list)  # (level, heading) pairs in document order
+    text_blocks: list = field(default_factory=list)  # paragraphs, list items etc. outside nav/header/footer
+
+    @property
+    def word_count(self):
+        return len(self.text.split())
+
+    @property
+    def alt_coverage(self):
+        """Share of images with a non-empty alt attribute (1.0 when there are no images)"""
+        if not self.images_total:
+            return 1.0
+        return (self.images_total - self.images_missing_alt) / self.images_total
+
+    @property
+    def schema_types(self):
+        """schema.org @type values declared in JSON-LD blocks"""
+        types = []
+
+        def collect(node):
+            if isinstance(node, dict):
+                node_type = node.get("@type")
+                if isinstance(node_type, list):
+                    types.extend(str(t) for t in node_type)
+                elif node_type:
+                    types.append(str(node_type))
+                for value in node.values():
+                    collect(value)
+            elif isinstance(node, list):
+                for item in node:
+                    collect(item)
+
+        collect(self.json_ld)
+        return sorted(set(types))
+
+    def issues(self):
+        """Common on-page problems that can be decided without an LLM"""
+        issues = []
+        if not self.title:
+            issues.append("Missing <title>")
+        elif len(self.title) > 60:
+            issues.append(f"Title is {len(self.title)} characters (over 60)")
+        if not self.meta_description:
+            issues.append("Missing meta description")
+        elif len(self.meta_description) > 160:
+            issues.append(f"Meta description is {len(self.meta_description)} characters (over 160)")
+        if not self.headings["h1"]:
+            issues.append("No H1 heading")
+        elif len(self.headings["h1"]) > 1:
+            issues.append(f"{len(self.headings['h1'])} H1 headings")
+        if not self.canonical:
+            issues.append("No canonical link")
+        elif self.canonical.rstrip("/") != self.url.rstrip("/"):
+            issues.append(f"Canonical points elsewhere: {self.canonical}")
+        if self.images_missing_alt:
+            issues.append(f"{self.images_missing_alt} of {self.images_total} images without alt text")
+        if not self.viewport:
+            issues.append("No viewport meta tag (mobile rendering)")
+        if "noindex" in self.meta_robots.lower():
+            issues.append("Page is marked noindex")
+        if not self.json_ld:
+            issues.append("No JSON-LD structured data")
+        return issues
+
+    def to_prompt(self, max_headings=15, headings=True):
+        """
+        Compact facts sheet to hand to the LLM instead of the raw page
+
+        headings=False leaves out the H1-H3 lines, for callers that add their own outline.
+        """
+        lines = [
+            f"Facts for {self.url}:",
+            f"- Title ({len(self.title)} chars): {self.title or '(missing)'}",
+            f"- Meta description ({len(self.meta_description)} chars): {self.meta_description or '(missing)'}",
+            f"- Canonical: {self.canonical or '(none)'}",
+            f"- Meta robots: {self.meta_robots or '(none)'}",
+            f"- Language: {self.lang or '(not set)'}; viewport: {self.viewport or '(none)'}",
+            f"- Word count: {self.word_count}",
+        ]
+        for level in ("h1", "h2", "h3") if headings else ():
+            values = self.headings[level]
+            shown = "; ".join(values[:max_headings])
+            more = f" (+{len(values) - max_headings} more)" if len(values) > max_headings else ""
+            lines.append(f"- {level.upper()} ({len(values)}): {shown or '(none)'}{more}")
+        lines.append(
+            f"- Images: {self.images_total} total, {self.images_missing_alt} missing alt "
+            f"({self.alt_coverage:.0%} coverage)"
+        )
+        lines.append(
+            f"- Links: {len(self.internal_links)} internal, {len(self.external_links)} external, "
+            f"{self.nofollow_links} nofollow"
+        )
+        lines.append(f"- Schema.org types (JSON-LD): {', '.join(self.schema_types) or '(none)'}")
+        if self.hreflang:
+            lines.append(f"- hreflang: {', '.join(sorted(self.hreflang))}")
+        issues = self.issues()
+        if issues:
+            lines.append("- Detected issues: " + "; ".join(issues))
+        return "\n".join(lines)
+
+
+class _FactsParser(HTMLParser):
+    """Single-pass HTML parser collecting the fields of PageFacts"""
+
+    SKIP_TEXT_TAGS = {"title", "script", "style", "noscript", "template", "svg"}
+    # Tags that start or end a text block
+    BLOCK_TAGS = {
+        "p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "div", "section", "article", "main", "blockquote",
+        "pre", "td", "th", "tr", "dd", "dt", "figcaption", "br", "ul", "ol", "table", "form",
+    }
+    # Site chrome whose text is left out of the text blocks
+    CHROME_TAGS = {"nav", "header", "footer", "aside"}
+
+    def __init__(self, facts):
+        super().__init__(convert_charrefs=True)
+        self.facts = facts
+        self.base_host = urlparse(facts.url).netloc.lower()
+        self._capture = None  # "title", "h1".."h3" or "json_ld"
+        self._buffer = []
+        self._skip_depth = 0
+        self._text = []
+        self._block = []
+        self._chrome_depth = 0
+        self._internal = set()
+        self._external = set()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name.lower(): (value or "") for name, value in attrs}
+        if tag in self.BLOCK_TAGS or tag in self.CHROME_TAGS:
+            self._end_block()
+        if tag in self.CHROME_TAGS:
+            self._chrome_depth += 1
+
+        if tag == "html" and attrs.get("lang"):
+            self.facts.lang = attrs["lang"]
+        elif tag == "title" and not self.facts.title:
+            self._start_capture("title")
+        elif tag in ("h1", "h2", "h3"):
+            self._start_capture(tag)
+        elif tag == "meta":
+            self._handle_meta(attrs)
+        elif tag == "link":
+            self._handle_link(attrs)
+        elif tag == "img":
+            self.facts.images_total += 1
+            if not attrs.get("alt", "").strip():
+                self.facts.images_missing_alt += 1
+        elif tag == "a" and attrs.get("href"):
+            self._handle_anchor(attrs)
+        elif tag == "script" and attrs.get("type", "").lower() == "application/ld+json":
+            self._start_capture("json_ld")
+
+        if tag in self.SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag in self.BLOCK_TAGS or tag in self.CHROME_TAGS:
+            self._end_block()
+        if tag in self.CHROME_TAGS and self._chrome_depth:
+            self._chrome_depth -= 1
+
+        if self._capture == tag or (self._capture == "json_ld" and tag == "script"):
+            self._finish_capture()
+
+    def handle_data(self, data):
+        if self._capture:
+            self._buffer.append(data)
+        if not self._skip_depth:
+            self._text.append(data)
+            if not self._chrome_depth:
+                self._block.append(data)
+
+    def _end_block(self):
+        # Inline tags do not split words; block and <br> boundaries do, in the page text as well
+        self._text.append(" ")
+        block = re.sub(r"\s+", " ", "".join(self._block)).strip()
+        self._block = []
+        if block:
+            self.facts.text_blocks.append(block)
+
+    def _start_capture(self, name):
+        self._capture = name
+        self._buffer = []
+
+    def _finish_capture(self):
+        value = "".join(self._buffer)
+        name, self._capture, self._buffer = self._capture, None, []
+
+        if name == "json_ld":
+            try:
+                data = json.loads(value)
+            except ValueError:
+                return
+            self.facts.json_ld.extend(data if isinstance(data, list) else [data])
+            return
+
+        value = re.sub(r"\s+", " ", value).strip()
+        if name == "title":
+            self.facts.title = value
+        elif value:
+            self.facts.headings[name].append(value)
+            self.facts.outline.append((name, value))
+
+    def _handle_meta(self, attrs):
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        content = attrs.get("content", "").strip()
+        if name == "description":
+            self.facts.meta_description = content
+        elif name == "robots":
+            self.facts.meta_robots = content
+        elif name == "viewport":
+            self.facts.viewport = content
+        elif name.startswith("og:"):
+            self.facts.open_graph[name] = content
+
+    def _handle_link(self, attrs):
+        rel = attrs.get("rel", "").lower().split()
+        href = attrs.get("href", "").strip()
+        if not href:
+            return
+        try:
+            absolute = urljoin(self.facts.url, href)
+        except ValueError:
+            # Malformed href (e.g. an unclosed IPv6 bracket): skip the link, not the page
+            return
+        if "canonical" in rel:
+            self.facts.canonical = absolute
+        elif "alternate" in rel and attrs.get("hreflang"):
+            self.facts.hreflang[attrs["hreflang"]] = absolute
+
+    def _handle_anchor(self, attrs):
+        href = attrs["href"].strip()
+        if href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            return
+
+        try:
+            absolute = urljoin(self.facts.url, href).split("#", 1)[0]
+            parsed = urlparse(absolute)
+            host = parsed.netloc.lower()
+        except ValueError:
+            # Malformed href (e.g. an unclosed IPv6 bracket): skip the link, not the page
+            return
+        if parsed.scheme not in ("http", "https"):
+            return
+
+        if "nofollow" in attrs.get("rel", "").lower():
+            self.facts.nofollow_links += 1
+
+        if host == self.base_host:
+            if absolute not in self._internal:
+                self._internal.add(absolute)
+                self.facts.internal_links.append(absolute)
+        elif absolute not in self._external:
+            self._external.add(absolute)
+            self.facts.external_links.append(absolute)
+
+    def close(self):
+        super().close()
+        if self._capture:
+            self._finish_capture()
+        self._end_block()
+        self.facts.text = re.sub(r"\s+", " ", "".join(self._text)).strip()
+
+
+def extract_page_facts(html, url):
+    """
+    Extract on-page SEO facts from an HTML document
+
+    Args:
+        html (str): The raw HTML of the page
+        url (str): The URL the page was fetched from, used to resolve relative links
+
+    Returns:
+        PageFacts: The extracted facts
+    """
+    facts = PageFacts(url=url)
+    parser = _FactsParser(facts)
+    parser.feed(html)
+    parser.close()
+    return facts
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Streaming progress events for long-running agent tasks
+
+Every task run gets an id; its events (pages fetched, facts extracted,
+pages visited by the agent, LLM calls and partial findings) are fanned out
+to listeners and async subscribers, appended to a JSONL log and summarised
+in a partial Markdown report as they happen, so a crash mid-run keeps
+everything recorded so far.
+"""
+import asyncio
+import contextlib
+import datetime
+import functools
+import itertools
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from stage_timing import task_trace
+
+# Event types emitted by the SEO agents
+TASK_STARTED = "task_started"
+PAGES_FETCHED = "pages_fetched"
+FACTS_EXTRACTED = "facts_extracted"
+PAGE_VISITED = "page_visited"
+LLM_CALL = "llm_call"
+PARTIAL_FINDINGS = "partial_findings"
+STEP_COMPLETED = "step_completed"  # a numbered task step was checkpointed
+STEP_RESTORED = "step_restored"  # completed steps were loaded from a checkpoint
+TASK_FINISHED = "task_finished"
+TASK_FAILED = "task_failed"
+
+_run_counter = itertools.count(1)
+
+# Progress of the task running in the current asyncio task
+_current_progress = ContextVar("task_progress", default=None)
+
+
+@dataclass
+class ProgressEvent:
+    """One progress event of a task run"""
+    type: str
+    task_id: str
+    label: str = None  # task type, e.g. "competitor_analysis"
+    step: int = None  # agent step the event belongs to, if any
+    timestamp: float = field(default_factory=time.time)
+    data: dict = field(default_factory=dict)
+
+    def to_json(self):
+        return json.dumps(asdict(self), ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_json(cls, line):
+        return cls(**json.loads(line))
+
+    def describe(self):
+        """One line for a console progress display"""
+        prefix = f"[{self.label or self.task_id}]" + (f" step {self.step}" if self.step is not None else "")
+        data = self.data
+        if self.type == PAGES_FETCHED:
+            rendered = data.get("rendered", 0)
+            return f"{prefix} fetched {len(data['urls'])} page(s)" + (
+                f", {rendered} rendered in the browser" if rendered else " over HTTP"
+            )
+        if self.type == FACTS_EXTRACTED:
+            return f"{prefix} extracted facts for {data['url']} ({len(data.get('issues', []))} issue(s))"
+        if self.type == PAGE_VISITED:
+            return f"{prefix} visited {data['url']}"
+        if self.type == LLM_CALL:
+            return f"{prefix} LLM call: {data.get('input_tokens', 0)} in / {data.get('output_tokens', 0)} out tokens"
+        if self.type == PARTIAL_FINDINGS:
+            return f"{prefix} {data.get('evaluation') or data.get('memory') or 'step finished'}"
+        if self.type == STEP_COMPLETED:
+            return f"{prefix} task step {data['number']} completed"
+        if self.type == STEP_RESTORED:
+            return f"{prefix} resumed; task steps {', '.join(map(str, data['steps']))} restored from checkpoint"
+        if self.type == TASK_FINISHED:
+            return f"{prefix} finished in {data.get('duration', 0):.0f}s, saved to {data.get('filename')}"
+        if self.type == TASK_FAILED:
+            return f"{prefix} failed: {data.get('error')}"
+        return f"{prefix} {self.type}"
+
+
+def read_progress_log(path):
+    """All events recorded in a JSONL progress log, oldest first; a torn last line is skipped"""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(ProgressEvent.from_json(line))
+            except (ValueError, TypeError):
+                continue
+    return events
+
+
+class TaskProgress:
+    """
+    Progress of one task run: its JSONL log and partial Markdown report.
+
+    Each event is appended and the file closed again straight away, so both
+    files are complete up to the last event even if the process dies.
+    """
+
+    def __init__(self, stream, progress_dir, label=None):
+        self.stream = stream
+        self.label = label
+        self.task_id = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{next(_run_counter)}"
+        self.started = time.monotonic()
+        os.makedirs(progress_dir, exist_ok=True)
+        self.log_path = os.path.join(progress_dir, f"{self.task_id}.jsonl")
+        self.partial_path = os.path.join(progress_dir, f"{self.task_id}.partial.md")
+        self.step = None
+
+    def emit(self, event_type, **data):
+        """Record an event and hand it to the stream's listeners"""
+        event = ProgressEvent(event_type, self.task_id, self.label, self.step, data=data)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(event.to_json() + "\n")
+        line = self._partial_line(event)
+        if line:
+            with open(self.partial_path, "a", encoding="utf-8") as f:
+                if f.tell() == 0:
+                    f.write(f"# Partial results: {self.label or 'task'} ({self.task_id})\n\n")
+                f.write(line + "\n")
+        self.stream.publish(event)
+        return event
+
+    @staticmethod
+    def _partial_line(event):
+        data = event.data
+        if event.type == TASK_STARTED:
+            return f"Started {datetime.datetime.fromtimestamp(event.timestamp).isoformat(timespec='seconds')}\n"
+        if event.type == FACTS_EXTRACTED:
+            issues = "; ".join(data.get("issues", [])) or "no issues detected"
+            return f"- Facts for {data['url']}: {issues}"
+        if event.type == PAGE_VISITED:
+            return f"- Step {event.step}: visited {data['url']}" + (f" ({data['title']})" if data.get("title") else "")
+        if event.type == PARTIAL_FINDINGS:
+            notes = [data[key] for key in ("evaluation", "memory") if data.get(key)]
+            return "\n".join(f"  - {note}" for note in notes) if notes else None
+        if event.type == STEP_COMPLETED:
+            return f"\n**Task step {data['number']} completed.**\n"
+        if event.type == STEP_RESTORED:
+            return f"Resumed from checkpoint; task steps {', '.join(map(str, data['steps']))} were already done\n"
+        if event.type == TASK_FAILED:
+            return f"\n**Failed:** {data.get('error')}"
+        return None
+
+    def finish(self, **data):
+        """Emit task_finished and drop the partial report, which the saved report supersedes"""
+        self.emit(TASK_FINISHED, duration=time.monotonic() - self.started, **data)
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def fail(self, error):
+        self.emit(TASK_FAILED, duration=time.monotonic() - self.started, error=str(error) or type(error).__name__)
+
+
+class ProgressStream:
+    """
+    Fans progress events out to callbacks and async subscribers.
+
+    Callbacks are called synchronously for every event (callables returning
+    a coroutine are scheduled on the running loop). subscribe() is an async
+    generator that yields events until the stream is closed.
+    """
+
+    def __init__(self):
+        self._listeners = []
+        self._queues = []
+        self.closed = False
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def publish(self, event):
+        for callback in list(self._listeners):
+            try:
+                outcome = callback(event)
+                if asyncio.iscoroutine(outcome):
+                    asyncio.ensure_future(outcome)
+            except Exception as e:
+                print(f"Progress listener failed: {e}")
+        for queue in self._queues:
+            queue.put_nowait(event)
+
+    async def subscribe(self):
+        """Yield events as they are published, until close()"""
+        queue = asyncio.Queue()
+        self._queues.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._queues.remove(queue)
+
+    def close(self):
+        """End every subscription"""
+        self.closed = True
+        for queue in self._queues:
+            queue.put_nowait(None)
+
+
+def current_progress():
+    """TaskProgress of the tracked task running in this asyncio task, or None"""
+    return _current_progress.get()
+
+
+def tracked(label):
+    """
+    Decorator for agent task methods: gives each call its own TaskProgress
+
+    The agent needs ``progress`` (a ProgressStream) and ``progress_dir``
+    attributes. The task is marked failed if the method raises; the
+    method (or save_report) marks it finished. Each call is also traced
+    (see stage_timing), and profiled if the agent's ``profiler`` is set.
+    If the agent has a ``task_scope()`` context manager, the call runs
+    inside it, so task-local state never outlives the task.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            progress = TaskProgress(self.progress, self.progress_dir, label)
+            token = _current_progress.set(progress)
+            progress.emit(TASK_STARTED, args=[str(arg) for arg in args], kwargs={k: str(v) for k, v in kwargs.items()})
+            scope = getattr(self, "task_scope", None)
+            try:
+                with task_trace(label, profiler=getattr(self, "profiler", None)), \
+                        (scope() if scope else contextlib.nullcontext()):
+                    return await method(self, *args, **kwargs)
+            except BaseException as e:
+                progress.fail(e)
+                raise
+            finally:
+                _current_progress.reset(token)
+        return wrapper
+    return decorator
+
+
+class LLMProgressHandler(BaseCallbackHandler):
+    """LangChain callback that reports token usage of every LLM call as a progress event"""
+
+    # Run in the event loop instead of a worker thread, so listeners see events in order
+    run_inline = True
+
+    def __init__(self, progress):
+        self.progress = progress
+
+    def on_llm_end(self, response, **kwargs):
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens", "total_tokens"):
+                    usage[key] = usage.get(key, 0) + (metadata.get(key) or 0)
+        self.progress.emit(LLM_CALL, **usage)
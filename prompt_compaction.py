@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Prompt compaction: bounded, deduplicated page digests for the LLM
+
+Prefetched pages reach the model as a digest instead of raw markup or full
+body text: the page's key facts, a headings outline, its structured data, a
+link table and its main text blocks. Every digest is held to a per-page
+character budget, and all digests of one prompt share a per-conversation
+budget that is split evenly over the pages still to come, so a prompt
+covering a long competitor list gives each page a smaller share instead of
+cutting off the pages at the end. Text blocks already sent for an earlier
+page of the same prompt (shared boilerplate, cookie banners, repeated
+calls to action) are not repeated.
+"""
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from sitemap_stream import parse_sitemap
+
+# JSON-LD properties shown in a digest; everything else is left out
+STRUCTURED_DATA_FIELDS = (
+    "name", "headline", "datePublished", "dateModified", "author", "brand", "sku", "price",
+    "priceCurrency", "availability", "ratingValue", "reviewCount", "telephone", "streetAddress",
+    "addressLocality", "openingHours", "question",
+)
+
+# Text blocks shorter than this are navigation labels, buttons and the like
+MIN_BLOCK_WORDS = 8
+MAX_BLOCK_CHARS = 400
+
+
+@dataclass
+class CompactionBudget:
+    """Character budgets for the page digests of one prompt"""
+    page_chars: int = 2500  # most a single page digest may use
+    conversation_chars: int = 12000  # shared by every digest in the prompt
+    min_page_chars: int = 700  # floor per page, so each page keeps its key facts however long the list
+
+
+def fit_text(text, max_chars):
+    """Cut text to max_chars at a line (or else word) boundary, noting how much was left out"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = cut.rfind("\n")
+    if boundary < max_chars // 2:
+        boundary = cut.rfind(" ")
+    if boundary > 0:
+        cut = cut[:boundary]
+    return f"{cut.rstrip()}\n... (truncated, {len(text) - len(cut)} more chars)"
+
+
+def _fingerprint(text):
+    normalized = re.sub(r"\W+", " ", text.lower()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _take(lines, max_chars):
+    """Leading lines that fit in max_chars, plus a count of the rest"""
+    taken, used = [], 0
+    for i, line in enumerate(lines):
+        if used + len(line) + 1 > max_chars:
+            if taken:
+                taken.append(f"  (+{len(lines) - i} more)")
+            return taken
+        taken.append(line)
+        used += len(line) + 1
+    return taken
+
+
+def _schema_nodes(node):
+    """Every JSON-LD object with an @type, including nested ones and @graph members"""
+    if isinstance(node, dict):
+        if node.get("@type"):
+            yield node
+        for value in node.values():
+            yield from _schema_nodes(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _schema_nodes(item)
+
+
+def _schema_value(value):
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@id") or ""
+    elif isinstance(value, list):
+        value = ", ".join(str(_schema_value(item)) for item in value[:3])
+    value = re.sub(r"\s+", " ", str(value)).strip()
+    return value if len(value) <= 80 else value[:77] + "..."
+
+
+def _path_section(url):
+    segment = urlparse(url).path.strip("/").split("/", 1)[0]
+    return f"/{segment}" if segment else "/"
+
+
+class PromptCompactor:
+    """
+    Turns the pages of one prompt into bounded digests.
+
+    Use one compactor per prompt: it tracks how much of the conversation
+    budget is used and which text blocks were already sent.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget or CompactionBudget()
+        self.used = 0
+        self._seen_blocks = set()
+        self.stats = {"pages": 0, "input_chars": 0, "output_chars": 0, "duplicate_blocks": 0}
+
+    def page_budget(self, pages_left=1):
+        """Characters available to the next page when pages_left pages (itself included) remain"""
+        share = (self.budget.conversation_chars - self.used) // max(1, pages_left)
+        return max(self.budget.min_page_chars, min(self.budget.page_chars, share))
+
+    def _record(self, source_chars, digest):
+        self.used += len(digest)
+        self.stats["pages"] += 1
+        self.stats["input_chars"] += source_chars
+        self.stats["output_chars"] += len(digest)
+        return digest
+
+    def digest(self, facts, max_chars=None, source_chars=0):
+        """
+        Digest of a parsed HTML page
+
+        Args:
+            facts (PageFacts): The page's extracted facts
+            max_chars (int): Budget for this digest; defaults to page_budget()
+            source_chars (int): Size of the raw page, for the compaction stats
+
+        Returns:
+            str: Facts sheet, headings outline, structured data, link table and
+                key text blocks, in that order of priority
+        """
+        max_chars = max_chars or self.page_budget()
+        sections = [fit_text(facts.to_prompt(headings=False), max_chars)]
+        remaining = max_chars - len(sections[0])
+
+        for title, lines, share in (
+            ("Headings outline", self._outline(facts), 0.4),
+            ("Structured data", self._structured_data(facts), 0.3),
+            ("Link table", self._link_table(facts), 0.3),
+        ):
+            if not lines or remaining < 80:
+                continue
+            taken = _take(lines, int(remaining * share) - len(title) - 2)
+            if taken:
+                section = f"{title}:\n" + "\n".join(taken)
+                sections.append(section)
+                remaining -= len(section) + 1
+
+        blocks = self._key_blocks(facts, remaining - 20)
+        if blocks:
+            sections.append("Key text:\n" + "\n".join(blocks))
+        return self._record(source_chars or len(facts.text), "\n".join(sections))
+
+    def _outline(self, facts):
+        """Indented H1-H3 outline; runs of the same heading (product cards etc.) are collapsed"""
+        lines, previous, repeats = [], None, 0
+        for level, text in facts.outline + [(None, None)]:
+            if (level, text) == previous:
+                repeats += 1
+                continue
+            if previous:
+                indent = "  " * (int(previous[0][1]) - 1)
+                text_shown = previous[1] if len(previous[1]) <= 120 else previous[1][:117] + "..."
+                lines.append(f"{indent}- {previous[0].upper()} {text_shown}" + (f" (x{repeats + 1})" if repeats else ""))
+            previous, repeats = (level, text), 0
+        return lines
+
+    def _structured_data(self, facts):
+        lines = []
+        for node in _schema_nodes(facts.json_ld):
+            node_type = node["@type"] if isinstance(node["@type"], str) else "/".join(map(str, node["@type"]))
+            values = []
+            for key in STRUCTURED_DATA_FIELDS:
+                value = _schema_value(node[key]) if key in node else ""
+                if value:
+                    values.append(f"{key}={value}")
+            line = f"- {node_type}" + (f": {'; '.join(values)}" if values else "")
+            if line not in lines:
+                lines.append(line)
+        return lines
+
+    def _link_table(self, facts):
+        internal = Counter(_path_section(url) for url in facts.internal_links)
+        external = Counter(urlparse(url).netloc.lower() for url in facts.external_links)
+        lines = []
+        if internal:
+            lines.append("- Internal sections: " + ", ".join(f"{path} ({n})" for path, n in internal.most_common(10)))
+        if external:
+            lines.append("- External domains: " + ", ".join(f"{host} ({n})" for host, n in external.most_common(10)))
+        return lines
+
+    def _key_blocks(self, facts, max_chars):
+        """
+        The longest text blocks not already sent for another page, in document order
+
+        Blocks repeating a heading or shorter than MIN_BLOCK_WORDS are skipped;
+        long blocks are shortened to MAX_BLOCK_CHARS.
+        """
+        if max_chars < 100:
+            return []
+        skip = {_fingerprint(text) for _, text in facts.outline}
+        candidates = []
+        for position, block in enumerate(facts.text_blocks):
+            if len(block.split()) < MIN_BLOCK_WORDS:
+                continue
+            key = _fingerprint(block)
+            if key in skip:
+                continue
+            if key in self._seen_blocks:
+                self.stats["duplicate_blocks"] += 1
+                continue
+            skip.add(key)  # drops repeats within the page too
+            shown = block if len(block) <= MAX_BLOCK_CHARS else block[:MAX_BLOCK_CHARS].rsplit(" ", 1)[0] + "..."
+            candidates.append((position, key, f"- {shown}"))
+
+        chosen, used = [], 0
+        for candidate in sorted(candidates, key=lambda c: -len(c[2])):
+            if used + len(candidate[2]) + 1 > max_chars:
+                continue
+            chosen.append(candidate)
+            used += len(candidate[2]) + 1
+        self._seen_blocks.update(key for _, key, _ in chosen)
+        return [line for _, _, line in sorted(chosen)]
+
+    def compact_resource(self, url, body, max_chars=None):
+        """
+        Digest of a plain-text resource such as robots.txt or a sitemap
+
+        Sitemaps are summarised (URL count, sections, latest lastmod, sample
+        URLs); other text loses comments, blank lines and repeated lines.
+        """
+        max_chars = max_chars or self.page_budget()
+        summary = None
+        if body.lstrip().startswith("<"):
+            try:
+                summary = self._sitemap_summary(*parse_sitemap(body))
+            except ET.ParseError:
+                summary = None
+        if summary is None:
+            lines = []
+            for line in body.splitlines():
+                line = line.split("#", 1)[0].rstrip() if url.endswith("robots.txt") else line.rstrip()
+                if line.strip() and line not in lines:
+                    lines.append(line)
+            summary = "\n".join(lines)
+        return self._record(len(body), fit_text(summary, max_chars))
+
+    @staticmethod
+    def _sitemap_summary(entries, children):
+        lines = []
+        if children:
+            lines.append(f"Sitemap index with {len(children)} child sitemap(s):")
+            lines += [f"- {child}" for child in children[:10]]
+            if len(children) > 10:
+                lines.append(f"  (+{len(children) - 10} more)")
+        if entries:
+            sections = Counter(_path_section(entry.loc) for entry in entries)
+            lastmods = sorted(entry.lastmod for entry in entries if entry.lastmod)
+            lines.append(f"Sitemap with {len(entries)} URL(s)" + (f", latest lastmod {lastmods[-1]}" if lastmods else ""))
+            lines.append("- Sections: " + ", ".join(f"{path} ({n})" for path, n in sections.most_common(10)))
+            lines += [f"- {entry.loc}" for entry in entries[:15]]
+            if len(entries) > 15:
+                lines.append(f"  (+{len(entries) - 15} more)")
+        return "\n".join(lines) if lines else None
+
+    def summary(self):
+        """Compaction stats: pages digested, characters in and out, duplicate blocks dropped"""
+        stats = dict(self.stats)
+        stats["ratio"] = round(stats["output_chars"] / stats["input_chars"], 3) if stats["input_chars"] else None
+        return stats
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Structured JSON reports for the SEO agents and their Markdown rendering
+"""
+import datetime
+import json
+import re
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, ValidationError
+
+REPORT_SCHEMA_VERSION = 1
+
+
+class Finding(BaseModel):
+    """A single observation made during an analysis"""
+    title: str
+    detail: str = ""
+    severity: Literal["high", "medium", "low", "info"] = "info"
+    url: Optional[str] = None
+
+
+class Recommendation(BaseModel):
+    """An action the site owner should take"""
+    action: str
+    priority: Literal["high", "medium", "low"] = "medium"
+    rationale: str = ""
+
+
+class UrlMetrics(BaseModel):
+    """Deterministic per-URL measurements taken from fetched HTML"""
+    url: str
+    status: Optional[int] = None
+    response_ms: Optional[float] = None
+    title: str = ""
+    meta_description_length: int = 0
+    word_count: int = 0
+    h1_count: int = 0
+    images_total: int = 0
+    images_missing_alt: int = 0
+    internal_links: int = 0
+    external_links: int = 0
+    canonical: str = ""
+    schema_types: List[str] = Field(default_factory=list)
+    issues: List[str] = Field(default_factory=list)
+
+
+class SEOReport(BaseModel):
+    """Machine-readable result of one SEO task run"""
+    schema_version: int = REPORT_SCHEMA_VERSION
+    task_type: str
+    title: str
+    keyword: Optional[str] = None
+    website_url: Optional[str] = None
+    generated_at: str
+    summary: str = ""
+    scores: Dict[str, float] = Field(default_factory=dict)
+    findings: List[Finding] = Field(default_factory=list)
+    recommendations: List[Recommendation] = Field(default_factory=list)
+    url_metrics: List[UrlMetrics] = Field(default_factory=list)
+    analysis: str = ""
+    metadata: Dict[str, object] = Field(default_factory=dict)
+
+
+class _AgentOutput(BaseModel):
+    """The part of the report the LLM is asked to produce"""
+    summary: str = ""
+    scores: Dict[str, float] = Field(default_factory=dict)
+    findings: List[Finding] = Field(default_factory=list)
+    recommendations: List[Recommendation] = Field(default_factory=list)
+
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+At the very end of your final answer, add a fenced ```json code block with this structure:
+{
+  "summary": "two or three sentence overview",
+  "scores": {"<aspect>": <0-100>},
+  "findings": [{"title": "...", "detail": "...", "severity": "high|medium|low|info", "url": "..."}],
+  "recommendations": [{"action": "...", "priority": "high|medium|low", "rationale": "..."}]
+}
+"""
+
+_JSON_BLOCK = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def url_metrics_for(page):
+    """UrlMetrics for a FetchedPage (HTML pages only, otherwise None)"""
+    if "html" not in page.content_type:
+        return None
+    facts = page.facts
+    return UrlMetrics(
+        url=page.final_url,
+        status=page.status,
+        response_ms=round(page.fetch_time * 1000, 1),
+        title=facts.title,
+        meta_description_length=len(facts.meta_description),
+        word_count=facts.word_count,
+        h1_count=len(facts.headings["h1"]),
+        images_total=facts.images_total,
+        images_missing_alt=facts.images_missing_alt,
+        internal_links=len(facts.internal_links),
+        external_links=len(facts.external_links),
+        canonical=facts.canonical,
+        schema_types=facts.schema_types,
+        issues=facts.issues(),
+    )
+
+
+def build_report(task_type, title, result, keyword=None, website_url=None, pages=None, metadata=None):
+    """
+    Build a validated SEOReport from the agent's final answer
+
+    The structured part is taken from the last ```json block of the answer.
+    If it is missing or does not validate, the whole answer becomes the
+    report's analysis text and the structured fields stay empty.
+
+    Args:
+        task_type (str): Task identifier, e.g. "seo_analysis"
+        title (str): Human-readable report title
+        result (str): The agent's final answer
+        keyword (str): Target keyword, if the task has one
+        website_url (str): Target website, if the task has one
+        pages (list): Prefetched pages to include as per-URL metrics
+        metadata (dict): Extra run metadata
+
+    Returns:
+        SEOReport: The validated report
+    """
+    text = str(result)
+    structured = _AgentOutput()
+    analysis = text
+    metadata = dict(metadata or {})
+
+    blocks = list(_JSON_BLOCK.finditer(text))
+    if blocks:
+        block = blocks[-1]
+        try:
+            structured = _AgentOutput.model_validate(json.loads(block.group(1)))
+            analysis = (text[:block.start()] + text[block.end():]).strip()
+        except (ValueError, ValidationError) as e:
+            metadata["structured_output_error"] = str(e).splitlines()[0]
+    else:
+        metadata["structured_output_error"] = "no JSON block in agent output"
+
+    url_metrics = [m for m in (url_metrics_for(page) for page in pages or []) if m is not None]
+
+    return SEOReport(
+        task_type=task_type,
+        title=title,
+        keyword=keyword,
+        website_url=website_url,
+        generated_at=datetime.datetime.now().isoformat(timespec="seconds"),
+        summary=structured.summary,
+        scores=structured.scores,
+        findings=structured.findings,
+        recommendations=structured.recommendations,
+        url_metrics=url_metrics,
+        analysis=analysis,
+        metadata=metadata,
+    )
+
+
+def load_report(path):
+    """Load and validate a report JSON file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return SEOReport.model_validate_json(f.read())
+
+
+def render_markdown(report):
+    """Render an SEOReport as the Markdown document saved next to its JSON"""
+    generated = report.generated_at.replace("T", " ")
+    lines = [f"# {report.title}", "", f"Analysis Date: {generated}", ""]
+
+    if report.summary:
+        lines += ["## Summary", "", report.summary, ""]
+
+    if report.scores:
+        lines += ["## Scores", "", "| Aspect | Score |", "| --- | --- |"]
+        lines += [f"| {aspect} | {score:g} |" for aspect, score in report.scores.items()]
+        lines.append("")
+
+    if report.findings:
+        lines += ["## Findings", ""]
+        for finding in report.findings:
+            where = f" ({finding.url})" if finding.url else ""
+            detail = f": {finding.detail}" if finding.detail else ""
+            lines.append(f"- **[{finding.severity}]** {finding.title}{where}{detail}")
+        lines.append("")
+
+    if report.recommendations:
+        lines += ["## Recommendations", ""]
+        for recommendation in report.recommendations:
+            rationale = f" - {recommendation.rationale}" if recommendation.rationale else ""
+            lines.append(f"- **[{recommendation.priority}]** {recommendation.action}{rationale}")
+        lines.append("")
+
+    if report.url_metrics:
+        lines += [
+            "## Page Metrics",
+            "",
+            "| URL | Status | Response (ms) | Words | H1 | Images w/o alt | Internal links | Schema |",
+            "| --- | --- | --- | --- | --- | --- | --- | --- |",
+        ]
+        for m in report.url_metrics:
+            lines.append(
+                f"| {m.url} | {m.status or ''} | {m.response_ms or ''} | {m.word_count} | {m.h1_count} "
+                f"| {m.images_missing_alt}/{m.images_total} | {m.internal_links} | {', '.join(m.schema_types)} |"
+            )
+        lines.append("")
+
+    if report.analysis:
+        lines += ["## Detailed Analysis", "", report.analysis, ""]
+
+    return "\n".join(lines)
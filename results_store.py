@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Indexed store of SEO task results
+
+Every saved report is recorded in an SQLite database indexed by site,
+keyword, task type and run time, so questions like "latest technical audit
+for example.com" are answered by an index lookup instead of scanning
+seo_results/ and parsing filenames.
+"""
+import datetime
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from urllib.parse import urlparse
+from report_schema import SEOReport
+
+
+def site_key(website_url):
+    """Normalise a website URL or hostname to the key runs are indexed by"""
+    if not website_url:
+        return ""
+    parsed = urlparse(website_url if "://" in website_url else f"//{website_url}")
+    host = (parsed.netloc or parsed.path).lower().split("@")[-1]
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass
+class StoredRun:
+    """One recorded task run"""
+    id: int
+    task_type: str
+    site: str
+    keyword: str
+    run_at: datetime.datetime
+    title: str
+    markdown_path: str
+    json_path: str
+    report_json: str
+
+    def report(self):
+        """The full SEOReport saved with this run"""
+        return SEOReport.model_validate_json(self.report_json)
+
+
+class ResultsStore:
+    """SQLite-backed index of every report written by the SEO agents"""
+
+    def __init__(self, path="seo_results/results.db"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_type TEXT NOT NULL,
+                site TEXT NOT NULL DEFAULT '',
+                keyword TEXT NOT NULL DEFAULT '',
+                run_at TEXT NOT NULL,
+                title TEXT NOT NULL,
+                markdown_path TEXT,
+                json_path TEXT,
+                report TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS runs_task_site ON runs (task_type, site, run_at);
+            CREATE INDEX IF NOT EXISTS runs_keyword ON runs (keyword, task_type, run_at);
+            CREATE INDEX IF NOT EXISTS runs_site ON runs (site, run_at);
+            CREATE TABLE IF NOT EXISTS page_snapshots (
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                etag TEXT,
+                content_hash TEXT,
+                findings TEXT NOT NULL,
+                audited_at TEXT NOT NULL,
+                PRIMARY KEY (site, url)
+            );
+            """
+        )
+        self.db.commit()
+
+    def add(self, report, markdown_path=None, json_path=None):
+        """Record a report and return the new run id"""
+        cursor = self.db.execute(
+            """
+            INSERT INTO runs (task_type, site, keyword, run_at, title, markdown_path, json_path, report)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                report.task_type,
+                site_key(report.website_url),
+                (report.keyword or "").lower(),
+                report.generated_at,
+                report.title,
+                markdown_path,
+                json_path,
+                report.model_dump_json(),
+            ),
+        )
+        self.db.commit()
+        return cursor.lastrowid
+
+    def _row_to_run(self, row):
+        return StoredRun(
+            id=row[0],
+            task_type=row[1],
+            site=row[2],
+            keyword=row[3],
+            run_at=datetime.datetime.fromisoformat(row[4]),
+            title=row[5],
+            markdown_path=row[6],
+            json_path=row[7],
+            report_json=row[8],
+        )
+
+    def get(self, run_id):
+        """Look up a single run by id"""
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return self._row_to_run(row) if row else None
+
+    def query(self, task_type=None, site=None, keyword=None, since=None, until=None, limit=None):
+        """
+        Find runs matching all given filters, newest first
+
+        Args:
+            task_type (str): e.g. "technical_audit" or "content_gap"
+            site (str): Website URL or hostname
+            keyword (str): Target keyword (case-insensitive)
+            since (datetime or timedelta): Only runs at or after this time;
+                a timedelta is taken relative to now, e.g. timedelta(days=30)
+            until (datetime): Only runs before this time
+            limit (int): Maximum number of runs to return
+
+        Returns:
+            list: StoredRun objects
+        """
+        clauses, params = [], []
+        if task_type:
+            clauses.append("task_type = ?")
+            params.append(task_type)
+        if site:
+            clauses.append("site = ?")
+            params.append(site_key(site))
+        if keyword:
+            clauses.append("keyword = ?")
+            params.append(keyword.lower())
+        if since is not None:
+            if isinstance(since, datetime.timedelta):
+                since = datetime.datetime.now() - since
+            clauses.append("run_at >= ?")
+            params.append(since.isoformat(timespec="seconds"))
+        if until is not None:
+            clauses.append("run_at < ?")
+            params.append(until.isoformat(timespec="seconds"))
+
+        sql = "SELECT * FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY run_at DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [self._row_to_run(row) for row in self.db.execute(sql, params)]
+
+    def latest(self, task_type, site=None, keyword=None):
+        """The most recent run of a task type for a site and/or keyword, or None"""
+        runs = self.query(task_type=task_type, site=site, keyword=keyword, limit=1)
+        return runs[0] if runs else None
+
+    def page_snapshots(self, site):
+        """Per-URL state recorded by the last incremental audit of a site, keyed by URL"""
+        rows = self.db.execute(
+            "SELECT url, lastmod, etag, content_hash, findings, audited_at FROM page_snapshots WHERE site = ?",
+            (site_key(site),),
+        )
+        return {
+            row[0]: {
+                "url": row[0],
+                "lastmod": row[1],
+                "etag": row[2],
+                "content_hash": row[3],
+                "findings": json.loads(row[4]),
+                "audited_at": row[5],
+            }
+            for row in rows
+        }
+
+    def save_page_snapshots(self, site, snapshots, removed=()):
+        """Upsert per-URL audit state for a site and drop URLs that disappeared"""
+        key = site_key(site)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO page_snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    key,
+                    snapshot["url"],
+                    snapshot.get("lastmod"),
+                    snapshot.get("etag"),
+                    snapshot.get("content_hash"),
+                    json.dumps(snapshot.get("findings", [])),
+                    snapshot["audited_at"],
+                )
+                for snapshot in snapshots
+            ],
+        )
+        self.db.executemany(
+            "DELETE FROM page_snapshots WHERE site = ? AND url = ?",
+            [(key, url) for url in removed],
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
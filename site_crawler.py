@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Parallel internal crawler for broken-link, redirect and canonical checks
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from page_facts import extract_page_facts
+from user_agents import DESKTOP_USER_AGENTS
+
+MAX_REDIRECTS = 10
+
+
+@dataclass
+class CrawledPage:
+    """Crawl outcome for one internal URL"""
+    url: str
+    status: int = None
+    final_url: str = None
+    redirect_chain: list = field(default_factory=list)  # [(url, status), ...] before the final response
+    canonical: str = ""
+    content_type: str = ""
+    depth: int = 0
+    referrers: list = field(default_factory=list)
+    error: str = None
+    in_sitemap: bool = False
+
+
+@dataclass
+class CrawlReport:
+    """Everything the crawler recorded for a site"""
+    start_url: str
+    pages: dict = field(default_factory=dict)  # url -> CrawledPage
+    blocked_by_robots: list = field(default_factory=list)
+    crawl_delay: float = 0.0
+    duration: float = 0.0
+    check_orphans: bool = True  # False when only part of the sitemap was crawled, so orphans mean nothing
+
+    def broken_links(self):
+        return [page for page in self.pages.values() if page.error or (page.status and page.status >= 400)]
+
+    def redirect_chains(self, min_hops=2):
+        return [page for page in self.pages.values() if len(page.redirect_chain) >= min_hops]
+
+    def canonical_issues(self):
+        """Pages whose canonical target is not a live, non-redirecting URL, or is missing"""
+        issues = []
+        for page in self.pages.values():
+            if page.status != 200 or "html" not in page.content_type:
+                continue
+            if not page.canonical:
+                issues.append((page.url, "missing canonical"))
+                continue
+            target = self.pages.get(page.canonical)
+            if target is None:
+                continue
+            if target.error or (target.status and target.status >= 400):
+                issues.append((page.url, f"canonical {page.canonical} returns {target.status or target.error}"))
+            elif target.redirect_chain:
+                issues.append((page.url, f"canonical {page.canonical} redirects to {target.final_url}"))
+            elif target.canonical and target.canonical != page.canonical:
+                issues.append((page.url, f"canonical chain {page.canonical} -> {target.canonical}"))
+        return issues
+
+    def sitemap_issues(self):
+        """Sitemap URLs that are broken, redirect, or name another URL as canonical"""
+        issues = []
+        for page in self.pages.values():
+            if not page.in_sitemap or (page.status is None and not page.error):
+                continue
+            if page.error or page.status >= 400:
+                issues.append((page.url, f"returns {page.status or page.error}"))
+            elif page.redirect_chain:
+                issues.append((page.url, f"redirects to {page.final_url}"))
+            elif page.canonical and page.canonical != page.url:
+                issues.append((page.url, f"canonical is {page.canonical}"))
+        return issues
+
+    def orphans(self):
+        """Sitemap URLs no other crawled page links to"""
+        return [
+            page.url for page in self.pages.values()
+            if page.in_sitemap and page.url != self.start_url and not set(page.referrers) - {page.url}
+        ]
+
+    def to_prompt(self, max_items=20):
+        """Summarised issue list for the audit task"""
+        statuses = {}
+        for page in self.pages.values():
+            key = str(page.status) if page.status else "error"
+            statuses[key] = statuses.get(key, 0) + 1
+
+        lines = [
+            f"Crawl of {self.start_url}: {len(self.pages)} internal URLs in {self.duration:.0f}s "
+            f"(status codes: {', '.join(f'{k}: {v}' for k, v in sorted(statuses.items()))}; "
+            f"{len(self.blocked_by_robots)} blocked by robots.txt; crawl-delay {self.crawl_delay:g}s)",
+        ]
+
+        broken = self.broken_links()
+        lines.append(f"- Broken internal links: {len(broken)}")
+        for page in broken[:max_items]:
+            linked_from = ", ".join(page.referrers[:3]) or ("sitemap" if page.in_sitemap else "start URL")
+            lines.append(f"  - {page.url} -> {page.status or page.error} (linked from {linked_from})")
+
+        chains = self.redirect_chains()
+        lines.append(f"- Redirect chains of 2+ hops: {len(chains)}")
+        for page in chains[:max_items]:
+            hops = " -> ".join(f"{url} [{status}]" for url, status in page.redirect_chain)
+            lines.append(f"  - {hops} -> {page.final_url}")
+
+        canonical = self.canonical_issues()
+        lines.append(f"- Canonical issues: {len(canonical)}")
+        for url, problem in canonical[:max_items]:
+            lines.append(f"  - {url}: {problem}")
+
+        if any(page.in_sitemap for page in self.pages.values()):
+            sitemap_issues = self.sitemap_issues()
+            lines.append(f"- Sitemap URLs that are broken, redirect or are not canonical: {len(sitemap_issues)}")
+            for url, problem in sitemap_issues[:max_items]:
+                lines.append(f"  - {url}: {problem}")
+            if self.check_orphans:
+                orphans = self.orphans()
+                lines.append(f"- Sitemap URLs not linked from any crawled page: {len(orphans)}")
+                for url in orphans[:max_items]:
+                    lines.append(f"  - {url}")
+        return "\n".join(lines)
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawler over a site's internal link graph.
+
+    Requests share one pooled HTTP client; each host gets its own
+    concurrency limit and the robots.txt crawl-delay is honoured between
+    requests to the same host. Redirects are followed manually so the
+    whole chain is recorded.
+    """
+
+    def __init__(self, max_pages=500, per_host_concurrency=4, timeout=15.0, user_agent=None, respect_robots=True):
+        self.max_pages = max_pages
+        self.per_host_concurrency = per_host_concurrency
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent or DESKTOP_USER_AGENTS[0]
+        self.client = httpx.AsyncClient(
+            follow_redirects=False,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=per_host_concurrency * 4),
+            headers={"User-Agent": self.user_agent},
+        )
+        self._host_slots = {}
+        self._host_last_request = {}
+        self._host_locks = {}
+
+    async def _load_robots(self, start_url):
+        robots = RobotFileParser()
+        try:
+            response = await self.client.get(urljoin(start_url, "/robots.txt"))
+            lines = response.text.splitlines() if response.status_code < 400 else []
+        except httpx.HTTPError:
+            lines = []
+        robots.parse(lines)
+        return robots
+
+    async def _throttle(self, host, delay):
+        """Space requests to the same host at least `delay` seconds apart"""
+        if not delay:
+            return
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last_request.get(host, 0) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_last_request[host] = time.monotonic()
+
+    async def _fetch(self, url, delay):
+        """GET a URL following redirects by hand; returns (response, redirect_chain)"""
+        chain = []
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            host = urlparse(current).netloc
+            slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+            async with slots:
+                await self._throttle(host, delay)
+                response = await self.client.get(current)
+            if response.is_redirect and "location" in response.headers:
+                chain.append((current, response.status_code))
+                current = urldefrag(urljoin(current, response.headers["location"]))[0]
+                if any(current == hop for hop, _ in chain):
+                    raise httpx.TooManyRedirects(f"redirect loop at {current}", request=response.request)
+                continue
+            return response, chain
+        raise httpx.TooManyRedirects(f"more than {MAX_REDIRECTS} redirects", request=response.request)
+
+    async def crawl(self, start_url, on_page=None, sitemap_entries=None):
+        """
+        Crawl the site reachable from start_url
+
+        Args:
+            start_url (str): Where to start; only URLs on the same host are followed
+            on_page (callable): Optional callback(CrawledPage, PageFacts) for every
+                HTML page, e.g. to feed body text to other analyses without keeping
+                it in memory
+            sitemap_entries (async iterable): Optional SitemapEntry records (e.g.
+                SitemapStream.entries()) crawled alongside the link graph; they take
+                at most half of max_pages, and reading stops once that is reached
+
+        Returns:
+            CrawlReport: Status codes, redirect chains and canonical targets per URL
+        """
+        started = time.monotonic()
+        start_url = urldefrag(start_url)[0]
+        # Follow the start URL's redirects first, so an apex -> www redirect does not end the crawl after one page
+        try:
+            prefetched = {start_url: await self._fetch(start_url, 0.0)}
+        except Exception:
+            prefetched = {}
+        final_start = str(prefetched[start_url][0].url) if prefetched else start_url
+        host = urlparse(final_start).netloc.lower()
+        robots = await self._load_robots(final_start)
+        delay = float(robots.crawl_delay(self.user_agent) or robots.crawl_delay("*") or 0) if self.respect_robots else 0.0
+
+        report = CrawlReport(start_url=start_url, crawl_delay=delay)
+        queue = asyncio.Queue()
+        report.pages[start_url] = CrawledPage(url=start_url)
+        queue.put_nowait(start_url)
+
+        async def visit(url):
+            page = report.pages[url]
+            try:
+                await inspect(url, page)
+            except Exception as e:
+                # A malformed URL or a failing on_page callback marks the page; the worker carries on
+                page.error = page.error or type(e).__name__
+
+        async def inspect(url, page):
+            if url in prefetched:
+                response, page.redirect_chain = prefetched.pop(url)
+            else:
+                response, page.redirect_chain = await self._fetch(url, delay)
+
+            page.status = response.status_code
+            page.final_url = str(response.url)
+            page.content_type = response.headers.get("content-type", "")
+            if response.status_code != 200 or "html" not in page.content_type:
+                return
+            if urlparse(page.final_url).netloc.lower() != host:
+                return
+
+            facts = extract_page_facts(response.text, page.final_url)
+            page.canonical = facts.canonical
+            if on_page:
+                on_page(page, facts)
+
+            # Canonical targets are crawled too so their status can be checked
+            links = list(facts.internal_links)
+            if facts.canonical and urlparse(facts.canonical).netloc.lower() == host:
+                links.append(facts.canonical)
+
+            for link in links:
+                link = urldefrag(link)[0]
+                known = report.pages.get(link)
+                if known:
+                    if url not in known.referrers:
+                        known.referrers.append(url)
+                    continue
+                if len(report.pages) >= self.max_pages:
+                    continue
+                if self.respect_robots and not robots.can_fetch(self.user_agent, link):
+                    if link not in report.blocked_by_robots:
+                        report.blocked_by_robots.append(link)
+                    continue
+                report.pages[link] = CrawledPage(url=link, depth=page.depth + 1, referrers=[url])
+                queue.put_nowait(link)
+
+        async def worker():
+            while True:
+                url = await queue.get()
+                try:
+                    await visit(url)
+                finally:
+                    queue.task_done()
+
+        async def seed(entries):
+            seeded = 0
+            try:
+                async for entry in entries:
+                    try:
+                        link = urldefrag(entry.loc)[0]
+                        if urlparse(link).netloc.lower() != host:
+                            continue
+                    except ValueError:
+                        continue
+                    known = report.pages.get(link)
+                    if known:
+                        known.in_sitemap = True
+                        continue
+                    if seeded >= self.max_pages // 2 or len(report.pages) >= self.max_pages:
+                        break
+                    if self.respect_robots and not robots.can_fetch(self.user_agent, link):
+                        if link not in report.blocked_by_robots:
+                            report.blocked_by_robots.append(link)
+                        continue
+                    report.pages[link] = CrawledPage(url=link, in_sitemap=True)
+                    queue.put_nowait(link)
+                    seeded += 1
+            finally:
+                if hasattr(entries, "aclose"):
+                    await entries.aclose()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.per_host_concurrency)]
+        try:
+            if sitemap_entries is not None:
+                # All seeds are queued before waiting on the queue, so it cannot drain early
+                await seed(sitemap_entries)
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        report.duration = time.monotonic() - started
+        return report
+
+    async def close(self):
+        await self.client.aclose()
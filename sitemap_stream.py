@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Streaming sitemap parser for large sites
+
+Sitemaps are read chunk by chunk: gzipped files (``.xml.gz``, or any body
+starting with the gzip magic bytes) are decompressed incrementally, and
+the XML is parsed with a pull parser that drops every ``<url>`` element
+once its record has been yielded. Memory stays flat however many URLs a
+sitemap holds; only the queue of child sitemap URLs from sitemap indexes
+grows, and the protocol caps an index at 50,000 of those.
+"""
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+XHTML_NS = "{http://www.w3.org/1999/xhtml}"
+
+# The protocol limits an uncompressed sitemap to 50 MB; anything far past that is not a sitemap
+MAX_SITEMAP_BYTES = 200 * 1024 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_INFLATE_CHUNK = 256 * 1024  # most decompressed bytes parsed at a time
+
+
+@dataclass
+class SitemapEntry:
+    """A <url> record from a sitemap"""
+    loc: str
+    lastmod: str = None
+    priority: float = None
+    changefreq: str = None
+    hreflang: dict = field(default_factory=dict)  # language code -> alternate URL (xhtml:link)
+    sitemap: str = None  # sitemap file the record was read from
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(node, name):
+    value = node.findtext(f"{SITEMAP_NS}{name}")
+    if value is None:
+        value = node.findtext(name)
+    return (value or "").strip() or None
+
+
+class SitemapParser:
+    """
+    Push parser for one sitemap or sitemap index document.
+
+    feed() takes raw bytes, gzipped or not, and returns the <url> records
+    completed by them; child sitemap URLs of an index collect in
+    ``children``.
+    """
+
+    def __init__(self, source=None, max_bytes=MAX_SITEMAP_BYTES):
+        self.source = source
+        self.max_bytes = max_bytes
+        self.children = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.gzipped = None  # decided by the first bytes fed
+        self._decompressor = None
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def feed(self, chunk):
+        """Parse the next chunk of the document and return the SitemapEntry records it completed"""
+        if not chunk:
+            return []
+        self.bytes_in += len(chunk)
+        if self.gzipped is None:
+            self.gzipped = chunk[:2] == _GZIP_MAGIC
+            if self.gzipped:
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor:
+            # Bounded output per call, so a small chunk cannot expand into a huge buffer
+            entries = []
+            data = self._decompressor.decompress(chunk, _INFLATE_CHUNK)
+            while data:
+                entries += self._parse(data)
+                data = self._decompressor.decompress(self._decompressor.unconsumed_tail, _INFLATE_CHUNK)
+            return entries
+        return self._parse(chunk)
+
+    def close(self):
+        """Finish the document; raises ET.ParseError if it is not well-formed XML"""
+        entries = []
+        if self._decompressor:
+            entries += self._parse(self._decompressor.flush())
+        self._parser.close()
+        return entries + self._collect()
+
+    def _parse(self, data):
+        self.bytes_out += len(data)
+        if self.bytes_out > self.max_bytes:
+            raise ValueError(f"sitemap {self.source or ''} is over {self.max_bytes // 2 ** 20} MB uncompressed")
+        self._parser.feed(data)
+        return self._collect()
+
+    def _collect(self):
+        entries = []
+        for event, node in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = node
+                continue
+            name = _local(node.tag)
+            if name == "sitemap":
+                loc = _text(node, "loc")
+                if loc:
+                    self.children.append(urljoin(self.source or "", loc))
+            elif name == "url":
+                loc = _text(node, "loc")
+                if loc:
+                    entries.append(self._entry(node, loc))
+            else:
+                continue
+            # Drop the finished record so the tree never holds more than one
+            self._root.clear()
+        return entries
+
+    def _entry(self, node, loc):
+        priority = _text(node, "priority")
+        try:
+            priority = float(priority) if priority is not None else None
+        except ValueError:
+            priority = None
+        hreflang = {}
+        for link in node.iter(f"{XHTML_NS}link"):
+            if link.get("rel") == "alternate" and link.get("hreflang") and link.get("href"):
+                hreflang[link.get("hreflang")] = link.get("href").strip()
+        return SitemapEntry(
+            loc=loc,
+            lastmod=_text(node, "lastmod"),
+            priority=priority,
+            changefreq=_text(node, "changefreq"),
+            hreflang=hreflang,
+            sitemap=self.source,
+        )
+
+
+def iter_sitemap(chunks, source=None):
+    """
+    SitemapEntry records of one document given as an iterable of byte chunks
+
+    Child sitemaps of an index are not followed; see SitemapStream for that.
+    """
+    parser = SitemapParser(source)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_sitemap(xml_text):
+    """
+    Parse a sitemap or sitemap index document held in memory
+
+    Returns:
+        tuple: (list of SitemapEntry for <url> records, list of child sitemap URLs)
+    """
+    parser = SitemapParser()
+    data = xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text
+    entries = parser.feed(data) + parser.close()
+    return entries, parser.children
+
+
+async def discover_sitemaps(fetcher, website_url):
+    """Sitemap URLs declared in robots.txt, falling back to /sitemap.xml"""
+    try:
+        robots = await fetcher.fetch(urljoin(website_url, "/robots.txt"))
+        sitemaps = [
+            line.split(":", 1)[1].strip()
+            for line in robots.html.splitlines()
+            if robots.status < 400 and line.lower().startswith("sitemap:")
+        ]
+    except Exception:
+        sitemaps = []
+    return sitemaps or [urljoin(website_url, "/sitemap.xml")]
+
+
+class SitemapStream:
+    """
+    Streams the URL records of a site's sitemaps, following sitemap indexes.
+
+    Every sitemap is downloaded with a streaming GET on a shared httpx
+    client and parsed as its bytes arrive. Counters of what was read are
+    kept for the audit prompt; failing sitemaps are recorded and skipped.
+    """
+
+    def __init__(self, client, max_sitemaps=1000, chunk_size=64 * 1024):
+        """
+        Args:
+            client (httpx.AsyncClient): Client the sitemaps are downloaded with
+            max_sitemaps (int): Most sitemap files read per entries() call
+            chunk_size (int): Bytes read from the network at a time
+        """
+        self.client = client
+        self.max_sitemaps = max_sitemaps
+        self.chunk_size = chunk_size
+        self.stats = {"sitemaps": 0, "indexes": 0, "gzipped": 0, "urls": 0, "with_hreflang": 0,
+                      "bytes_in": 0, "bytes_out": 0, "latest_lastmod": None}
+        self.failed = {}  # sitemap URL -> error
+        self.truncated = False  # stopped at max_sitemaps with sitemaps left unread
+
+    async def entries(self, sitemap_urls):
+        """
+        Async generator of SitemapEntry records from the given sitemaps and every sitemap they index
+
+        Sitemaps are read breadth first and each file at most once. Stop
+        iterating (or aclose() the generator) to abandon the download in
+        progress.
+        """
+        pending, seen = list(sitemap_urls), set()
+        while pending and len(seen) < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            parser = SitemapParser(sitemap_url)
+            try:
+                async with self.client.stream("GET", sitemap_url) as response:
+                    if response.status_code >= 400:
+                        self.failed[sitemap_url] = f"HTTP {response.status_code}"
+                        continue
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        for entry in parser.feed(chunk):
+                            yield self._count(entry)
+                for entry in parser.close():
+                    yield self._count(entry)
+            except Exception as e:
+                # Malformed XML, a corrupt gzip stream or a network error: the other sitemaps are still read
+                self.failed[sitemap_url] = f"{type(e).__name__}: {e}"
+            finally:
+                self.stats["sitemaps"] += sitemap_url not in self.failed
+                self.stats["indexes"] += bool(parser.children)
+                self.stats["gzipped"] += bool(parser.gzipped)
+                self.stats["bytes_in"] += parser.bytes_in
+                self.stats["bytes_out"] += parser.bytes_out
+            pending.extend(parser.children)
+        self.truncated = any(url not in seen for url in pending)
+
+    def _count(self, entry):
+        self.stats["urls"] += 1
+        self.stats["with_hreflang"] += bool(entry.hreflang)
+        if entry.lastmod and (self.stats["latest_lastmod"] is None or entry.lastmod > self.stats["latest_lastmod"]):
+            self.stats["latest_lastmod"] = entry.lastmod
+        return entry
+
+    def to_prompt(self, max_items=10):
+        """Summary of the sitemaps read so far for the audit task"""
+        stats = self.stats
+        line = (f"Sitemaps: read {stats['sitemaps']} file(s) ({stats['indexes']} sitemap index(es), "
+                f"{stats['gzipped']} gzipped), {stats['urls']} URL record(s)")
+        if stats["with_hreflang"]:
+            line += f", {stats['with_hreflang']} with hreflang alternates"
+        if stats["latest_lastmod"]:
+            line += f", latest lastmod {stats['latest_lastmod']}"
+        lines = [line]
+        if self.truncated:
+            lines.append(f"- Stopped after {self.max_sitemaps} sitemap files; the rest were not read")
+        if self.failed:
+            lines.append(f"- Sitemaps that could not be read: {len(self.failed)}")
+            lines += [f"  - {url}: {error}" for url, error in list(self.failed.items())[:max_items]]
+        return "\n".join(lines)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Stage timing and per-task traces (fetch, extraction, browser, LLM, report)
+
+The agents wrap their stages in ``stage(name)``. Every tracked task gets a
+TaskTrace: stages become nested spans, and spans only known after the fact
+(LLM calls, browser navigations, agent steps) are slotted into the span
+whose time window contains them. The trace is written next to the task's
+report as Chrome trace-event JSON (loads in Perfetto, chrome://tracing or
+speedscope as a flame graph) plus a Markdown summary table.
+
+``collect_stages()`` additionally sums seconds per stage for callers such
+as the benchmark. An optional cProfile or pyinstrument profiler can run for
+the whole task.
+"""
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# Stage names used by the agents
+FETCH = "fetch"  # plain HTTP prefetching
+EXTRACTION = "extraction"  # facts, statistics and digests built from fetched pages
+CRAWL = "crawl"  # site crawls and topic-gap indexing
+BROWSER = "browser"  # browser agent runs, including their LLM calls
+LLM = "llm"  # LLM calls made outside the browser agent (synthesis passes)
+REPORT = "report"  # building and writing the JSON/Markdown report
+
+# Spans recorded after the fact
+LLM_CALL = "llm_call"  # one chat model call, from the usage tracker
+NAVIGATION = "navigation"  # one page load in the browser, from Navigation Timing
+AGENT_STEP = "agent_step"  # one browser-use step: DOM state, LLM call and the previous step's actions
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+_current_timings = ContextVar("stage_timings", default=None)
+_current_trace = ContextVar("task_trace", default=None)
+_current_span = ContextVar("trace_span", default=None)
+
+
+class StageTimings:
+    """Total seconds and number of entries per stage"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.counts = {}
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self):
+        return {name: {"seconds": round(self.seconds[name], 4), "count": self.counts[name]} for name in self.seconds}
+
+
+@dataclass
+class Span:
+    """A timed section of a task; start and end are time.perf_counter() values"""
+    name: str
+    start: float
+    end: float = None
+    attrs: dict = field(default_factory=dict)
+    children: list = field(default_factory=list)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def contains(self, start, end):
+        return self.start <= start and end <= (self.end if self.end is not None else float("inf"))
+
+    def walk(self, depth=0):
+        yield self, depth
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class TaskTrace:
+    """Span tree of one task run, rooted at a span covering the whole task"""
+
+    def __init__(self, label=None):
+        self.label = label or "task"
+        self.started_at = time.time()
+        self.root = Span(self.label, time.perf_counter())
+        self.profiler = None
+
+    def open(self, name, parent=None, **attrs):
+        span = Span(name, time.perf_counter(), attrs=attrs)
+        (parent or self.root).children.append(span)
+        return span
+
+    def add(self, name, start, end, **attrs):
+        """
+        Record a span measured elsewhere
+
+        It goes under the deepest span whose window contains it, and adopts
+        that span's children that fall inside its own window.
+        """
+        parent = self.root
+        while True:
+            inner = next((child for child in parent.children if child.contains(start, end)), None)
+            if inner is None:
+                break
+            parent = inner
+        span = Span(name, start, end, attrs=attrs)
+        span.children = [child for child in parent.children if child.end is not None and span.contains(child.start, child.end)]
+        parent.children = [child for child in parent.children if child not in span.children] + [span]
+        parent.children.sort(key=lambda child: child.start)
+        return span
+
+    def totals(self):
+        """name -> {"count", "seconds"} over every span of the trace (inclusive time)"""
+        totals = {}
+        for span, depth in self.root.walk():
+            if depth == 0:
+                continue
+            entry = totals.setdefault(span.name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += span.duration
+            entry["max_seconds"] = max(entry["max_seconds"], span.duration)
+        return totals
+
+    def summary(self):
+        """Totals per span name plus the derived figures of the summary table"""
+        wall = self.root.duration
+        totals = self.totals()
+        steps = [span for span, _ in self.root.walk() if span.name == AGENT_STEP]
+        llm_in_steps = sum(child.duration for step in steps for child, _ in step.walk() if child.name == LLM_CALL)
+        actions = sum(step.attrs.get("actions", 0) for step in steps)
+        tracked = sum(child.duration for child in self.root.children)
+        return {
+            "task": self.label,
+            "wall_s": round(wall, 3),
+            "spans": {
+                name: {"count": entry["count"], "seconds": round(entry["seconds"], 3),
+                       "max_seconds": round(entry["max_seconds"], 3)}
+                for name, entry in sorted(totals.items(), key=lambda item: -item[1]["seconds"])
+            },
+            # Agent step time not spent waiting for the model: DOM state extraction and browser actions
+            "dom_and_actions_s": round(sum(step.duration for step in steps) - llm_in_steps, 3),
+            "slow_mo_s": round(actions * self.root.attrs.get("slow_mo_ms", 0) / 1000, 3),
+            "failed_llm_calls": sum(1 for span, _ in self.root.walk() if span.name == LLM_CALL and span.attrs.get("error")),
+            "untracked_s": round(max(0.0, wall - tracked), 3),
+        }
+
+    def trace_events(self):
+        """Chrome trace-event format: one complete ("X") event per span, times in microseconds"""
+        events = []
+        for span, depth in self.root.walk():
+            events.append({
+                "name": span.name,
+                "cat": "task" if depth == 0 else "stage",
+                "ph": "X",
+                "ts": round((span.start - self.root.start) * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": 1,
+                "tid": 1,
+                "args": {key: str(value) for key, value in span.attrs.items()},
+            })
+        return events
+
+    def to_markdown(self, summary=None):
+        summary = summary or self.summary()
+        wall = summary["wall_s"] or 1.0
+        lines = [
+            f"# Timing: {self.label}",
+            "",
+            f"Wall time {summary['wall_s']:.2f}s.",
+            "",
+            "| Span | Count | Total s | Max s | Share of task |",
+            "|------|------:|--------:|------:|--------------:|",
+        ]
+        for name, entry in summary["spans"].items():
+            lines.append(
+                f"| {name} | {entry['count']} | {entry['seconds']:.2f} | {entry['max_seconds']:.2f} "
+                f"| {entry['seconds'] / wall:.0%} |"
+            )
+        lines += [
+            "",
+            f"- DOM state extraction and browser actions (agent steps minus their LLM calls): "
+            f"{summary['dom_and_actions_s']:.2f}s",
+            f"- Estimated slow_mo delay: {summary['slow_mo_s']:.2f}s",
+            f"- Failed (retried) LLM calls: {summary['failed_llm_calls']}",
+            f"- Time outside any stage: {summary['untracked_s']:.2f}s",
+            "",
+            "Spans nest, so totals overlap (e.g. llm_call inside agent_step inside browser).",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path_prefix):
+        """
+        Write <prefix>.timing.json and <prefix>.timing.md, plus the profiler output if one ran
+
+        Returns:
+            dict: Kind of output -> path
+        """
+        summary = self.summary()
+        paths = {"trace": f"{path_prefix}.timing.json", "summary": f"{path_prefix}.timing.md"}
+        with open(paths["trace"], "w", encoding="utf-8") as f:
+            json.dump({
+                "traceEvents": self.trace_events(),
+                "displayTimeUnit": "ms",
+                "otherData": {"started_at": self.started_at, "summary": summary},
+            }, f)
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(self.to_markdown(summary))
+        if self.profiler:
+            paths.update(self.profiler.write(path_prefix))
+            self.profiler = None
+        return paths
+
+
+class TaskProfiler:
+    """cProfile or pyinstrument profile of one task (pyinstrument is optional: pip install pyinstrument)"""
+
+    def __init__(self, kind):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler {kind!r} (choose from {', '.join(PROFILERS)})")
+        self.kind = kind
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler(async_mode="enabled")
+        else:
+            self._profiler = cProfile.Profile()
+        self.running = False
+
+    def start(self):
+        """Start profiling; returns False if another profiler already runs in this thread"""
+        try:
+            if self.kind == "pyinstrument":
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+        except (RuntimeError, ValueError):
+            # Only one cProfile/sys.setprofile hook per thread: concurrent tasks are not profiled
+            return False
+        self.running = True
+        return True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def write(self, path_prefix):
+        self.stop()
+        if self.kind == "pyinstrument":
+            from pyinstrument.renderers import SpeedscopeRenderer
+            paths = {"profile": f"{path_prefix}.profile.html", "flamegraph": f"{path_prefix}.speedscope.json"}
+            with open(paths["profile"], "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            with open(paths["flamegraph"], "w", encoding="utf-8") as f:
+                f.write(self._profiler.output(SpeedscopeRenderer()))
+            return paths
+        path = f"{path_prefix}.prof"
+        self._profiler.dump_stats(path)  # view with snakeviz or python -m pstats
+        return {"profile": path}
+
+
+def check_profiler(kind):
+    """Validate a profiler choice up front, so a missing pyinstrument fails before any task runs"""
+    if kind is None:
+        return None
+    TaskProfiler(kind)
+    return kind
+
+
+@contextmanager
+def task_trace(label=None, profiler=None):
+    """Trace (and optionally profile) everything run inside the block as one task"""
+    trace = TaskTrace(label)
+    if profiler:
+        trace.profiler = TaskProfiler(profiler)
+        if not trace.profiler.start():
+            trace.profiler = None
+    token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.root.end = time.perf_counter()
+        if trace.profiler:
+            trace.profiler.stop()
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+
+
+def current_trace():
+    """TaskTrace of the task running in this asyncio task, or None"""
+    return _current_trace.get()
+
+
+def record_span(name, start, end, **attrs):
+    """Add a span measured elsewhere to the current task's trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, end, **attrs)
+
+
+@contextmanager
+def stage(name, **attrs):
+    """Time the enclosed block as a span of the task trace and, when collected, as part of stage `name`"""
+    timings = _current_timings.get()
+    trace = _current_trace.get()
+    if timings is None and trace is None:
+        yield
+        return
+    span = trace.open(name, parent=_current_span.get(), **attrs) if trace else None
+    token = _current_span.set(span) if span else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(name, time.perf_counter() - started)
+        if span:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+
+
+@contextmanager
+def collect_stages():
+    """Collect the stage timings of everything run inside the block, including asyncio tasks it starts"""
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Step-level checkpoints for the numbered-step task prompts
+
+The prompts in custom_seo_tasks.py are numbered step lists. Run one step
+at a time, each step's output, the URLs the agent visited and its
+step-by-step reasoning are saved to disk as soon as the step completes, so
+a rerun after a failure picks up at the first unfinished step.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import time
+
+from prompt_compaction import fit_text
+
+_STEP = re.compile(r"^(\s*)(\d+)\.(?:\s|$)")
+
+# How much of each completed step's output is repeated in the following step prompts,
+# and how much all of them may take together
+STEP_OUTPUT_MAX_CHARS = 6000
+COMPLETED_STEPS_MAX_CHARS = 24000
+
+
+def split_steps(task):
+    """
+    Split a task prompt into its preamble, numbered steps and trailing context
+
+    A step runs until the next numbered line; indented lines belong to the
+    step above them. The first non-blank line that is neither indented
+    further than the step numbers nor a new step ends the list, and the rest
+    (usually prefetched facts) is returned as context.
+
+    Returns:
+        tuple: (preamble str, list of (number, step text), context str);
+            steps is empty if the prompt has no numbered list
+    """
+    lines = task.splitlines()
+    first = next((i for i, line in enumerate(lines) if _STEP.match(line)), None)
+    if first is None:
+        return task.strip(), [], ""
+
+    indent = len(_STEP.match(lines[first]).group(1))
+    steps, end = [], len(lines)
+    for i in range(first, len(lines)):
+        line = lines[i]
+        match = _STEP.match(line)
+        if match and len(match.group(1)) == indent:
+            steps.append([int(match.group(2)), [line.strip()]])
+        elif not line.strip() or len(line) - len(line.lstrip()) > indent:
+            steps[-1][1].append(line.rstrip()[indent:] if line.strip() else "")
+        else:
+            end = i
+            break
+
+    preamble = "\n".join(line.strip() for line in lines[:first]).strip()
+    context = "\n".join(lines[end:]).strip()
+    steps = [(number, "\n".join(text).strip()) for number, text in steps]
+    # Optional steps left empty by the prompt template (e.g. no extra competitors) are dropped
+    return preamble, [(number, text) for number, text in steps if text != f"{number}."], context
+
+
+def step_prompt(preamble, steps, numbers, completed, context, final_instructions=""):
+    """
+    Prompt for running one or more steps of a numbered task
+
+    Args:
+        preamble (str): The task's opening sentence(s)
+        steps (list): All (number, text) steps, for orientation
+        numbers (list): The steps to run now
+        completed (dict): step number -> recorded step of every completed step
+        context (str): Prefetched facts and other context of the task
+        final_instructions (str): Appended when the last step is among them
+    """
+    outline = "\n".join(text.splitlines()[0] for _, text in steps)
+    lines = [preamble, "", "The full task has these steps:", outline, ""]
+    if completed:
+        lines.append("Results of the steps already completed (do not redo them):")
+        # Many completed steps share the total, each cut at a line boundary
+        max_chars = min(STEP_OUTPUT_MAX_CHARS, COMPLETED_STEPS_MAX_CHARS // len(completed))
+        for done_number in sorted(completed):
+            output = fit_text(completed[done_number]["output"], max_chars)
+            lines.append(f"\n--- Step {done_number} result ---\n{output}")
+        lines.append("")
+
+    texts = dict(steps)
+    is_last = steps[-1][0] in numbers
+    label = f"step {numbers[0]}" if len(numbers) == 1 else f"steps {numbers[0]}-{numbers[-1]}"
+    lines.append(f"Now carry out {label} only:")
+    lines += [texts[number] for number in numbers]
+    if is_last:
+        lines.append(
+            "\nThis is the final part of the task: write the complete result of the whole task, "
+            "combining the results of the completed steps above."
+        )
+    else:
+        lines.append(
+            "\nFinish with a complete summary of everything you found in this step; "
+            "later steps only see that summary, not your browsing."
+        )
+    if context:
+        lines += ["", context]
+    prompt = "\n".join(lines)
+    return prompt + final_instructions if is_last else prompt
+
+
+class StepRecorder:
+    """browser-use step observer collecting visited URLs and the agent's reasoning for one task step"""
+
+    def __init__(self):
+        self.urls = []
+        self.conversation = []
+        self.iterations = 0
+
+    def on_step(self, state, model_output, step):
+        self.iterations += 1
+        if state.url and (not self.urls or self.urls[-1] != state.url):
+            self.urls.append(state.url)
+        current = getattr(model_output, "current_state", None)
+        self.conversation.append({
+            "step": step,
+            "url": state.url,
+            "evaluation": getattr(current, "evaluation_previous_goal", None),
+            "memory": getattr(current, "memory", None),
+            "next_goal": getattr(current, "next_goal", None),
+            "actions": [action.model_dump(exclude_unset=True) for action in model_output.action],
+        })
+
+
+class TaskCheckpoint:
+    """
+    On-disk record of the completed steps of one task.
+
+    The checkpoint is keyed by the task's preamble and step texts (which
+    contain the keyword and URLs) but not by its context, which changes
+    between runs, e.g. measured response times. Checkpoints older than
+    max_age seconds are ignored, so stale partial work is not reused.
+    """
+
+    def __init__(self, checkpoint_dir, preamble, steps, max_age=7 * 86400):
+        key = hashlib.sha256(json.dumps([preamble, steps]).encode("utf-8")).hexdigest()[:24]
+        self.path = os.path.join(checkpoint_dir, f"{key}.json")
+        self.max_age = max_age
+        self.data = self._load() or {
+            "created_at": time.time(),
+            "preamble": preamble,
+            "steps": {},
+        }
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get("created_at", 0) > self.max_age:
+            return None
+        return data
+
+    def completed(self):
+        """step number -> recorded step, for every step completed so far"""
+        return {int(number): step for number, step in self.data["steps"].items()}
+
+    def iterations_used(self):
+        return sum(step.get("iterations", 0) for step in self.data["steps"].values())
+
+    def record(self, number, text, output, recorder):
+        """Persist a completed step"""
+        self.data["steps"][str(number)] = {
+            "text": text,
+            "output": output,
+            "urls": recorder.urls,
+            "conversation": recorder.conversation,
+            "iterations": recorder.iterations,
+            "completed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, default=str)
+        # Atomic replace so a crash never leaves a half-written checkpoint behind
+        os.replace(tmp_path, self.path)
+
+    def delete(self):
+        """Remove the checkpoint once the whole task has finished"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Vectorised keyword-density and term statistics over a set of pages
+
+Pages are tokenised once into a sparse document-term matrix; keyword density,
+TF-IDF and competitor coverage gaps are then computed with matrix operations
+so the numbers handed to the LLM are counted, not guessed.
+"""
+import re
+
+import numpy as np
+from scipy import sparse
+
+_WORD = re.compile(r"[^\W\d_](?:[\w'-]*\w)?", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your yours
+yourself yourselves also may might must shall would can't don't it's we're you're
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased word tokens"""
+    return _WORD.findall(text.lower())
+
+
+def _ngrams(tokens, n):
+    """n-grams that neither start nor end with a stopword"""
+    for i in range(len(tokens) - n + 1):
+        gram = tokens[i:i + n]
+        if gram[0] in STOPWORDS or gram[-1] in STOPWORDS:
+            continue
+        yield " ".join(gram)
+
+
+class TermStatistics:
+    """
+    Sparse document-term matrix over a set of named documents.
+
+    Rows are documents and columns are 1..max_n word n-grams. Raw keyword
+    phrases are looked up directly, so densities include stopword n-grams
+    that are otherwise left out of the vocabulary.
+    """
+
+    def __init__(self, documents, max_n=3):
+        """
+        Args:
+            documents (dict): Maps a document name (usually its URL) to its body text
+            max_n (int): Longest n-gram to count
+        """
+        self.names = list(documents)
+        self.max_n = max_n
+        self._tokens = [tokenize(documents[name]) for name in self.names]
+        self.lengths = np.array([len(tokens) for tokens in self._tokens], dtype=np.float64)
+
+        vocabulary = {}
+        rows, cols = [], []
+        for row, tokens in enumerate(self._tokens):
+            for n in range(1, max_n + 1):
+                for gram in _ngrams(tokens, n):
+                    rows.append(row)
+                    cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+
+        self.vocabulary = vocabulary
+        self.terms = np.empty(len(vocabulary), dtype=object)
+        for term, index in vocabulary.items():
+            self.terms[index] = term
+        # Duplicate (row, col) pairs are summed, giving raw counts
+        self.counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(self.names), len(vocabulary)),
+        )
+        self.counts.sum_duplicates()
+        self._tfidf = None
+
+    def _row(self, name):
+        return self.names.index(name)
+
+    def phrase_counts(self, phrase):
+        """Occurrences of a phrase in every document (array aligned with self.names)"""
+        phrase_tokens = tokenize(phrase)
+        column = self.vocabulary.get(" ".join(phrase_tokens))
+        if column is not None:
+            return self.counts[:, column].toarray().ravel()
+
+        # Stopword-bounded or longer phrases are not in the vocabulary; count them directly
+        n = len(phrase_tokens)
+        return np.array(
+            [
+                sum(1 for i in range(len(tokens) - n + 1) if tokens[i:i + n] == phrase_tokens) if n else 0
+                for tokens in self._tokens
+            ],
+            dtype=np.float64,
+        )
+
+    def keyword_density(self, keyword):
+        """Share of each document's words that belong to occurrences of the keyword, in percent"""
+        n = max(1, len(tokenize(keyword)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            density = np.where(self.lengths > 0, self.phrase_counts(keyword) * n / self.lengths * 100, 0.0)
+        return {name: float(value) for name, value in zip(self.names, density.round(2))}
+
+    def tfidf(self):
+        """L2-normalised TF-IDF matrix (smooth idf), same shape as counts"""
+        if self._tfidf is not None:
+            return self._tfidf
+        document_frequency = np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+        idf = np.log((1 + len(self.names)) / (1 + document_frequency)) + 1
+        weighted = self.counts.multiply(idf[np.newaxis, :]).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self._tfidf = (sparse.diags(1 / norms) @ weighted).tocsr()
+        return self._tfidf
+
+    def top_terms(self, name, n=15):
+        """Highest TF-IDF terms of one document"""
+        row = self.tfidf()[self._row(name)].toarray().ravel()
+        order = np.argsort(row)[::-1][:n]
+        return [(self.terms[i], round(float(row[i]), 4)) for i in order if row[i] > 0]
+
+    def coverage_gaps(self, target, competitors=None, min_share=0.5, top_n=30):
+        """
+        Terms used by at least min_share of the competitors but absent from the target
+
+        Returns:
+            list: (term, share of competitors using it, mean competitor TF-IDF), best first
+        """
+        competitors = competitors or [name for name in self.names if name != target]
+        if not competitors:
+            return []
+        competitor_rows = [self._row(name) for name in competitors]
+
+        presence = (self.counts[competitor_rows] > 0).astype(np.float64)
+        share = np.asarray(presence.mean(axis=0)).ravel()
+        weight = np.asarray(self.tfidf()[competitor_rows].mean(axis=0)).ravel()
+        missing = self.counts[self._row(target)].toarray().ravel() == 0
+
+        candidates = np.flatnonzero(missing & (share >= min_share))
+        order = candidates[np.argsort(-(share[candidates] * weight[candidates]))][:top_n]
+        return [(self.terms[i], round(float(share[i]), 2), round(float(weight[i]), 4)) for i in order]
+
+    def ngram_coverage(self, target, competitors=None, min_share=0.5):
+        """Per n-gram length, the share of commonly used competitor n-grams the target also uses"""
+        competitors = competitors or [name for name in self.names if name != target]
+        if not competitors:
+            return {}
+        competitor_rows = [self._row(name) for name in competitors]
+        share = np.asarray((self.counts[competitor_rows] > 0).astype(np.float64).mean(axis=0)).ravel()
+        present = self.counts[self._row(target)].toarray().ravel() > 0
+        lengths = np.array([term.count(" ") + 1 for term in self.terms])
+
+        coverage = {}
+        for n in range(1, self.max_n + 1):
+            common = (share >= min_share) & (lengths == n)
+            if common.any():
+                coverage[n] = round(float(present[common].mean()), 2)
+        return coverage
+
+    def to_prompt(self, target, keyword, max_terms=20):
+        """Measured content statistics for the LLM prompt"""
+        density = self.keyword_density(keyword)
+        competitors = [name for name in self.names if name != target]
+        lines = [f"Measured content statistics for \"{keyword}\" (computed, not estimated):"]
+        for name, length in zip(self.names, self.lengths):
+            marker = " (target)" if name == target else ""
+            lines.append(f"- {name}{marker}: {int(length)} words, keyword density {density[name]}%")
+
+        if target in self.names:
+            top = ", ".join(term for term, _ in self.top_terms(target, max_terms))
+            lines.append(f"- Most distinctive terms on the target page: {top or '(none)'}")
+            if competitors:
+                coverage = self.ngram_coverage(target, competitors)
+                # No n-grams common to the competitors: nothing to cover, so no line
+                if coverage:
+                    lines.append(
+                        "- Target covers "
+                        + ", ".join(f"{share:.0%} of common {n}-grams" for n, share in coverage.items())
+                    )
+                gaps = self.coverage_gaps(target, competitors, top_n=max_terms)
+                lines.append(
+                    "- Terms most competitors use but the target does not: "
+                    + (", ".join(f"{term} ({share:.0%})" for term, share, _ in gaps) or "(none)")
+                )
+        return "\n".join(lines)
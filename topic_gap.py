@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Topic-gap computation over a local passage embedding index
+
+Our site's pages are split into passages, embedded on the CPU and kept in an
+on-disk approximate-nearest-neighbour index. Competitor passages with no
+close match in that index are the topics the site does not cover yet.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from results_store import site_key
+from text_stats import STOPWORDS, tokenize
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_passages(text, target_words=60):
+    """Split body text into passages of roughly target_words words on sentence boundaries"""
+    passages, current, count = [], [], 0
+    for sentence in _SENTENCE.split(text):
+        words = len(sentence.split())
+        if not words:
+            continue
+        current.append(sentence)
+        count += words
+        if count >= target_words:
+            passages.append(" ".join(current))
+            current, count = [], 0
+    if current and (count >= target_words // 3 or not passages):
+        passages.append(" ".join(current))
+    return passages
+
+
+class HashingEmbedder:
+    """
+    Dependency-free CPU embedder: signed feature hashing of unigrams and bigrams.
+
+    Any object with an ``embed(texts) -> np.ndarray`` method returning
+    L2-normalised rows (e.g. a wrapper around a local sentence-transformer)
+    can be used in its place.
+    """
+
+    def __init__(self, dim=2048):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = [token for token in tokenize(text) if token not in STOPWORDS]
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        # Sublinear term frequency so repeated words do not dominate a passage
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+class PassageIndex:
+    """
+    On-disk ANN index of passage vectors using random-hyperplane LSH.
+
+    Vectors and passage metadata are stored as ``vectors.npy`` and
+    ``passages.json`` in the index directory; the hyperplanes are derived
+    from a fixed seed, so buckets are rebuilt cheaply on load.
+    """
+
+    def __init__(self, path, dim, tables=8, bits=12, seed=7):
+        self.path = path
+        self.dim = dim
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.passages = []  # [{"url", "content_hash", "text"}]
+        self.built_at = 0.0
+        self._buckets = None
+        self._load()
+
+    def _load(self):
+        meta_path = os.path.join(self.path, "passages.json")
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        if not (os.path.exists(meta_path) and os.path.exists(vectors_path)):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(vectors_path)
+        if vectors.shape[1] != self.dim:
+            return
+        self.vectors = vectors
+        self.passages = meta["passages"]
+        self.built_at = meta["built_at"]
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "vectors.npy"), self.vectors)
+        with open(os.path.join(self.path, "passages.json"), "w", encoding="utf-8") as f:
+            json.dump({"built_at": self.built_at, "passages": self.passages}, f)
+
+    def content_hashes(self):
+        """url -> content hash of the indexed version of each page"""
+        return {passage["url"]: passage["content_hash"] for passage in self.passages}
+
+    def replace(self, documents, embedder, prune=True):
+        """
+        Update the index from documents, re-embedding only pages whose content changed
+
+        Args:
+            documents (dict): url -> body text
+            embedder: Object with an embed(texts) method
+            prune (bool): Drop indexed pages missing from documents. Only a
+                pruning rebuild counts as a full rebuild for built_at.
+        """
+        indexed = self.content_hashes()
+        unchanged = set()
+        new_passages, new_texts = [], []
+        for url, text in documents.items():
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if indexed.get(url) == content_hash:
+                unchanged.add(url)
+                continue
+            for passage in split_passages(text):
+                new_passages.append({"url": url, "content_hash": content_hash, "text": passage})
+                new_texts.append(passage)
+
+        keep = np.array(
+            [p["url"] in unchanged or (not prune and p["url"] not in documents) for p in self.passages], dtype=bool
+        )
+        kept = [p for p, k in zip(self.passages, keep) if k]
+        if prune:
+            self.built_at = time.time()
+        if not new_texts and len(kept) == len(self.passages):
+            if prune:
+                self.save()
+            return
+        vectors = [self.vectors[keep]]
+        if new_texts:
+            vectors.append(embedder.embed(new_texts).astype(np.float32))
+        self.vectors = np.vstack(vectors) if len(vectors) > 1 else vectors[0]
+        self.passages = kept + new_passages
+        self._buckets = None
+        self.save()
+
+    def _codes(self, vectors):
+        """Bucket code per table for each vector: (tables, n) int array"""
+        bits = (np.einsum("tbd,nd->tnb", self.planes, vectors) > 0).astype(np.int64)
+        return bits @ (1 << np.arange(bits.shape[-1], dtype=np.int64))
+
+    def _build_buckets(self):
+        self._buckets = []
+        if not len(self.vectors):
+            return
+        for table_codes in self._codes(self.vectors):
+            buckets = {}
+            for row, code in enumerate(table_codes):
+                buckets.setdefault(int(code), []).append(row)
+            self._buckets.append(buckets)
+
+    def nearest(self, vectors, exact_below=5000):
+        """
+        Best cosine similarity and matching passage row for each query vector
+
+        Small indexes are searched exactly; larger ones only compare
+        candidates that share an LSH bucket with the query in any table.
+        """
+        if not len(self.vectors):
+            return np.zeros(len(vectors)), np.full(len(vectors), -1)
+        if len(self.vectors) <= exact_below:
+            scores = vectors @ self.vectors.T
+            best = scores.argmax(axis=1)
+            return scores[np.arange(len(vectors)), best], best
+
+        if self._buckets is None:
+            self._build_buckets()
+        codes = self._codes(vectors)
+        similarities = np.zeros(len(vectors))
+        rows = np.full(len(vectors), -1)
+        for i, vector in enumerate(vectors):
+            candidates = set()
+            for table, buckets in enumerate(self._buckets):
+                candidates.update(buckets.get(int(codes[table, i]), ()))
+            if not candidates:
+                continue
+            candidates = np.fromiter(candidates, dtype=np.int64)
+            scores = self.vectors[candidates] @ vector
+            best = scores.argmax()
+            similarities[i], rows[i] = scores[best], candidates[best]
+        return similarities, rows
+
+
+@dataclass
+class TopicGap:
+    """A competitor passage with no close counterpart on our site"""
+    text: str
+    urls: list  # competitor pages covering this topic
+    best_match: float  # cosine similarity of the closest passage on our site
+
+
+class TopicGapEngine:
+    """Computes and caches competitor topic gaps against a site's passage index"""
+
+    def __init__(self, cache_dir="seo_cache/topic_gaps", embedder=None, threshold=0.35):
+        self.cache_dir = cache_dir
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+
+    def site_index(self, website_url):
+        dim = getattr(self.embedder, "dim", None) or self.embedder.embed(["probe"]).shape[1]
+        return PassageIndex(os.path.join(self.cache_dir, "sites", site_key(website_url) or "site"), dim)
+
+    def index_site(self, website_url, documents, prune=True):
+        """Add or refresh our site's pages (url -> body text) in its on-disk index"""
+        index = self.site_index(website_url)
+        index.replace(documents, self.embedder, prune=prune)
+        return index
+
+    def gaps(self, website_url, competitor_documents, max_gaps=20):
+        """
+        Competitor passages without a close match on our site
+
+        Args:
+            website_url (str): Our site; its index must have been built with index_site()
+            competitor_documents (dict): Competitor url -> body text
+            max_gaps (int): Maximum number of gaps to return
+
+        Returns:
+            list: TopicGap objects, most widely covered topics first
+        """
+        index = self.site_index(website_url)
+        cache_key = hashlib.sha256(
+            json.dumps(
+                [sorted(index.content_hashes().items()), self.threshold, sorted((url, hashlib.sha256(text.encode("utf-8")).hexdigest())
+                                                        for url, text in competitor_documents.items())]
+            ).encode("utf-8")
+        ).hexdigest()
+        cache_path = os.path.join(self.cache_dir, "results", f"{cache_key}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return [TopicGap(**gap) for gap in json.load(f)][:max_gaps]
+
+        passages, sources = [], []
+        for url, text in competitor_documents.items():
+            for passage in split_passages(text):
+                passages.append(passage)
+                sources.append(url)
+        if not passages:
+            return []
+
+        vectors = self.embedder.embed(passages)
+        best_match, _ = index.nearest(vectors)
+        missing = np.flatnonzero(best_match < self.threshold)
+
+        # Merge gap passages that say the same thing so each topic is listed once
+        gaps = []
+        representatives = []
+        for i in missing[np.argsort(best_match[missing])]:
+            if representatives:
+                similarity = np.array(representatives) @ vectors[i]
+                closest = int(similarity.argmax())
+                if similarity[closest] >= 0.5:
+                    if sources[i] not in gaps[closest].urls:
+                        gaps[closest].urls.append(sources[i])
+                    continue
+            representatives.append(vectors[i])
+            gaps.append(TopicGap(passages[i], [sources[i]], round(float(best_match[i]), 3)))
+
+        gaps.sort(key=lambda gap: (-len(gap.urls), gap.best_match))
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump([gap.__dict__ for gap in gaps], f)
+        return gaps[:max_gaps]
+
+    @staticmethod
+    def to_prompt(gaps, max_chars=240):
+        """Topic-gap list for the content gap prompt"""
+        if not gaps:
+            return ""
+        lines = ["Competitor passages with no close match anywhere on the site (computed topic gaps):"]
+        for gap in gaps:
+            text = gap.text if len(gap.text) <= max_chars else gap.text[:max_chars].rsplit(" ", 1)[0] + "..."
+            lines.append(f"- [{len(gap.urls)} competitor page(s), closest match {gap.best_match:.2f}] {text}")
+        return "\n".join(lines)
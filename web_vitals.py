@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Lab Core Web Vitals: measured page speed instead of "observe loading time"
+
+Every URL is loaded several times in a fresh browser context (cold cache)
+under a CPU and network throttling profile applied through the Chrome
+DevTools Protocol. Each load records Navigation Timing, First Contentful
+Paint, Largest Contentful Paint, Cumulative Layout Shift, Total Blocking
+Time and the resource waterfall; the samples are summarised as medians and
+percentiles and rated against the Core Web Vitals thresholds.
+
+These are lab numbers: TBT stands in for INP, and it is counted from FCP to
+the end of the measurement window rather than to Time to Interactive.
+Throttling needs Chromium.
+"""
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from page_cache import SingleFlight
+from stage_timing import stage
+
+# Stage name of web vitals measurements
+VITALS = "web_vitals"
+
+
+@dataclass(frozen=True)
+class ThrottlingProfile:
+    """CPU and network conditions a page is measured under"""
+    name: str
+    cpu_slowdown: float = 1.0  # Emulation.setCPUThrottlingRate; 1 is no throttling
+    download_kbps: float = None  # None leaves the network unthrottled
+    upload_kbps: float = None
+    latency_ms: float = 0.0  # added round-trip time
+    viewport: tuple = (1350, 940)
+
+    @property
+    def throttles_network(self):
+        return self.download_kbps is not None
+
+    def describe(self):
+        parts = [f"{self.cpu_slowdown:g}x CPU slowdown"]
+        if self.throttles_network:
+            parts.append(f"{self.download_kbps / 1024:.1f} Mbps down / {self.latency_ms:g} ms RTT")
+        else:
+            parts.append("unthrottled network")
+        return f"{self.name} ({', '.join(parts)}, {self.viewport[0]}x{self.viewport[1]})"
+
+
+# Lighthouse's DevTools throttling presets ("Slow 4G" on a mid-tier phone, and desktop)
+THROTTLING_PROFILES = {
+    "mobile": ThrottlingProfile(
+        name="mobile", cpu_slowdown=4, download_kbps=1474.56, upload_kbps=675, latency_ms=562.5,
+        viewport=(412, 823),
+    ),
+    "desktop": ThrottlingProfile(name="desktop", cpu_slowdown=1, download_kbps=10240, upload_kbps=10240, latency_ms=40),
+    "none": ThrottlingProfile(name="none"),
+}
+
+# (good up to, poor above) per metric; LCP, CLS and TBT are the lab Core Web Vitals
+THRESHOLDS = {
+    "lcp_ms": (2500, 4000),
+    "cls": (0.1, 0.25),
+    "tbt_ms": (200, 600),
+    "fcp_ms": (1800, 3000),
+    "ttfb_ms": (800, 1800),
+}
+
+METRICS = ("ttfb_ms", "fcp_ms", "lcp_ms", "cls", "tbt_ms", "dom_content_loaded_ms", "load_ms", "transfer_kb", "requests")
+
+# Installed before any page script runs; buffered observers also see entries from before it ran
+_OBSERVERS_JS = """
+(() => {
+    const vitals = window.__seoVitals = {lcp: null, lcpElement: null, shifts: [], longTasks: []};
+    const observe = (type, callback) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({type, buffered: true});
+        } catch (e) {}
+    };
+    observe('largest-contentful-paint', entry => {
+        vitals.lcp = entry.startTime;
+        const el = entry.element;
+        vitals.lcpElement = el ? (el.tagName.toLowerCase() + (el.id ? '#' + el.id : '')) : null;
+        vitals.lcpUrl = entry.url || null;
+    });
+    observe('layout-shift', entry => {
+        if (!entry.hadRecentInput) vitals.shifts.push([entry.startTime, entry.value]);
+    });
+    observe('longtask', entry => vitals.longTasks.push([entry.startTime, entry.duration]));
+})();
+"""
+
+_COLLECT_JS = """
+() => {
+    const vitals = window.__seoVitals || {shifts: [], longTasks: []};
+    const nav = performance.getEntriesByType('navigation')[0] || {};
+    const fcpEntry = performance.getEntriesByType('paint').find(e => e.name === 'first-contentful-paint');
+    const fcp = fcpEntry ? fcpEntry.startTime : null;
+
+    // CLS: the largest session window of shifts less than 1 s apart and at most 5 s long
+    let cls = 0, session = 0, first = 0, last = 0;
+    for (const [start, value] of vitals.shifts) {
+        if (session && (start - last > 1000 || start - first > 5000)) session = 0;
+        if (!session) first = start;
+        session += value;
+        last = start;
+        cls = Math.max(cls, session);
+    }
+
+    // TBT: the part of every long task after FCP that exceeds 50 ms
+    let tbt = 0;
+    for (const [start, duration] of vitals.longTasks) {
+        if (fcp === null) break;
+        const end = start + duration;
+        const from = Math.max(start, fcp);
+        if (end - from > 50) tbt += end - from - 50;
+    }
+
+    const resources = performance.getEntriesByType('resource').map(r => ({
+        url: r.name,
+        type: r.initiatorType,
+        start_ms: Math.round(r.startTime),
+        duration_ms: Math.round(r.duration),
+        transfer_bytes: r.transferSize || 0,
+        render_blocking: r.renderBlockingStatus === 'blocking',
+    }));
+    return {
+        url: location.href,
+        ttfb_ms: nav.responseStart || null,
+        dom_content_loaded_ms: nav.domContentLoadedEventEnd || null,
+        load_ms: nav.loadEventEnd || null,
+        fcp_ms: fcp,
+        lcp_ms: vitals.lcp,
+        lcp_element: vitals.lcpElement || null,
+        lcp_url: vitals.lcpUrl || null,
+        cls: cls,
+        tbt_ms: tbt,
+        long_tasks: vitals.longTasks.length,
+        transfer_kb: ((nav.transferSize || 0) + resources.reduce((sum, r) => sum + r.transfer_bytes, 0)) / 1024,
+        requests: resources.length + 1,
+        resources: resources,
+    };
+}
+"""
+
+
+def get_throttling(profile):
+    """Look up a throttling profile by name; ThrottlingProfile instances are returned unchanged"""
+    if isinstance(profile, ThrottlingProfile):
+        return profile
+    try:
+        return THROTTLING_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown throttling profile {profile!r} (choose from {', '.join(THROTTLING_PROFILES)})"
+        ) from None
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, interpolating linearly between the closest ranks"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def rate(metric, value):
+    """Rating of a metric value: "good", "needs improvement" or "poor" (None for metrics without thresholds)"""
+    if value is None or metric not in THRESHOLDS:
+        return None
+    good, poor = THRESHOLDS[metric]
+    if value <= good:
+        return "good"
+    return "poor" if value > poor else "needs improvement"
+
+
+@dataclass
+class UrlVitals:
+    """All samples of one URL under one throttling profile"""
+    url: str
+    profile: ThrottlingProfile
+    samples: list = field(default_factory=list)  # metrics dict per successful load
+    errors: list = field(default_factory=list)
+
+    def stats(self):
+        """metric -> {"median", "p75", "p90", "min", "max", "n", "rating"} over the samples that recorded it"""
+        result = {}
+        for metric in METRICS:
+            values = [sample[metric] for sample in self.samples if sample.get(metric) is not None]
+            if not values:
+                continue
+            median = statistics.median(values)
+            result[metric] = {
+                "median": round(median, 3),
+                "p75": round(percentile(values, 75), 3),
+                "p90": round(percentile(values, 90), 3),
+                "min": round(min(values), 3),
+                "max": round(max(values), 3),
+                "n": len(values),
+                "rating": rate(metric, median),
+            }
+        return result
+
+    def median_sample(self):
+        """The sample whose LCP (or load time) is the median, for its LCP element and waterfall"""
+        key = "lcp_ms" if any(sample.get("lcp_ms") is not None for sample in self.samples) else "load_ms"
+        ranked = sorted(self.samples, key=lambda sample: sample.get(key) or 0)
+        return ranked[(len(ranked) - 1) // 2] if ranked else None
+
+    def waterfall(self, limit=100):
+        """Resource waterfall of the median sample, in start order"""
+        sample = self.median_sample()
+        if not sample:
+            return []
+        return sorted(sample["resources"], key=lambda r: r["start_ms"])[:limit]
+
+    def summary(self):
+        """Stats, LCP element and waterfall for the report metadata"""
+        sample = self.median_sample() or {}
+        return {
+            "url": self.url,
+            "profile": self.profile.name,
+            "samples": len(self.samples),
+            "errors": self.errors,
+            "metrics": self.stats(),
+            "lcp_element": sample.get("lcp_element"),
+            "lcp_url": sample.get("lcp_url"),
+            "waterfall": self.waterfall(),
+        }
+
+    def to_prompt(self, max_resources=5):
+        stats = self.stats()
+        if not stats:
+            return f"- {self.url}: could not be measured ({'; '.join(self.errors[:2]) or 'no samples'})"
+        parts = []
+        for metric, label, unit in (("lcp_ms", "LCP", "ms"), ("cls", "CLS", ""), ("tbt_ms", "TBT", "ms"),
+                                    ("fcp_ms", "FCP", "ms"), ("ttfb_ms", "TTFB", "ms"), ("load_ms", "load", "ms")):
+            if metric not in stats:
+                continue
+            entry = stats[metric]
+            value = f"{entry['median']:.3f}" if metric == "cls" else f"{entry['median']:.0f} {unit}"
+            p75 = f"{entry['p75']:.3f}" if metric == "cls" else f"{entry['p75']:.0f}"
+            rating = f", {entry['rating']}" if entry["rating"] else ""
+            parts.append(f"{label} {value} (p75 {p75}{rating})")
+        lines = [f"- {self.url} [{self.profile.name}, {len(self.samples)} sample(s)]: " + "; ".join(parts)]
+        if "transfer_kb" in stats:
+            lines.append(f"  - {stats['transfer_kb']['median']:.0f} KB in {stats['requests']['median']:.0f} requests")
+        sample = self.median_sample()
+        if sample.get("lcp_element"):
+            lines.append(f"  - LCP element: {sample['lcp_element']}" + (f" ({sample['lcp_url']})" if sample.get("lcp_url") else ""))
+        blocking = [r for r in sample["resources"] if r["render_blocking"]]
+        if blocking:
+            lines.append(f"  - Render-blocking resources: {len(blocking)} ("
+                         + ", ".join(r["url"].rsplit("/", 1)[-1][:60] or r["url"] for r in blocking[:max_resources]) + ")")
+        slowest = sorted(sample["resources"], key=lambda r: -r["duration_ms"])[:max_resources]
+        if slowest:
+            lines.append("  - Slowest resources: " + ", ".join(
+                f"{r['url'][:80]} ({r['type']}, {r['duration_ms']} ms, {r['transfer_bytes'] // 1024} KB)" for r in slowest
+            ))
+        return "\n".join(lines)
+
+
+class WebVitalsCollector:
+    """
+    Measures pages in the browser pool under throttling profiles.
+
+    Measurements run one at a time, since concurrent loads would compete for
+    the CPU and skew each other's timings. Results are kept for the
+    collector's lifetime, so a URL measured by one task of a batch is not
+    measured again by the next.
+    """
+
+    def __init__(self, browser_pool, profiles=("mobile",), samples=3, timeout=60000, settle_ms=1500, allowed_hosts=None):
+        """
+        Args:
+            browser_pool (BrowserPool): Pool every sample borrows a fresh context from
+            profiles (tuple): Throttling profile names or ThrottlingProfile instances
+            samples (int): Loads per URL and profile
+            timeout (int): Navigation timeout per load in milliseconds
+            settle_ms (int): How long to keep observing after the network goes idle
+            allowed_hosts (frozenset): When set, requests to any other host are aborted
+                (offline runs); nothing else is blocked, so the numbers stay comparable
+        """
+        self.browser_pool = browser_pool
+        self.profiles = [get_throttling(profile) for profile in profiles]
+        self.samples = max(1, int(samples))
+        self.timeout = timeout
+        self.settle_ms = settle_ms
+        self.allowed_hosts = allowed_hosts
+        self.single_flight = SingleFlight()
+        self._results = {}
+        self._lock = asyncio.Lock()
+
+    async def measure(self, url, profile):
+        """UrlVitals of a URL under one throttling profile"""
+        profile = get_throttling(profile)
+        key = (url, profile.name)
+        if key not in self._results:
+            self._results[key] = await self.single_flight.do(key, lambda: self._measure(url, profile))
+        return self._results[key]
+
+    async def measure_all(self, urls):
+        """UrlVitals for every URL under every configured profile"""
+        return [await self.measure(url, profile) for url in urls for profile in self.profiles]
+
+    async def _measure(self, url, profile):
+        vitals = UrlVitals(url, profile)
+        async with self._lock:
+            with stage(VITALS, url=url, profile=profile.name):
+                for _ in range(self.samples):
+                    try:
+                        vitals.samples.append(await self._sample(url, profile))
+                    except Exception as e:
+                        vitals.errors.append(f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}")
+        return vitals
+
+    async def _sample(self, url, profile):
+        """One cold load of url in a fresh context"""
+        async with self.browser_pool.context() as browser_context:
+            session = await browser_context.get_session()
+            page = await session.context.new_page()
+            try:
+                await page.set_viewport_size({"width": profile.viewport[0], "height": profile.viewport[1]})
+                cdp = await session.context.new_cdp_session(page)
+                await cdp.send("Emulation.setCPUThrottlingRate", {"rate": profile.cpu_slowdown})
+                if profile.throttles_network:
+                    await cdp.send("Network.enable")
+                    await cdp.send("Network.emulateNetworkConditions", {
+                        "offline": False,
+                        "latency": profile.latency_ms,
+                        "downloadThroughput": profile.download_kbps * 1024 / 8,
+                        "uploadThroughput": profile.upload_kbps * 1024 / 8,
+                    })
+                if self.allowed_hosts is not None:
+                    await page.route("**/*", self._route)
+                await page.add_init_script(_OBSERVERS_JS)
+                started = time.perf_counter()
+                await page.goto(url, wait_until="load", timeout=self.timeout)
+                try:
+                    remaining = self.timeout - (time.perf_counter() - started) * 1000
+                    await page.wait_for_load_state("networkidle", timeout=max(1000, remaining))
+                except Exception:
+                    pass  # long-polling pages never go idle; measure what has loaded
+                await page.wait_for_timeout(self.settle_ms)
+                return await page.evaluate(_COLLECT_JS)
+            finally:
+                await page.close()
+
+    async def _route(self, route):
+        host = urlparse(route.request.url).hostname
+        if host and host not in self.allowed_hosts:
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+
+def vitals_to_prompt(results):
+    """Context block with the measured vitals of every URL"""
+    if not results:
+        return ""
+    profiles = []
+    for vitals in results:
+        if vitals.profile not in profiles:
+            profiles.append(vitals.profile)
+    lines = [
+        "Measured lab page speed (Core Web Vitals; medians over repeated cold loads with the p75 alongside,",
+        "rated good / needs improvement / poor against the Core Web Vitals thresholds). Use these numbers",
+        "for page speed instead of judging loading time in the browser. Throttling: "
+        + "; ".join(profile.describe() for profile in profiles) + ".",
+    ]
+    lines += [vitals.to_prompt() for vitals in results]
+    return "\n".join(lines)